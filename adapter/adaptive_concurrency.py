@@ -0,0 +1,97 @@
+import time
+from typing import Optional
+
+from adapter.host_load import HostLoad, LoadSample
+from adapter.tracing import tracer
+
+class AdaptiveConcurrency:
+    def __init__(self, min_workers: int, max_workers: int, logger=None, interval: float = 5.0,
+                 patience: int = 2, host_load: Optional[HostLoad] = None):
+        """
+        Initialize the AdaptiveConcurrency.
+
+        Controls how many workers may run at once from the load of the host. The
+        limit grows by one while the host has spare CPU, no memory pressure and
+        little I/O wait, e.g. while jobs clone, pull images or wait for SonarQube,
+        and shrinks by one when the CPUs, the memory or the disks are saturated,
+        e.g. during CodeQL extraction. Between the two sets of thresholds the limit
+        is kept, and a change needs `patience` consecutive samples agreeing, so the
+        limit does not oscillate. Running workers are never stopped, a lower limit
+        only delays the next ones.
+
+        Args:
+            min_workers (int): Lowest limit.
+            max_workers (int): Highest limit.
+            logger: Logger recording every change of the limit and the load behind it.
+            interval (float): Seconds between two samples.
+            patience (int): Consecutive samples needed to change the limit.
+            host_load (Optional[HostLoad]): Source of the samples.
+        """
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.logger = logger
+        self.interval = interval
+        self.patience = patience
+        self.host_load = host_load or HostLoad()
+
+        # Grow below every one of these
+        self.grow_cpu = 0.70
+        self.grow_load = 0.80
+        self.grow_iowait = 0.10
+        self.grow_memory_pressure = 1.0
+        # Shrink above any one of these
+        self.shrink_cpu = 0.92
+        self.shrink_load = 1.50
+        self.shrink_iowait = 0.30
+        self.shrink_memory_pressure = 10.0
+
+        self.limit = self.min_workers
+        self._last_sample = 0.0
+        self._trend = 0
+        self._streak = 0
+
+    def should_grow(self, sample: LoadSample) -> bool:
+        return (sample.cpu < self.grow_cpu and sample.load_per_cpu < self.grow_load
+                and sample.iowait < self.grow_iowait and sample.memory_pressure < self.grow_memory_pressure)
+
+    def should_shrink(self, sample: LoadSample) -> bool:
+        return (sample.cpu > self.shrink_cpu or sample.load_per_cpu > self.shrink_load
+                or sample.iowait > self.shrink_iowait or sample.memory_pressure > self.shrink_memory_pressure)
+
+    def update(self, running: int) -> int:
+        """
+        Samples the host if the interval has elapsed and returns the current limit.
+
+        Args:
+            running (int): Workers currently running. The limit only grows when it
+                is reached, since an idle pool says nothing about the capacity left.
+        """
+        now = time.monotonic()
+        if now - self._last_sample < self.interval:
+            return self.limit
+        self._last_sample = now
+
+        sample = self.host_load.sample()
+        if sample is None:
+            return self.limit
+
+        if self.should_shrink(sample):
+            trend = -1
+        elif self.should_grow(sample) and running >= self.limit:
+            trend = 1
+        else:
+            trend = 0
+        self._streak = self._streak + 1 if trend == self._trend else 1
+        self._trend = trend
+
+        if trend and self._streak >= self.patience:
+            limit = min(self.max_workers, max(self.min_workers, self.limit + trend))
+            if limit != self.limit:
+                if self.logger:
+                    self.logger.info("Concurrency {} -> {} ({} running), load {}".format(
+                        self.limit, limit, running, sample.to_dict()
+                    ))
+                self.limit = limit
+                tracer.counter("worker_limit", limit)
+            self._streak = 0
+        return self.limit
@@ -0,0 +1,126 @@
+import json
+import os
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlparse
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of the daemon:
+
+        GET  /health                            Running workers and current limit
+        POST /jobs                              {"repository", "tools"?, "language"?, "vulnerable"?}
+        GET  /jobs                              Every submission
+        GET  /jobs/<id>                         State of a submission and of its jobs
+        GET  /jobs/<id>/scorecard               Same, with the scorecard of each job
+        GET  /scorecards?repository=<address>   Scorecards of a repository for every enabled tool
+    """
+
+    def _send(self, status: int, body) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self) -> Tuple[list, dict]:
+        url = urlparse(self.path)
+        return [part for part in url.path.split("/") if part], parse_qs(url.query)
+
+    def do_GET(self):
+        daemon = self.server.benchmark
+        parts, query = self._route()
+        try:
+            if parts == ["health"]:
+                manager = daemon.process_manager
+                # Read only: the list of processes belongs to the scheduler thread
+                running = sum(1 for process in list(manager.processes) if process.is_alive())
+                self._send(200, {"status": "ok", "running": running, "limit": manager.limit})
+            elif parts == ["jobs"]:
+                self._send(200, daemon.status())
+            elif len(parts) in (2, 3) and parts[0] == "jobs" and parts[2:] in ([], ["scorecard"]):
+                result = daemon.scorecard(parts[1]) if parts[2:] else daemon.status(parts[1])
+                if result is None:
+                    self._send(404, {"error": "Unknown submission {}".format(parts[1])})
+                else:
+                    self._send(200, result)
+            elif parts == ["scorecards"] and query.get("repository"):
+                self._send(200, daemon.repository_scorecard(query["repository"][0]))
+            else:
+                self._send(404, {"error": "Not found"})
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+
+    def do_POST(self):
+        daemon = self.server.benchmark
+        parts, _ = self._route()
+        if parts != ["jobs"]:
+            self._send(404, {"error": "Not found"})
+            return
+
+        # Browsers send cross-site requests without a preflight only for the form content types
+        if self.headers.get_content_type() != "application/json":
+            self._send(415, {"error": "The request must be application/json"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict) or not request.get("repository"):
+                raise ValueError("The request needs a repository")
+            tools = request.get("tools")
+            if isinstance(tools, str):
+                tools = [tools]
+            submission = daemon.submit(request["repository"], tools, request.get("language"), request.get("vulnerable"))
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        self._send(202, submission)
+
+    def log_message(self, format, *args):
+        self.server.logger.debug("API {}".format(format % args))
+
+class DaemonServer:
+    def __init__(self, daemon, listen: str, logger):
+        """
+        Initialize the DaemonServer.
+
+        Serves the API of a BenchmarkDaemon over HTTP, each request in its own thread.
+        The API has no authentication: it listens on the loopback interface by
+        default, and a Unix socket is only accessible to its owner. Submissions
+        must be JSON, which browsers cannot send cross-site without a preflight
+        the API does not answer.
+
+        Args:
+            daemon (BenchmarkDaemon): The daemon.
+            listen (str): "host:port", or the path of a Unix socket (containing a "/").
+            logger: The application logger.
+        """
+        self.listen = listen
+        if "/" in listen:
+            if os.path.exists(listen):
+                os.remove(listen)  # Left by a previous daemon
+            self.server = _UnixHTTPServer(listen, DaemonRequestHandler)
+            os.chmod(listen, 0o600)
+        else:
+            host, _, port = listen.rpartition(":")
+            self.server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), DaemonRequestHandler)
+        self.server.benchmark = daemon
+        self.server.logger = logger
+
+    def serve_forever(self) -> None:
+        self.server.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stops serving. Called from another thread than serve_forever."""
+        self.server.shutdown()
+
+    def close(self) -> None:
+        self.server.server_close()
+        if "/" in self.listen and os.path.exists(self.listen):
+            os.remove(self.listen)
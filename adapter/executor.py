@@ -0,0 +1,60 @@
+import gzip
+import os
+import resource
+import subprocess
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Bytes read from the tool at once
+CHUNK_SIZE = 64 * 1024
+# Longest line kept in the tail, longer lines are truncated from the left
+MAX_TAIL_LINE = 1024
+
+@dataclass
+class CommandResult:
+    returncode: int
+    tail: str
+    log_file: str
+    # Resource usage of the command's process and of the children it waited for
+    rusage: Optional[resource.struct_rusage] = None
+
+def run_command(command: List[str], log_file: str, cwd: Optional[str] = None,
+                env: Optional[Dict[str, str]] = None, tail_lines: int = 40) -> CommandResult:
+    """
+    Runs a tool headless and streams its output to a gzip compressed log file.
+
+    The tool gets no TTY and no stdin, and its stderr is merged into stdout. The
+    output is written to the log file as it arrives, so memory stays bounded
+    whatever the tool prints; only the last lines are kept for error reporting.
+
+    Args:
+        command (List[str]): The command and its arguments.
+        log_file (str): Path of the compressed log, e.g. ".../semgrep.log.gz".
+        cwd (Optional[str]): Directory to run the command from.
+        env (Optional[Dict[str, str]]): Environment of the command. Defaults to the current one.
+        tail_lines (int): Number of trailing output lines to keep.
+
+    Returns:
+        CommandResult: Exit code of the tool, the tail of its output, the log path and
+        the resource usage of the tool.
+    """
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    tail = deque(maxlen=tail_lines)
+    partial = b""
+
+    with gzip.open(log_file, "wb", compresslevel=1) as log, subprocess.Popen(
+        command, cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    ) as process:
+        for chunk in iter(lambda: process.stdout.read1(CHUNK_SIZE), b""):
+            log.write(chunk)
+            lines = (partial + chunk).split(b"\n")
+            partial = lines.pop()[-MAX_TAIL_LINE:]
+            tail.extend(line[-MAX_TAIL_LINE:] for line in lines)
+        # Reaped with wait4 for the rusage of the tool alone
+        _, status, rusage = os.wait4(process.pid, 0)
+        returncode = process.returncode = os.waitstatus_to_exitcode(status)
+
+    if partial:
+        tail.append(partial)
+    return CommandResult(returncode, b"\n".join(tail).decode("utf-8", errors="replace"), log_file, rusage)
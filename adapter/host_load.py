@@ -0,0 +1,80 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+@dataclass
+class LoadSample:
+    # 1-minute load average divided by the number of CPUs
+    load_per_cpu: float
+    # Share of CPU time spent running tasks since the previous sample, 0 to 1
+    cpu: float
+    # Share of CPU time spent idle waiting for I/O since the previous sample, 0 to 1
+    iowait: float
+    # Share of the last 10 seconds in which some task stalled on memory (PSI), 0 to 100
+    memory_pressure: float
+
+    def to_dict(self):
+        return {
+            "load_per_cpu": round(self.load_per_cpu, 2),
+            "cpu": round(self.cpu, 2),
+            "iowait": round(self.iowait, 2),
+            "memory_pressure": round(self.memory_pressure, 1),
+        }
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return None
+
+class HostLoad:
+    def __init__(self, proc: str = "/proc"):
+        """
+        Initialize the HostLoad.
+
+        Samples the load of the host from /proc: load average, CPU utilisation and
+        I/O wait (from the deltas of /proc/stat between two samples) and memory
+        pressure stall information. Pressure is 0 on kernels built without PSI.
+
+        Args:
+            proc (str): Mount point of procfs.
+        """
+        self.proc = proc
+        self.cpus = os.cpu_count() or 1
+        self._previous = self._cpu_times()
+
+    def _cpu_times(self) -> Optional[list]:
+        stat = _read(os.path.join(self.proc, "stat"))
+        if not stat:
+            return None
+        # cpu user nice system idle iowait irq softirq steal ...
+        return [int(value) for value in stat.splitlines()[0].split()[1:9]]
+
+    def _memory_pressure(self) -> float:
+        pressure = _read(os.path.join(self.proc, "pressure", "memory"))
+        for line in (pressure or "").splitlines():
+            if line.startswith("some"):
+                for field in line.split()[1:]:
+                    name, _, value = field.partition("=")
+                    if name == "avg10":
+                        return float(value)
+        return 0.0
+
+    def sample(self) -> Optional[LoadSample]:
+        """Returns the load since the previous sample, or None if /proc is not readable."""
+        loadavg = _read(os.path.join(self.proc, "loadavg"))
+        times = self._cpu_times()
+        if loadavg is None or times is None:
+            return None
+
+        previous, self._previous = self._previous, times
+        deltas = [now - before for now, before in zip(times, previous or times)]
+        total = sum(deltas)
+        idle, iowait = deltas[3], deltas[4]
+        return LoadSample(
+            load_per_cpu=float(loadavg.split()[0]) / self.cpus,
+            cpu=(total - idle - iowait) / total if total else 0.0,
+            iowait=iowait / total if total else 0.0,
+            memory_pressure=self._memory_pressure(),
+        )
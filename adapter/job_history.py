@@ -0,0 +1,70 @@
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from domain.entity.job import ScanJob
+
+class JobHistory:
+    def __init__(self, path: str, smoothing: float = 0.5):
+        """
+        Initialize the JobHistory.
+
+        Durations of full scans are appended to a JSON lines file, one entry per
+        (repository, tool) scan, with a single O_APPEND write so concurrent workers
+        never interleave. On load, the durations of each job are combined into an
+        exponentially weighted average, so the estimate follows the repositories as
+        they grow without being thrown off by a single slow run.
+
+        Args:
+            path (str): Path of the history file.
+            smoothing (float): Weight of the latest duration in the average.
+        """
+        self.path = path
+        self.smoothing = smoothing
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.jobs: Dict[str, dict] = self._load()
+
+    def _load(self) -> Dict[str, dict]:
+        jobs: Dict[str, dict] = {}
+        if not os.path.isfile(self.path):
+            return jobs
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn write from a crash
+
+                known = jobs.get(entry["job"])
+                if known is None:
+                    jobs[entry["job"]] = {"tool": entry["tool"], "seconds": entry["seconds"],
+                                          "bytes": entry.get("bytes", 0), "runs": 1}
+                else:
+                    known["seconds"] += self.smoothing * (entry["seconds"] - known["seconds"])
+                    known["bytes"] = entry.get("bytes", known["bytes"])
+                    known["runs"] += 1
+        return jobs
+
+    def record(self, job: ScanJob, seconds: float, repository_bytes: int) -> None:
+        """
+        Appends the duration of a full scan of a job.
+
+        Args:
+            job (ScanJob): The job.
+            seconds (float): Wall time of the scan.
+            repository_bytes (int): Size of the scanned tree, used to estimate other repositories.
+        """
+        line = json.dumps({"job": job.key, "tool": job.tool, "seconds": round(seconds, 3),
+                           "bytes": repository_bytes, "time": time.time()}) + "\n"
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def expected_seconds(self, job: ScanJob) -> Optional[float]:
+        """Returns the average duration of the job's previous full scans, if any."""
+        entry = self.jobs.get(job.key)
+        return entry["seconds"] if entry else None
@@ -0,0 +1,216 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from domain.entity.job import ScanJob
+
+class JobQueue:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, directory: str, worker_id: Optional[str] = None, lease_seconds: float = 600):
+        """
+        Initialize the JobQueue.
+
+        The queue is a SQLite database inside a directory shared by every host
+        taking part in a run. A plain local directory works for a single host.
+
+        Args:
+            directory (str): Shared directory holding the queue database.
+            worker_id (Optional[str]): Identifier recorded on claimed jobs. Defaults to "<hostname>:<pid>".
+            lease_seconds (float): Time after which a job still marked as running, and
+                whose lease was not renewed by keep_alive, is considered abandoned by a
+                dead host and can be claimed again.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(directory, "jobs.sqlite")
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " key TEXT PRIMARY KEY,"
+                " tool TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " state TEXT NOT NULL,"
+                " worker TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Opens a short-lived connection. Connections are never shared, so the queue
+        can be used from forked worker processes.
+        """
+        connection = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def seed(self, jobs: Iterable[ScanJob], max_attempts: Optional[int] = None) -> None:
+        """
+        Adds jobs to the queue. Jobs already present are left untouched, so every host
+        can seed the same matrix safely, except failed jobs with attempts left, which
+        are queued again.
+
+        Args:
+            jobs (Iterable[ScanJob]): The jobs.
+            max_attempts (Optional[int]): Failed jobs claimed fewer times than this are
+                queued again. None leaves failed jobs failed.
+        """
+        now = time.time()
+        rows = [(job.key, job.tool, json.dumps(job.to_dict()), self.QUEUED, now) for job in jobs]
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT OR IGNORE INTO jobs (key, tool, payload, state, updated_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            if max_attempts is not None:
+                connection.executemany(
+                    "UPDATE jobs SET state = ?, worker = NULL, updated_at = ? WHERE key = ? AND state = ? AND attempts < ?",
+                    [(self.QUEUED, now, row[0], self.FAILED, max_attempts) for row in rows],
+                )
+            connection.execute("COMMIT")
+
+    def claim(self, tool: str) -> Optional[ScanJob]:
+        """
+        Atomically takes the next queued job of a tool.
+
+        Args:
+            tool (str): Class name of the runner.
+
+        Returns:
+            Optional[ScanJob]: The claimed job, or None if no job of that tool is left.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT key, payload FROM jobs WHERE tool = ? AND "
+                "(state = ? OR (state = ? AND updated_at < ?)) ORDER BY rowid LIMIT 1",
+                (tool, self.QUEUED, self.RUNNING, now - self.lease_seconds),
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            connection.execute(
+                "UPDATE jobs SET state = ?, worker = ?, attempts = attempts + 1, updated_at = ? WHERE key = ?",
+                (self.RUNNING, self.worker_id, now, row[0]),
+            )
+            connection.execute("COMMIT")
+        return ScanJob.from_dict(json.loads(row[1]))
+
+    def renew(self, job: ScanJob) -> bool:
+        """
+        Extends the lease of a job claimed by this worker.
+
+        Returns:
+            bool: False if the job is no longer held by this worker.
+        """
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE jobs SET updated_at = ? WHERE key = ? AND worker = ? AND state = ?",
+                (time.time(), job.key, self.worker_id, self.RUNNING),
+            ).rowcount == 1
+
+    @contextmanager
+    def keep_alive(self, job: ScanJob) -> Iterator[threading.Event]:
+        """
+        Renews the lease of a claimed job from a background thread while the block
+        runs, so a long scan is never taken for abandoned. The yielded event is set
+        if the lease was lost to another worker.
+
+        Usage:
+            with queue.keep_alive(job) as lost:
+                ...
+        """
+        stopped, lost = threading.Event(), threading.Event()
+
+        def renew() -> None:
+            while not stopped.wait(self.lease_seconds / 4):
+                try:
+                    if not self.renew(job):
+                        lost.set()
+                        return
+                except sqlite3.Error:
+                    pass  # The shared directory may be briefly unavailable, the next renewal retries
+
+        thread = threading.Thread(target=renew, name="lease-{}".format(job.key), daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stopped.set()
+            thread.join()
+
+    def complete(self, job: ScanJob, success: bool) -> bool:
+        """
+        Marks a job claimed by this worker as done or failed.
+
+        Returns:
+            bool: False if the job is no longer held by this worker, because its lease
+            expired and another worker claimed it. The state of the job is then left
+            to that worker.
+        """
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE key = ? AND worker = ? AND state = ?",
+                (self.DONE if success else self.FAILED, time.time(), job.key, self.worker_id, self.RUNNING),
+            ).rowcount == 1
+
+    def expire_leases(self) -> List[str]:
+        """
+        Marks the running jobs whose lease expired as failed, so a run whose hosts
+        have all stopped still drains. The next run on the queue queues them again.
+
+        Returns:
+            List[str]: Keys of the expired jobs.
+        """
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            deadline = time.time() - self.lease_seconds
+            keys = [row[0] for row in connection.execute(
+                "SELECT key FROM jobs WHERE state = ? AND updated_at < ?", (self.RUNNING, deadline)
+            ).fetchall()]
+            connection.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ? AND updated_at < ?",
+                (self.FAILED, time.time(), self.RUNNING, deadline),
+            )
+            connection.execute("COMMIT")
+        return keys
+
+    def counts(self, tool: Optional[str] = None) -> Dict[str, int]:
+        """Returns the number of jobs in each state, of every tool or of the given one."""
+        with self._connect() as connection:
+            if tool is None:
+                return dict(connection.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+            return dict(connection.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE tool = ? GROUP BY state", (tool,)
+            ).fetchall())
+
+    def wait_until_drained(self, poll_interval: float = 10) -> List[str]:
+        """
+        Blocks until no job is queued or running on any host. Jobs whose lease
+        expired, left running by a crashed host, are marked as failed on the way.
+
+        Returns:
+            List[str]: Keys of the jobs whose lease expired.
+        """
+        expired = []
+        while True:
+            expired += self.expire_leases()
+            counts = self.counts()
+            if counts.get(self.QUEUED, 0) + counts.get(self.RUNNING, 0) == 0:
+                return expired
+            time.sleep(poll_interval)
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from domain.entity.job import ScanJob
+
+def file_checksum(path: str) -> str:
+    """Returns the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class RunJournal:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, path: str, resume: bool = False):
+        """
+        Initialize the RunJournal.
+
+        The journal is an append-only JSON lines file recording every state change
+        of every (repo, tool) job. Each entry is written with a single O_APPEND write
+        followed by fsync, so concurrent workers never interleave and a crash loses
+        at most the entry being written.
+
+        Args:
+            path (str): Path of the journal file.
+            resume (bool): If True, the state of previous runs is loaded so finished
+                jobs can be skipped. Otherwise the run starts from a clean state.
+        """
+        self.path = path
+        self.resume = resume
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.jobs: Dict[str, dict] = self._load() if resume else {}
+        self._append({"event": "run", "resume": resume})
+
+    def _append(self, entry: dict) -> None:
+        entry["time"] = time.time()
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _load(self) -> Dict[str, dict]:
+        """
+        Replays the journal and returns the latest known state of each job.
+        A run started without --resume discards the state recorded before it.
+        """
+        jobs: Dict[str, dict] = {}
+        if not os.path.isfile(self.path):
+            return jobs
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn write from a crash
+
+                if entry.get("event") == "run":
+                    if not entry.get("resume"):
+                        jobs = {}
+                    continue
+
+                state = jobs.setdefault(entry["job"], {"attempts": 0})
+                state.update({k: v for k, v in entry.items() if k not in ("job", "attempt")})
+                if entry["state"] == self.RUNNING:
+                    state["attempts"] += 1
+                elif entry["state"] == self.DONE:
+                    state["attempts"] = 0
+        return jobs
+
+    def record(self, job: ScanJob, state: str, sarif: Optional[str] = None, error: Optional[str] = None,
+               cache_key: Optional[str] = None) -> None:
+        """
+        Appends a state change of a job.
+
+        Args:
+            job (ScanJob): The job.
+            state (str): One of queued, running, done or failed.
+            sarif (Optional[str]): SARIF file produced by the job. Its checksum is recorded with it.
+            error (Optional[str]): Reason of a failure.
+            cache_key (Optional[str]): Digest of the settings the result depends on, such as
+                the exclusion policy of the repository.
+        """
+        entry = {"job": job.key, "state": state}
+        if sarif and os.path.isfile(sarif):
+            entry["sarif"] = sarif
+            entry["sha256"] = file_checksum(sarif)
+        if cache_key:
+            entry["cache_key"] = cache_key
+        if error:
+            entry["error"] = error
+        self._append(entry)
+
+    def is_done(self, job: ScanJob, cache_key: Optional[str] = None) -> bool:
+        """
+        Returns True if a previous run finished the job with the same cache key and
+        its SARIF file is still intact.
+        """
+        state = self.jobs.get(job.key)
+        if not state or state.get("state") != self.DONE:
+            return False
+        if state.get("cache_key") != cache_key:
+            return False
+        if "sarif" in state:
+            return os.path.isfile(state["sarif"]) and file_checksum(state["sarif"]) == state["sha256"]
+        return True
+
+    def attempts(self, job: ScanJob) -> int:
+        """Returns the number of unsuccessful attempts recorded for the job."""
+        return self.jobs.get(job.key, {}).get("attempts", 0)
@@ -1,9 +1,72 @@
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
-from typing import Optional
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+# Attributes added to every record emitted by the current process, e.g. the job
+# a worker process is running. Worker processes are forked per job, so setting
+# it in a worker never leaks into another job.
+_log_context: Dict[str, str] = {}
+
+def set_log_context(**fields: str) -> None:
+    """
+    Tags every record logged by the current process with the given fields.
+
+    Args:
+        **fields: Fields such as job="SemgrepRunner:vulnerable/Go/govwa" or repo=<url>.
+    """
+    _log_context.clear()
+    _log_context.update(fields)
+
+class _ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.items():
+            setattr(record, key, value)
+        return True
+
+class _RecordQueueHandler(QueueHandler):
+    """
+    Enqueues records with their message and traceback kept apart. QueueHandler
+    would merge the traceback into the message, and the JSON lines could no
+    longer report it as the "exception" field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        # Tracebacks cannot be pickled, their text is sent instead
+        record.exc_info = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as JSON lines, including the job context of the record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "name": record.name,
+            "level": record.levelname,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        for key in ("job", "repo"):
+            if hasattr(record, key):
+                entry[key] = getattr(record, key)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry)
 
 class Logger:
-    def __init__(self, name: str, log_file: Optional[str] = None, level: int = logging.INFO):
+    def __init__(self, name: str, log_file: Optional[str] = None, level: int = logging.INFO,
+                 use_queue: bool = False, json_format: bool = False):
         """
         Initialize the Logger.
 
@@ -11,27 +74,54 @@ class Logger:
             name (str): Name of the logger.
             log_file (Optional[str]): Path to the log file. If None, logs only to the console.
             level (int): Logging level. Default is logging.INFO.
+            use_queue (bool): If True, the logger only enqueues records and a listener
+                thread of the creating process formats, writes and rotates them. Worker
+                processes forked afterwards share the queue, so they never block on disk
+                I/O nor race on the rotation of the log file. Call stop() before exiting.
+            json_format (bool): If True, the log file receives JSON lines tagged with the
+                job and repository of the worker that emitted them.
         """
         self.logger = logging.getLogger(name)
         self.logger.setLevel(level)
         self.logger.propagate = False  # Prevent double logging
+        self.listener: Optional[QueueListener] = None
 
         # Format for the logs
         log_format = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
 
+        handlers = []
+
         # Console handler
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(log_format)
-        self.logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
         # File handler (optional)
         if log_file:
             file_handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=5)
-            file_handler.setFormatter(log_format)
-            self.logger.addHandler(file_handler)
+            file_handler.setFormatter(JsonFormatter() if json_format else log_format)
+            handlers.append(file_handler)
+
+        if use_queue:
+            log_queue = multiprocessing.Queue()
+            queue_handler = _RecordQueueHandler(log_queue)
+            queue_handler.addFilter(_ContextFilter())
+            self.logger.addHandler(queue_handler)
+            self.listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+            self.listener.start()
+        else:
+            for handler in handlers:
+                handler.addFilter(_ContextFilter())
+                self.logger.addHandler(handler)
 
     def get_logger(self):
         """Returns the configured logger."""
-        return self.logger
\ No newline at end of file
+        return self.logger
+
+    def stop(self) -> None:
+        """Writes the records still queued and stops the listener."""
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
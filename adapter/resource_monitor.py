@@ -0,0 +1,191 @@
+import os
+import resource
+import subprocess
+import threading
+import time
+from typing import Dict, Optional
+
+# Directories skipped when measuring the size of a repository
+IGNORED_DIRECTORIES = {".git"}
+
+def repository_size(path: str) -> Dict[str, int]:
+    """
+    Counts the files and lines of code of a checked out repository.
+
+    Args:
+        path (str): Root of the repository.
+
+    Returns:
+        Dict[str, int]: "files", "loc" and "bytes".
+    """
+    files = loc = size = 0
+    for root, directories, filenames in os.walk(path):
+        directories[:] = [d for d in directories if d not in IGNORED_DIRECTORIES]
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            if os.path.islink(file_path):
+                continue
+            files += 1
+            try:
+                with open(file_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                        loc += chunk.count(b"\n")
+                        size += len(chunk)
+            except OSError:
+                continue
+    return {"files": files, "loc": loc, "bytes": size}
+
+def repository_bytes(path: str) -> int:
+    """
+    Returns the total size of the files of a checked out repository. Unlike
+    repository_size, files are not read, so it is cheap enough to size every
+    repository before a run.
+    """
+    size = 0
+    for root, directories, filenames in os.walk(path):
+        directories[:] = [d for d in directories if d not in IGNORED_DIRECTORIES]
+        for filename in filenames:
+            try:
+                size += os.lstat(os.path.join(root, filename)).st_size
+            except OSError:
+                continue
+    return size
+
+class ResourceMonitor:
+    def __init__(self, container_name: Optional[str] = None, interval: float = 1.0):
+        """
+        Initialize the ResourceMonitor.
+
+        Measures wall time, CPU seconds and peak memory of the enclosed block. With a
+        container name, a background thread samples the container's cgroup (falling
+        back to `docker stats` when the cgroup is not readable from the host) while
+        it runs. Without one, the CPU time is the rusage of the child processes
+        reaped during the block, and the peak memory is that of the processes passed
+        to add_process: the maximum RSS of all children would also count the git and
+        tar processes that prepared the workspace.
+
+        Args:
+            container_name (Optional[str]): Name given to the container with `docker run --name`.
+            interval (float): Sampling period in seconds.
+        """
+        self.container_name = container_name
+        self.interval = interval
+        self.usage: Dict = {}
+        self._cpu_seconds = 0.0
+        self._peak_rss = 0
+        self._process_peak_rss: Optional[int] = None
+        self._source = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> "ResourceMonitor":
+        self._start = time.time()
+        self._rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        if self.container_name:
+            self._thread = threading.Thread(target=self._sample_container, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        wall_seconds = time.time() - self._start
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+        else:
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            self._cpu_seconds = (after.ru_utime - self._rusage.ru_utime) + (after.ru_stime - self._rusage.ru_stime)
+            if self._process_peak_rss is not None:
+                self._peak_rss = self._process_peak_rss
+            else:
+                self._peak_rss = after.ru_maxrss * 1024  # Kilobytes on Linux
+            self._source = "rusage"
+
+        self.usage = {
+            "wall_seconds": wall_seconds,
+            "cpu_seconds": self._cpu_seconds,
+            "peak_rss_bytes": self._peak_rss,
+            "source": self._source,
+        }
+
+    def add_process(self, rusage: Optional[resource.struct_rusage]) -> None:
+        """
+        Records the rusage of a tool process run during the block, as returned by
+        run_command. The peak memory is the largest of these processes.
+        """
+        if rusage is not None:
+            self._process_peak_rss = max(self._process_peak_rss or 0, rusage.ru_maxrss * 1024)
+
+    def _container_id(self) -> Optional[str]:
+        result = subprocess.run(
+            ["docker", "inspect", "--format", "{{.Id}}", self.container_name],
+            capture_output=True, text=True,
+        )
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    @staticmethod
+    def _cgroup_directory(container_id: str) -> Optional[str]:
+        candidates = [
+            f"/sys/fs/cgroup/system.slice/docker-{container_id}.scope",  # cgroup v2, systemd driver
+            f"/sys/fs/cgroup/docker/{container_id}",                     # cgroup v2, cgroupfs driver
+        ]
+        for candidate in candidates:
+            if os.path.isfile(os.path.join(candidate, "cpu.stat")):
+                return candidate
+        return None
+
+    def _read_cgroup(self, directory: str) -> None:
+        with open(os.path.join(directory, "cpu.stat")) as f:
+            for line in f:
+                key, value = line.split()
+                if key == "usage_usec":
+                    self._cpu_seconds = int(value) / 1e6
+
+        for name in ("memory.peak", "memory.current"):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                with open(path) as f:
+                    self._peak_rss = max(self._peak_rss, int(f.read()))
+                break
+
+    def _read_docker_stats(self, elapsed: float) -> None:
+        result = subprocess.run(
+            ["docker", "stats", "--no-stream", "--format", "{{.CPUPerc}}|{{.MemUsage}}", self.container_name],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0 or "|" not in result.stdout:
+            return
+        cpu_percent, memory = result.stdout.strip().split("|", 1)
+        # Integrate the instantaneous CPU usage over the sampling period
+        self._cpu_seconds += float(cpu_percent.rstrip("%") or 0) / 100 * elapsed
+        self._peak_rss = max(self._peak_rss, _parse_size(memory.split("/")[0].strip()))
+
+    def _sample_container(self) -> None:
+        container_id = None
+        cgroup = None
+        last_sample = time.time()
+        while not self._stop.wait(self.interval):
+            try:
+                if container_id is None:
+                    container_id = self._container_id()
+                    cgroup = self._cgroup_directory(container_id) if container_id else None
+                    continue
+
+                now = time.time()
+                if cgroup and os.path.isdir(cgroup):
+                    self._read_cgroup(cgroup)
+                    self._source = "cgroup"
+                elif not cgroup:
+                    self._read_docker_stats(now - last_sample)
+                    self._source = "docker stats"
+                last_sample = now
+            except (OSError, ValueError):
+                continue  # Container exited between two samples
+
+def _parse_size(value: str) -> int:
+    """Parses a `docker stats` size such as "512.3MiB" into bytes."""
+    units = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4,
+             "kB": 1000, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+    for unit in sorted(units, key=len, reverse=True):
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * units[unit])
+    return 0
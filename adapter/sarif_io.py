@@ -0,0 +1,196 @@
+import gzip
+import json
+import lzma
+import os
+from typing import IO, Iterable, Iterator, Optional
+
+SARIF_SCHEMA = "https://raw.githubusercontent.com/oasis-tcs/sarif-spec/master/Schemata/sarif-schema-2.1.0.json"
+SARIF_VERSION = "2.1.0"
+
+# Suffix of the SARIF files written by the harness
+COMPRESSED_SUFFIX = ".sarif.gz"
+SARIF_SUFFIXES = (".sarif", ".sarif.gz", ".sarif.xz")
+
+# Compact separators, the SARIF files are read by programs rather than by people
+_SEPARATORS = (",", ":")
+
+# Mount points under which the runners expose the repository to the tools
+CONTAINER_ROOTS = ("/src/", "/app/", "/usr/src/")
+
+def is_sarif_file(path: str) -> bool:
+    """
+    Returns True if the path names a SARIF file, compressed or not. Hidden files,
+    such as those being written, are not results.
+    """
+    name = os.path.basename(path)
+    return name.endswith(SARIF_SUFFIXES) and not name.startswith(".")
+
+def open_sarif(path: str, mode: str = "r") -> IO[str]:
+    """
+    Opens a SARIF file as text, compressed with gzip or xz according to its suffix.
+
+    Args:
+        path (str): Path ending in .sarif, .sarif.gz or .sarif.xz.
+        mode (str): "r" or "w".
+    """
+    if path.endswith(".gz"):
+        # Level 6 compresses SARIF nearly as well as 9, several times faster
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    if path.endswith(".xz"):
+        return lzma.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def relative_uri(uri: str, repo_name: str) -> str:
+    """
+    Reduces the artifact location reported by a tool to a path relative to the
+    repository root.
+
+    Args:
+        uri (str): The artifactLocation.uri of a result.
+        repo_name (str): Name of the repository, used to cut absolute host paths.
+    """
+    path = uri.replace("\\", "/")
+    for prefix in ("file://", "%SRCROOT%"):
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+
+    # SonarQube components are "<project key>:<path>"
+    head, separator, tail = path.partition(":")
+    if separator and "/" not in head:
+        path = tail
+
+    marker = f"/{repo_name}/"
+    if marker in path:
+        path = path.split(marker, 1)[1]
+    else:
+        for root in CONTAINER_ROOTS:
+            if path.startswith(root):
+                path = path[len(root):]
+                break
+
+    while path.startswith("./"):
+        path = path[2:]
+    return path.lstrip("/")
+
+def result_uri(result: dict) -> str:
+    """Returns the artifact location of the first location of a result."""
+    location = (result.get("locations") or [{}])[0].get("physicalLocation", {})
+    return location.get("artifactLocation", {}).get("uri", "")
+
+def _temporary_path(path: str) -> str:
+    # Hidden sibling keeping the suffix, hence the compression, of the final file
+    return os.path.join(os.path.dirname(path), ".partial-" + os.path.basename(path))
+
+def load_sarif(path: str) -> dict:
+    """Loads a SARIF file, compressed or not."""
+    with open_sarif(path) as f:
+        return json.load(f)
+
+def dump_sarif(document: dict, path: str) -> None:
+    """
+    Writes a SARIF document compactly, compressed according to the suffix of the
+    path. The file is written under a temporary name and renamed, so readers never
+    see a partial document.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = _temporary_path(path)
+    with open_sarif(temporary, "w") as f:
+        json.dump(document, f, separators=_SEPARATORS)
+    os.replace(temporary, path)
+
+class SarifWriter:
+    def __init__(self, path: str, driver: dict):
+        """
+        Initialize the SarifWriter.
+
+        Streams a single-run SARIF document: results are written as they are added
+        and rules are collected on the way, then written after the results when the
+        writer is closed. Memory stays bounded by the number of distinct rules.
+
+        Args:
+            path (str): Destination, compressed according to its suffix, e.g. "report.sarif.gz".
+            driver (dict): The tool.driver object of the run, without its rules.
+        """
+        self.path = path
+        self.driver = driver
+        self.rules = {}
+        self.results = 0
+        self._temporary = _temporary_path(path)
+        self._file: Optional[IO[str]] = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open_sarif(self._temporary, "w")
+        self._file.write('{{"$schema":{},"version":{},"runs":[{{"results":['.format(
+            json.dumps(SARIF_SCHEMA), json.dumps(SARIF_VERSION)
+        ))
+        return self
+
+    def add_rule(self, rule: dict) -> None:
+        """Adds a rule to the run, once per rule id."""
+        self.rules.setdefault(rule["id"], rule)
+
+    def has_rule(self, rule_id: str) -> bool:
+        return rule_id in self.rules
+
+    def add_result(self, result: dict) -> None:
+        """Appends a result to the run."""
+        if self.results:
+            self._file.write(",")
+        self._file.write(json.dumps(result, separators=_SEPARATORS))
+        self.results += 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                driver = dict(self.driver, rules=list(self.rules.values()))
+                self._file.write('],"tool":{}}}]}}'.format(json.dumps({"driver": driver}, separators=_SEPARATORS)))
+        finally:
+            self._file.close()
+
+        if exc_type is None:
+            os.replace(self._temporary, self.path)
+        else:
+            os.remove(self._temporary)
+        return False
+
+def compact_sarif(source: str, destination: Optional[str] = None, remove_source: bool = True) -> str:
+    """
+    Rewrites a SARIF file, typically as pretty-printed by a tool, compactly and compressed.
+
+    Args:
+        source (str): The SARIF file.
+        destination (Optional[str]): Destination path. Defaults to the source with the
+            .sarif.gz suffix.
+        remove_source (bool): If True, the source is deleted once the destination is written.
+
+    Returns:
+        str: Path of the compacted file.
+    """
+    if destination is None:
+        destination = source[:-len(".sarif")] + COMPRESSED_SUFFIX if source.endswith(".sarif") else source
+    dump_sarif(load_sarif(source), destination)
+    if remove_source and os.path.abspath(source) != os.path.abspath(destination):
+        os.remove(source)
+    return destination
+
+def iter_sarif_files(directory: str) -> Iterator[str]:
+    """Yields every SARIF file below a directory."""
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            if is_sarif_file(file):
+                yield os.path.join(root, file)
+
+def compact_directory(directory: str) -> Iterable[tuple]:
+    """
+    Compacts every uncompressed SARIF file below a directory.
+
+    Yields:
+        tuple: (source, destination, bytes before, bytes after) for each file.
+    """
+    for path in iter_sarif_files(directory):
+        if not path.endswith(".sarif"):
+            continue
+        before = os.path.getsize(path)
+        destination = compact_sarif(path)
+        yield path, destination, before, os.path.getsize(destination)
@@ -0,0 +1,157 @@
+import glob
+import json
+import os
+import socket
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds, in seconds, of the Prometheus histogram buckets
+HISTOGRAM_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+
+class Tracer:
+    def __init__(self):
+        """
+        Initialize a disabled Tracer. Spans are no-ops until configure() is called.
+
+        Worker processes are forked, so every process appends its events to its own
+        spool file in the trace directory, spans.<hostname>.<pid>.jsonl, so hosts
+        sharing the directory never write to the same file. The files of every host
+        are merged on export.
+        """
+        self.directory: Optional[str] = None
+        self.hostname = socket.gethostname()
+        self._pid: Optional[int] = None
+        self._spool = None
+
+    def configure(self, directory: str) -> None:
+        """
+        Enables tracing. The spool files a previous run left on this host are
+        removed; those of other hosts, which may be running, are kept.
+
+        Args:
+            directory (str): Directory receiving the spool files and the exports.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(glob.escape(directory), "spans.*.jsonl")):
+            host = os.path.basename(path)[len("spans."):-len(".jsonl")].rpartition(".")[0]
+            if host in (self.hostname, ""):  # "" for the spans.<pid>.jsonl of older versions
+                os.remove(path)
+        self.directory = directory
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def _write(self, event: Dict) -> None:
+        if not self.enabled:
+            return
+        if self._pid != os.getpid():
+            # First event of this process, possibly a freshly forked worker
+            self._pid = os.getpid()
+            self._spool = open(os.path.join(self.directory, f"spans.{self.hostname}.{self._pid}.jsonl"), "a", encoding="utf-8")
+        self._spool.write(json.dumps(event) + "\n")
+        self._spool.flush()
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[None]:
+        """
+        Times the enclosed block. Spans opened inside it are nested under it in the trace.
+
+        Args:
+            name (str): Phase name, e.g. "clone" or "analysis".
+            **args: Labels attached to the span, e.g. tool and repo.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.time(), **args)
+
+    def record(self, name: str, start: float, end: float, **args) -> None:
+        """Records a span whose boundaries were measured by the caller."""
+        self._write({
+            "ph": "X", "name": name, "ts": start * 1e6, "dur": (end - start) * 1e6,
+            "pid": os.getpid(), "tid": os.getpid(), "args": dict(args, host=self.hostname),
+        })
+
+    def counter(self, name: str, value: float) -> None:
+        """Records a sample of a value that changes over time, e.g. busy worker slots."""
+        self._write({
+            "ph": "C", "name": name, "ts": time.time() * 1e6,
+            "pid": os.getpid(), "tid": os.getpid(), "args": {name: value},
+        })
+
+    def _events(self) -> List[Dict]:
+        events = []
+        for path in glob.glob(os.path.join(self.directory, "spans.*.jsonl")):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # Worker killed while writing
+        return sorted(events, key=lambda event: event["ts"])
+
+    def export_chrome_trace(self, path: str) -> None:
+        """
+        Writes every recorded event as a Chrome/Perfetto trace, viewable in
+        chrome://tracing or https://ui.perfetto.dev.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self._events(), "displayTimeUnit": "ms"}, f)
+
+    def export_prometheus(self, path: str) -> None:
+        """
+        Writes span durations and counters in the Prometheus text exposition format,
+        ready for the node_exporter textfile collector.
+        """
+        histograms: Dict[Tuple[str, Tuple], List[float]] = defaultdict(list)
+        counters: Dict[str, List[float]] = defaultdict(list)
+        for event in self._events():
+            if event["ph"] == "X":
+                name = "queue_wait" if event["name"] == "queue_wait" else "phase_duration"
+                labels = {"phase": event["name"]} if name == "phase_duration" else {}
+                if "tool" in event["args"]:
+                    labels["tool"] = event["args"]["tool"]
+                histograms[(name, tuple(sorted(labels.items())))].append(event["dur"] / 1e6)
+            elif event["ph"] == "C":
+                counters[event["name"]].append(event["args"][event["name"]])
+
+        lines = []
+        for metric in sorted({name for name, _ in histograms}):
+            full_name = f"sast_benchmark_{metric}_seconds"
+            lines.append(f"# TYPE {full_name} histogram")
+            for (name, labels), values in sorted(histograms.items()):
+                if name != metric:
+                    continue
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+                prefix = label_text + "," if label_text else ""
+                for bound in HISTOGRAM_BUCKETS:
+                    count = sum(1 for value in values if value <= bound)
+                    lines.append(f'{full_name}_bucket{{{prefix}le="{bound}"}} {count}')
+                lines.append(f'{full_name}_bucket{{{prefix}le="+Inf"}} {len(values)}')
+                lines.append(f"{full_name}_sum{{{label_text}}} {sum(values)}")
+                lines.append(f"{full_name}_count{{{label_text}}} {len(values)}")
+
+        for name, values in sorted(counters.items()):
+            lines.append(f"# TYPE sast_benchmark_{name} gauge")
+            lines.append(f"sast_benchmark_{name} {values[-1]}")
+            lines.append(f"# TYPE sast_benchmark_{name}_max gauge")
+            lines.append(f"sast_benchmark_{name}_max {max(values)}")
+            lines.append(f"# TYPE sast_benchmark_{name}_avg gauge")
+            lines.append(f"sast_benchmark_{name}_avg {sum(values) / len(values)}")
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def export(self) -> None:
+        """Writes trace.json and metrics.prom into the trace directory."""
+        if not self.enabled:
+            return
+        self.export_chrome_trace(os.path.join(self.directory, "trace.json"))
+        self.export_prometheus(os.path.join(self.directory, "metrics.prom"))
+
+# Process-wide tracer, configured by main.py
+tracer = Tracer()
@@ -1,34 +1,65 @@
 import multiprocessing
-import time
-from typing import Callable, List, Tuple, Any
+from multiprocessing.connection import wait
+from typing import Callable, List, Optional, Tuple, Any
+
+from adapter.adaptive_concurrency import AdaptiveConcurrency
+from adapter.tracing import tracer
+
+# Longest wait for a slot before the count of running processes is checked again,
+# in case a child was not started through the manager
+POLL_INTERVAL = 0.5
 
 class ProcessManager:
-    def __init__(self, max_workers: int):
+    def __init__(self, max_workers: int, concurrency: Optional[AdaptiveConcurrency] = None):
         """
         Initialize the ProcessManager.
 
         Args:
             max_workers (int): Maximum number of worker processes.
+            concurrency (Optional[AdaptiveConcurrency]): If set, the number of worker
+                processes follows the load of the host, up to its max_workers.
         """
         self.max_workers = max_workers
+        self.concurrency = concurrency
         self.processes: List[multiprocessing.Process] = []
 
-    def add_worker(self, function: Callable, args: Tuple[Any, ...]) -> None:
+    @property
+    def limit(self) -> int:
+        """Number of worker processes allowed to run now."""
+        return self.concurrency.limit if self.concurrency else self.max_workers
+
+    def wait_for_slot(self) -> None:
+        """
+        Blocks until fewer processes than the current limit are running. The wait
+        ends as soon as a worker exits.
+        """
+        while True:
+            running = len(multiprocessing.active_children())
+            if self.concurrency:
+                self.concurrency.update(running)
+            if running < self.limit:
+                break
+            self.clean_up()
+            wait([process.sentinel for process in self.processes], timeout=POLL_INTERVAL)
+
+    def add_worker(self, function: Callable, args: Tuple[Any, ...]) -> multiprocessing.Process:
         """
         Starts a new worker process to execute a given function with the provided arguments.
 
         Args:
             function (Callable): The function to execute in the process.
             args (Tuple[Any, ...]): The arguments to pass to the function.
+
+        Returns:
+            multiprocessing.Process: The started process.
         """
-        while True:
-            if len(multiprocessing.active_children()) < self.max_workers:
-                break
-            time.sleep(0.5)  # Wait for an available slot
-        
+        self.wait_for_slot()
+
         process = multiprocessing.Process(target=function, args=args)
         process.start()
         self.processes.append(process)
+        tracer.counter("busy_slots", len(multiprocessing.active_children()))
+        return process
 
     def wait_for_all(self) -> None:
         """
@@ -0,0 +1,92 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+from typing import List, Optional
+
+from adapter.tracing import tracer
+
+class ScanWorkspace:
+    ARCHIVE = "archive"
+    WORKTREE = "worktree"
+    NONE = "none"
+
+    def __init__(self, repository_directory: str, method: str = ARCHIVE, root: Optional[str] = None,
+                 exclude: Optional[List[str]] = None):
+        """
+        Initialize the ScanWorkspace.
+
+        A workspace is a private copy of the checked out tree of one repository,
+        without its .git directory, that a single job mounts into the tool's
+        container. Tools then see only the files they analyse, and parallel jobs do
+        not share one large bind mount. The copy is deleted when the job ends.
+
+        Args:
+            repository_directory (str): The cloned repository.
+            method (str): "archive" exports HEAD with `git archive`, "worktree" checks
+                it out with `git worktree add`, "none" uses the clone itself.
+            root (Optional[str]): Directory receiving the workspaces, e.g. "/dev/shm" to
+                keep them on tmpfs. Defaults to the system temporary directory.
+            exclude (Optional[List[str]]): Glob patterns left out of an "archive" workspace,
+                so tools without an exclusion mechanism do not see those files either.
+        """
+        self.repository_directory = os.path.abspath(repository_directory)
+        self.method = method
+        self.root = root or tempfile.gettempdir()
+        self.exclude = exclude or []
+        self.path: Optional[str] = None
+        self._base: Optional[str] = None
+
+    def __enter__(self) -> str:
+        if self.method == self.NONE:
+            self.path = self.repository_directory
+            return self.path
+
+        self._base = os.path.join(self.root, "sast-workspace-{}".format(uuid.uuid4().hex[:12]))
+        self.path = os.path.join(self._base, os.path.basename(self.repository_directory))
+        os.makedirs(self._base)
+        with tracer.span("workspace", method=self.method, repo=os.path.basename(self.repository_directory)):
+            try:
+                if self.method == self.WORKTREE:
+                    self._checkout_worktree()
+                else:
+                    self._export_archive()
+            except Exception:
+                self._remove()
+                raise
+        return self.path
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.method != self.NONE:
+            self._remove()
+        return False
+
+    def _export_archive(self) -> None:
+        """Extracts `git archive HEAD` into the workspace, streaming it through tar."""
+        os.makedirs(self.path)
+        archive = subprocess.Popen(
+            ["git", "-C", self.repository_directory, "archive", "--format=tar", "HEAD", "--", "."]
+            + [":(exclude,glob){}".format(pattern) for pattern in self.exclude],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        extract = subprocess.run(["tar", "-x", "-C", self.path], stdin=archive.stdout, stderr=subprocess.PIPE)
+        archive.stdout.close()
+        if archive.wait() != 0 or extract.returncode != 0:
+            raise RuntimeError("Could not export {}: {}".format(
+                self.repository_directory, extract.stderr.decode("utf-8", errors="replace").strip()
+            ))
+
+    def _checkout_worktree(self) -> None:
+        """Checks out HEAD as a detached worktree, then drops its .git link file."""
+        subprocess.run(
+            ["git", "-C", self.repository_directory, "worktree", "add", "--detach", "--quiet", self.path, "HEAD"],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        os.remove(os.path.join(self.path, ".git"))
+
+    def _remove(self) -> None:
+        shutil.rmtree(self._base, ignore_errors=True)
+        if self.method == self.WORKTREE:
+            subprocess.run(["git", "-C", self.repository_directory, "worktree", "prune"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the `docker` CLI and the `trivy` binary used by the benchmark suite.
+
+Installed on PATH as `docker` (and as the Trivy binary), it accepts the commands
+issued by the runners, sleeps for FAKE_TOOL_DELAY seconds to simulate the
+analysis and writes a synthetic SARIF file with FAKE_TOOL_RESULTS results
+wherever the real tool would have written its report.
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.environ.get("FAKE_TOOL_ROOT", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from benchmark.synthetic_sarif import write_sarif_file
+
+# Arguments naming the report file, per tool
+OUTPUT_PATTERNS = (
+    re.compile(r"--sarif-output=(\S+)"),
+    re.compile(r"--sarif-file-output=(\S+)"),
+    re.compile(r"--json-output-file[ =](\S+)"),
+    re.compile(r"--output[ =](\S+\.sarif\S*)"),
+    re.compile(r"-o (\S+\.sarif\S*)"),
+)
+
+IMAGE_TOOLS = (("codeql", "codeql"), ("semgrep", "semgrep"), ("snyk", "snyk"), ("horusec", "horusec"), ("sonar", "sonarqube"))
+
+def _mounts(arguments):
+    """Returns (container path, host path) pairs of the -v options, longest container path first."""
+    mounts = []
+    for index, argument in enumerate(arguments[:-1]):
+        if argument in ("-v", "--volume"):
+            parts = arguments[index + 1].split(":")
+            mounts.append((parts[1], parts[0]))
+    return sorted(mounts, key=lambda mount: len(mount[0]), reverse=True)
+
+def _to_host(path, mounts):
+    for container_path, host_path in mounts:
+        if path == container_path or path.startswith(container_path.rstrip("/") + "/"):
+            return host_path + path[len(container_path):]
+    return path
+
+def _write_report(command_line, tool, mounts):
+    for pattern in OUTPUT_PATTERNS:
+        match = pattern.search(command_line)
+        if match:
+            path = _to_host(match.group(1).strip("\"'"), mounts)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            write_sarif_file(path, tool, int(os.environ.get("FAKE_TOOL_RESULTS", "100")))
+            return
+
+def _run(arguments):
+    command_line = " ".join(arguments)
+    if " -d " in " {} ".format(command_line):
+        return 0  # Detached service container, e.g. the SonarQube server
+
+    tool = next((tool for marker, tool in IMAGE_TOOLS if marker in command_line), "semgrep")
+    time.sleep(float(os.environ.get("FAKE_TOOL_DELAY", "0")))
+    if tool != "sonarqube":
+        _write_report(command_line, tool, _mounts(arguments))
+    return 0
+
+def main(arguments):
+    if os.environ.get("FAKE_TOOL") == "trivy":
+        time.sleep(float(os.environ.get("FAKE_TOOL_DELAY", "0")))
+        _write_report(" ".join(arguments), "trivy", [])
+        return 0
+
+    command = arguments[0] if arguments else ""
+    if command == "run":
+        return _run(arguments[1:])
+    if command == "inspect":
+        print("0" * 64)
+    elif command == "stats":
+        print("0.00%|1MiB / 1GiB")
+    return 0  # pull, rm and anything else succeed silently
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
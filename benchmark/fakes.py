@@ -0,0 +1,136 @@
+import json
+import os
+import stat
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import parse_qs, urlparse
+
+FAKE_DOCKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_docker.py")
+
+def install_fake_tools(bin_dir: str, delay: float = 0.0, results: int = 100) -> str:
+    """
+    Puts the fake `docker` and `trivy` executables on PATH.
+
+    Args:
+        bin_dir (str): Directory receiving the executables, prepended to PATH.
+        delay (float): Seconds each simulated analysis takes.
+        results (int): Number of results in each generated SARIF file.
+
+    Returns:
+        str: Path of the fake Trivy binary, to be assigned to TrivyRunner.trivy_path.
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    for name in ("docker", "trivy"):
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(f"#!/bin/sh\nFAKE_TOOL={name} exec {sys.executable} {FAKE_DOCKER} \"$@\"\n")
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+    os.environ["FAKE_TOOL_DELAY"] = str(delay)
+    os.environ["FAKE_TOOL_RESULTS"] = str(results)
+    return os.path.join(bin_dir, "trivy")
+
+def create_bare_repositories(directory: str, count: int, files: int = 20) -> List[str]:
+    """
+    Creates local bare git repositories that the harness can clone offline.
+
+    Args:
+        directory (str): Directory receiving the repositories.
+        count (int): Number of repositories.
+        files (int): Number of source files committed in each repository.
+
+    Returns:
+        List[str]: Addresses of the repositories, usable in place of GitHub URLs.
+    """
+    template = os.path.join(directory, "template")
+    os.makedirs(template, exist_ok=True)
+    for index in range(files):
+        with open(os.path.join(template, f"file{index}.py"), "w") as f:
+            f.write("import os\n\ndef handler(request):\n    os.system(request.args['cmd'])\n" * 10)
+
+    git = ["git", "-c", "user.name=benchmark", "-c", "user.email=benchmark@localhost"]
+    subprocess.run(["git", "init", "-q", template], check=True)
+    subprocess.run(git + ["-C", template, "add", "."], check=True)
+    subprocess.run(git + ["-C", template, "commit", "-q", "-m", "Synthetic repository"], check=True)
+
+    addresses = []
+    for index in range(count):
+        address = os.path.join(directory, f"repo{index:05d}")
+        subprocess.run(["git", "clone", "-q", "--bare", template, address], check=True)
+        addresses.append(address)
+    return addresses
+
+class _SonarQubeHandler(BaseHTTPRequestHandler):
+    issues = 100
+
+    def _reply(self, body) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/api/system/health":
+            self._reply({"health": "GREEN"})
+        elif url.path == "/api/issues/search":
+            project = query.get("projectKeys", ["project"])[0]
+            self._reply({"issues": [
+                {
+                    "key": f"issue-{index}",
+                    "rule": f"python:S{index % 50}",
+                    "component": f"{project}:src/module{index % 10}/file{index}.py",
+                    "line": index % 500 + 1,
+                    "message": f"Synthetic issue {index}",
+                    "tags": ["cwe", "owasp-a1"],
+                    "severity": "MAJOR",
+                    "type": "VULNERABILITY",
+                }
+                for index in range(self.issues)
+            ]})
+        elif url.path == "/api/rules/search":
+            rule = query.get("rule_key", ["rule"])[0]
+            self._reply({"rules": [{
+                "key": rule,
+                "name": f"Synthetic rule {rule}",
+                "mdDesc": "Synthetic rule description",
+                "severity": "MAJOR",
+                "descriptionSections": [{"key": "root_cause", "content": "Synthetic root cause"}],
+            }]})
+        else:
+            self._reply({})
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply({"project": {}})
+
+    def log_message(self, format, *args) -> None:
+        pass  # Keep the benchmark output readable
+
+class FakeSonarQube:
+    def __init__(self, issues: int = 100):
+        """
+        Initialize a fake SonarQube web API on a free local port.
+
+        Args:
+            issues (int): Number of issues returned for every project.
+        """
+        handler = type("SonarQubeHandler", (_SonarQubeHandler,), {"issues": issues})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FakeSonarQube":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
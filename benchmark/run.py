@@ -0,0 +1,206 @@
+"""
+Offline performance benchmark of the harness itself.
+
+Every external dependency is replaced by a stand-in: a stub `docker`/`trivy`
+executable, local bare git repositories, a fake SonarQube web API and synthetic
+SARIF files shaped like the output of each tool. Only Python and git are needed.
+
+Usage:
+    python3 -m benchmark.run --scenario all --jobs 1000 --repos 10000
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adapter.worker import ProcessManager
+from benchmark.synthetic_sarif import REPORT_FILES, TOOL_SHAPES, write_sarif_file
+
+SCENARIOS = ("scheduling", "parsing", "report", "runners")
+
+def _measure(function: Callable[[], None]) -> Dict[str, float]:
+    """Runs a function and returns its wall time and peak Python heap."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": elapsed, "peak_memory_mib": peak / 1024 ** 2}
+
+def _record_start(start_times, index: int) -> None:
+    start_times[index] = time.time()
+
+def bench_scheduling(jobs: int, workers: int) -> List[Dict]:
+    """
+    Submits no-op jobs to the ProcessManager and measures the dispatch throughput
+    and the latency between a submission and the start of its worker.
+    """
+    start_times = multiprocessing.Array("d", jobs, lock=False)
+    submit_times = [0.0] * jobs
+    process_manager = ProcessManager(max_workers=workers)
+
+    start = time.perf_counter()
+    for index in range(jobs):
+        submit_times[index] = time.time()
+        process_manager.add_worker(_record_start, (start_times, index))
+    process_manager.wait_for_all()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(start_times[index] - submit_times[index] for index in range(jobs))
+    return [{
+        "scenario": "scheduling", "jobs": jobs, "workers": workers, "seconds": elapsed,
+        "jobs_per_second": jobs / elapsed,
+        "latency_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "latency_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }]
+
+def bench_parsing(directory: str, sizes: List[int], tools: List[str]) -> List[Dict]:
+    """
+    Measures SarifReportGenerator.parse_sarif_file on documents of increasing size,
+    as written by the tools and once compacted by the harness.
+    """
+    from adapter.sarif_io import compact_sarif
+    from domain.use_case.generate_report import SarifReportGenerator
+
+    generator = SarifReportGenerator(directory)
+    rows = []
+    for tool in tools:
+        for size in sizes:
+            path = os.path.join(directory, f"{tool}_{size}.sarif")
+            write_sarif_file(path, tool, size)
+            for sarif_format in ("tool", "compact"):
+                if sarif_format == "compact":
+                    path = compact_sarif(path)
+                measurement = _measure(lambda: generator.parse_sarif_file(path))
+                rows.append(dict(measurement, scenario="parsing", tool=tool, format=sarif_format, results=size,
+                                 file_mib=os.path.getsize(path) / 1024 ** 2,
+                                 results_per_second=size / measurement["seconds"]))
+            os.remove(path)
+    return rows
+
+def bench_report(directory: str, repos: int, results: int, tools: List[str]) -> List[Dict]:
+    """
+    Generates a scan_results tree of `repos` repositories scanned by every tool and
+    measures SarifReportGenerator.generate_report over it.
+    """
+    from domain.use_case.generate_report import SarifReportGenerator
+
+    base_dir = os.path.join(directory, "scan_results")
+    for tool in tools:
+        for index in range(repos):
+            repo_dir = os.path.join(base_dir, f"{tool}_scan", "vulnerable", f"Lang{index % 10}", f"repo{index:05d}")
+            os.makedirs(repo_dir, exist_ok=True)
+            write_sarif_file(os.path.join(repo_dir, REPORT_FILES[tool]), tool, results, seed=index)
+
+    measurement = _measure(SarifReportGenerator(base_dir).generate_report)
+    report_size = os.path.getsize(os.path.join(base_dir, "SARIF_Analysis_Report.html"))
+    shutil.rmtree(base_dir)
+    total = repos * len(tools) * results
+    return [dict(measurement, scenario="report", repos=repos, tools=len(tools), results=total,
+                 report_mib=report_size / 1024 ** 2, results_per_second=total / measurement["seconds"])]
+
+def bench_runners(directory: str, repos: int, workers: int, delay: float, results: int) -> List[Dict]:
+    """
+    Runs the real runners end to end against local bare repositories, the fake
+    docker/trivy executables and the fake SonarQube API.
+    """
+    from adapter.logger import Logger
+    from data.github import GitHubManager
+    from domain.entity.config import AppConfig
+    from domain.use_case.codeql_runner import CodeQLRunner
+    from domain.use_case.horusec_runner import HorusecRunner
+    from domain.use_case.semgrep_runner import SemgrepRunner
+    from domain.use_case.snyk_runner import SnykRunner
+    from domain.use_case.sonarqube_runner import SonarQubeRunner
+    from domain.use_case.trivy_runner import TrivyRunner
+    from benchmark.fakes import FakeSonarQube, create_bare_repositories, install_fake_tools
+
+    trivy_path = install_fake_tools(os.path.join(directory, "bin"), delay=delay, results=results)
+    addresses = create_bare_repositories(os.path.join(directory, "remotes"), repos)
+    workspace = os.path.join(directory, "workspace")
+    os.makedirs(workspace, exist_ok=True)
+    os.chdir(workspace)
+
+    app_config = AppConfig({
+        "application": {"filter_languages": ["Python"], "max_workers": workers, "runners": [], "retry_backoff": 0},
+        "repos": {"vulnerable": {"Python": addresses}, "non_vulnerable": {}},
+    })
+    logger = Logger(name="Benchmark", level=logging.WARNING).get_logger()
+    process_manager = ProcessManager(max_workers=workers)
+
+    rows = []
+    clone = _measure(lambda: (app_config.add_vulnerable_reporitories_to_worker(GitHubManager(), logger, process_manager),
+                              process_manager.wait_for_all()))
+    rows.append(dict(clone, scenario="runners", phase="clone", jobs=repos, jobs_per_second=repos / clone["seconds"]))
+
+    with FakeSonarQube(issues=results) as sonarqube:
+        for runner_class in (CodeQLRunner, HorusecRunner, SemgrepRunner, SnykRunner, TrivyRunner, SonarQubeRunner):
+            runner = runner_class(logger, process_manager)
+            if isinstance(runner, TrivyRunner):
+                runner.trivy_path = trivy_path
+            if isinstance(runner, SonarQubeRunner):
+                runner._SONARQUBE_URL = sonarqube.url
+                runner.analysis_wait_seconds = 0
+            measurement = _measure(lambda: runner.run(app_config))
+            rows.append(dict(measurement, scenario="runners", phase=runner.name, jobs=repos,
+                             jobs_per_second=repos / measurement["seconds"],
+                             overhead_per_job_ms=(measurement["seconds"] * workers / repos - delay) * 1000))
+    return rows
+
+def _print_rows(rows: List[Dict]) -> None:
+    for row in rows:
+        print("  ".join(
+            "{}={}".format(key, "{:.3f}".format(value) if isinstance(value, float) else value)
+            for key, value in row.items()
+        ))
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Offline performance benchmark of the SAST benchmark harness.")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--jobs", type=int, default=1000, help="Jobs submitted in the scheduling scenario.")
+    parser.add_argument("--workers", type=int, default=3, help="max_workers of the ProcessManager.")
+    parser.add_argument("--sizes", default="1,1000,100000",
+                        help="Comma separated result counts of the parsing scenario, up to 1000000.")
+    parser.add_argument("--repos", type=int, default=10000, help="Repositories in the report scenario.")
+    parser.add_argument("--results", type=int, default=20, help="Results per SARIF file in the report and runners scenarios.")
+    parser.add_argument("--runner-repos", type=int, default=20, help="Repositories in the runners scenario.")
+    parser.add_argument("--delay", type=float, default=0.0, help="Simulated analysis time of the fake tools, in seconds.")
+    parser.add_argument("--tools", default=",".join(TOOL_SHAPES), help="SARIF shapes to generate.")
+    parser.add_argument("--output", help="Also write the results as JSON to this file.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    tools = args.tools.split(",")
+    directory = tempfile.mkdtemp(prefix="sast-benchmark-")
+    cwd = os.getcwd()
+
+    rows = []
+    try:
+        if "scheduling" in scenarios:
+            rows += bench_scheduling(args.jobs, args.workers)
+        if "parsing" in scenarios:
+            rows += bench_parsing(directory, [int(size) for size in args.sizes.split(",")], tools)
+        if "report" in scenarios:
+            rows += bench_report(directory, args.repos, args.results, tools)
+        if "runners" in scenarios:
+            rows += bench_runners(directory, args.runner_repos, args.workers, args.delay, args.results)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    _print_rows(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import random
+from typing import Dict, IO, Iterator
+
+from adapter.sarif_io import SARIF_SCHEMA, open_sarif
+
+# Per tool: driver name, file extension of the flagged files, rule id pattern and
+# whether the level is carried by the rule (CodeQL) or by each result
+TOOL_SHAPES = {
+    "codeql": {"driver": "CodeQL", "extension": "java", "rule": "java/sql-injection-{}", "level_on_rule": True},
+    "semgrep": {"driver": "Semgrep OSS", "extension": "py", "rule": "python.lang.security.audit.rule-{}", "level_on_rule": False},
+    "snyk": {"driver": "SnykCode", "extension": "js", "rule": "javascript/XSS-{}", "level_on_rule": False},
+    "trivy": {"driver": "Trivy", "extension": "lock", "rule": "CVE-2024-{:05d}", "level_on_rule": False},
+    "horusec": {"driver": "Horusec", "extension": "go", "rule": "HS-GO-{}", "level_on_rule": False},
+    "sonarqube": {"driver": "SonarQube", "extension": "cs", "rule": "csharpsquid:S{}", "level_on_rule": False},
+}
+
+# Scan report file name used by each runner
+REPORT_FILES = {
+    "codeql": "report.sarif",
+    "semgrep": "result.sarif",
+    "snyk": "result.sarif",
+    "trivy": "trivy_report.sarif",
+    "horusec": "report.sarif",
+    "sonarqube": "sonarqube_issues.sarif",
+}
+
+LEVELS = ("error", "warning", "note")
+
+def _results(tool: str, count: int, rule_count: int, rng: random.Random) -> Iterator[Dict]:
+    shape = TOOL_SHAPES[tool]
+    for index in range(count):
+        rule_index = rng.randrange(rule_count)
+        path = "src/module{}/file{}.{}".format(rng.randrange(50), rng.randrange(200), shape["extension"])
+        line = rng.randrange(1, 2000)
+        result = {
+            "ruleId": shape["rule"].format(rule_index),
+            "ruleIndex": rule_index,
+            "message": {"text": "Synthetic finding {} of rule {}".format(index, rule_index)},
+            "locations": [{
+                "physicalLocation": {
+                    "artifactLocation": {"uri": path, "uriBaseId": "%SRCROOT%"},
+                    "region": {"startLine": line, "startColumn": 1, "endLine": line + rng.randrange(3), "endColumn": 80},
+                }
+            }],
+            "partialFingerprints": {
+                "primaryLocationLineHash": hashlib.sha1("{}:{}:{}".format(path, line, rule_index).encode()).hexdigest()[:16] + ":1",
+            },
+        }
+        if not shape["level_on_rule"]:
+            result["level"] = LEVELS[rule_index % len(LEVELS)]
+        yield result
+
+def write_sarif(f: IO[str], tool: str, results: int, rules: int = 100, seed: int = 0) -> None:
+    """
+    Streams a synthetic SARIF document shaped like the output of a tool.
+
+    Results are written one at a time, so documents with millions of results can
+    be generated with constant memory.
+
+    Args:
+        f (IO[str]): Text stream receiving the document.
+        tool (str): One of TOOL_SHAPES.
+        results (int): Number of results.
+        rules (int): Number of distinct rules.
+        seed (int): Seed of the random generator, for reproducible documents.
+    """
+    shape = TOOL_SHAPES[tool]
+    rng = random.Random(seed)
+    rule_count = max(1, min(rules, results))
+    driver_rules = [
+        {
+            "id": shape["rule"].format(index),
+            "name": "SyntheticRule{}".format(index),
+            "shortDescription": {"text": "Synthetic rule {}".format(index)},
+            "defaultConfiguration": {"level": LEVELS[index % len(LEVELS)]},
+            "properties": {"tags": ["security", "external/cwe/cwe-{:03d}".format(20 + index % 60)]},
+        }
+        for index in range(rule_count)
+    ]
+    header = {
+        "$schema": SARIF_SCHEMA,
+        "version": "2.1.0",
+        "runs": [{"tool": {"driver": {"name": shape["driver"], "rules": driver_rules}}, "results": []}],
+    }
+
+    # Split the header around the empty results array and stream the results in between
+    prefix, suffix = json.dumps(header).rsplit('"results": []', 1)
+    f.write(prefix + '"results": [')
+    for index, result in enumerate(_results(tool, results, rule_count, rng)):
+        if index:
+            f.write(",")
+        f.write(json.dumps(result))
+    f.write("]" + suffix)
+
+def write_sarif_file(path: str, tool: str, results: int, rules: int = 100, seed: int = 0) -> None:
+    """Writes a synthetic SARIF document to a file, compressed according to its suffix. See write_sarif."""
+    with open_sarif(path, "w") as f:
+        write_sarif(f, tool, results, rules, seed)
@@ -0,0 +1,57 @@
+import json
+from typing import Iterable, Iterator, Optional
+
+from domain.entity.corpus import CorpusEntry
+
+class CorpusManifest:
+    def __init__(self, path: str, languages: Optional[Iterable[str]] = None,
+                 tags: Optional[Iterable[str]] = None, exclude_tags: Optional[Iterable[str]] = None):
+        """
+        Initialize the CorpusManifest.
+
+        A manifest is a JSON lines file with one repository per line, e.g.
+
+            {"url": "https://github.com/0c34/govwa", "ref": "v1.0", "languages": ["Go"],
+             "category": "vulnerable", "tags": ["web"], "size_bytes": 1048576}
+
+        Blank lines and lines starting with "#" are ignored. The file is read line
+        by line each time it is enumerated, so corpora of thousands of repositories
+        are never held in memory.
+
+        Args:
+            path (str): Path of the manifest.
+            languages (Optional[Iterable[str]]): Only repositories with one of these languages.
+            tags (Optional[Iterable[str]]): Only repositories with at least one of these tags.
+            exclude_tags (Optional[Iterable[str]]): Skip repositories with any of these tags.
+        """
+        self.path = path
+        self.languages = list(languages or [])
+        self.tags = set(tags or [])
+        self.exclude_tags = set(exclude_tags or [])
+
+    def matches(self, entry: CorpusEntry) -> bool:
+        """Returns True if the entry passes the language and tag filters."""
+        if entry.language_for(self.languages) is None:
+            return False
+        if self.tags and not self.tags.intersection(entry.tags):
+            return False
+        return not self.exclude_tags.intersection(entry.tags)
+
+    def __iter__(self) -> Iterator[CorpusEntry]:
+        """
+        Yields the entries passing the filters, in the order of the file.
+
+        Raises:
+            ValueError: If a line is not a valid entry, with its line number.
+        """
+        with open(self.path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    entry = CorpusEntry.from_dict(json.loads(line))
+                except (ValueError, TypeError, AttributeError) as e:
+                    raise ValueError("{}:{}: invalid entry: {}".format(self.path, number, e))
+                if self.matches(entry):
+                    yield entry
@@ -1,6 +1,11 @@
+import fcntl
 import os
 import subprocess
-from typing import Optional
+from typing import List, Optional
+
+from adapter.logger import set_log_context
+from adapter.tracing import tracer
+from domain.entity.job import repository_id
 
 class GitHubManager:
     def __init__(self, base_dir: str = "repositories"):
@@ -12,42 +17,76 @@ class GitHubManager:
         """
         self.base_dir = base_dir
 
-    def _run_command(self, command: str, cwd: Optional[str] = None) -> None:
+    def _run_command(self, command: List[str], cwd: Optional[str] = None) -> None:
         """
-        Executes a shell command.
+        Executes a command. It is not run through a shell, so addresses and refs
+        are never interpreted by one.
 
         Args:
-            command (str): The shell command to execute.
+            command (List[str]): The command and its arguments.
             cwd (Optional[str]): Directory to run the command from.
 
         Raises:
-            subprocess.CalledProcessError: If the command fails.
+            RuntimeError: If the command fails.
         """
         try:
-            subprocess.run(command, shell=True, check=True, cwd=cwd)
+            subprocess.run(command, check=True, cwd=cwd)
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Command failed: {e}")
 
-    def clone_repo(self, address: str, directory: str) -> None:
+    def clone_repo(self, address: str, directory: str, ref: Optional[str] = None) -> None:
         """
         Clone or update a git repository.
 
         Args:
             address (str): Git repository address.
             directory (str): Directory to clone the repository into.
+            ref (Optional[str]): Commit, tag or branch to check out. If None, the
+                default branch is pulled.
         """
         os.makedirs(directory, exist_ok=True)
-        repo_name = address.split("/")[-1].replace(".git", "")
+        repo_name = repository_id(address)
         repo_path = os.path.join(directory, repo_name)
 
         if not os.path.isdir(repo_path):
-            print(f"Cloning repository: {address} into {directory}")
-            self._run_command(f"git clone {address}", cwd=directory)
-        else:
+            print(f"Cloning repository: {address} into {repo_path}")
+            with tracer.span("clone", repo=address):
+                self._run_command(["git", "clone"] + (["--no-checkout"] if ref else []) + ["--", address, repo_name],
+                                  cwd=directory)
+        elif not ref:
             print(f"Updating repository: {address}")
-            self._run_command("git pull", cwd=repo_path)
+            with tracer.span("pull", repo=address):
+                if subprocess.run(["git", "symbolic-ref", "--quiet", "HEAD"], cwd=repo_path,
+                                  stdout=subprocess.DEVNULL).returncode != 0:
+                    # Detached by a ref the repository is no longer pinned to
+                    default_branch = subprocess.run(["git", "rev-parse", "--abbrev-ref", "origin/HEAD"], cwd=repo_path,
+                                                    check=True, capture_output=True, text=True).stdout.strip()
+                    self._run_command(["git", "checkout", "--quiet", default_branch.split("/", 1)[-1]], cwd=repo_path)
+                self._run_command(["git", "pull"], cwd=repo_path)
+
+        if ref:
+            self.checkout_ref(address, repo_path, ref)
 
-    def update_git_repositories(self, vulnerable: bool, language: str, address: str) -> None:
+    def checkout_ref(self, address: str, repo_path: str, ref: str) -> None:
+        """
+        Checks out a pinned ref, detached. The ref is fetched only when it is not
+        already known locally as a commit, so pinned commits and tags are fetched once.
+        """
+        known = subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}"], cwd=repo_path,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+        is_branch = subprocess.run(["git", "show-ref", "--verify", "--quiet", f"refs/remotes/origin/{ref}"],
+                                   cwd=repo_path).returncode == 0
+        if not known or is_branch:
+            print(f"Fetching {ref} of {address}")
+            with tracer.span("fetch", repo=address):
+                self._run_command(["git", "fetch", "--quiet", "origin", "--", ref], cwd=repo_path)
+            target = "FETCH_HEAD"
+        else:
+            target = ref
+        self._run_command(["git", "checkout", "--quiet", "--detach", target, "--"], cwd=repo_path)
+
+    def update_git_repositories(self, vulnerable: bool, language: str, address: str, ref: Optional[str] = None,
+                                since: Optional[float] = None) -> None:
         """
         Update or clone git repositories into organized directories.
 
@@ -55,7 +94,24 @@ class GitHubManager:
             vulnerable (bool): True if the repository is vulnerable, False otherwise.
             language (str): Programming language of the repository.
             address (str): Git repository address.
+            ref (Optional[str]): Commit, tag or branch the repository is pinned to.
+            since (Optional[float]): If set, the clone is updated at most once after this
+                time: the jobs of several tools claimed on the same host share one
+                update, and concurrent calls wait for it instead of racing on the clone.
         """
+        set_log_context(repo=address)
         category = "vulnerable" if vulnerable else "non-vulnerable"
         directory = os.path.join(self.base_dir, category, language)
-        self.clone_repo(address, directory)
\ No newline at end of file
+        if since is None:
+            self.clone_repo(address, directory, ref)
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        marker = os.path.join(directory, ".{}.updated".format(repository_id(address)))
+        with open(marker + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if os.path.isfile(marker) and os.path.getmtime(marker) >= since:
+                return
+            self.clone_repo(address, directory, ref)
+            with open(marker, "w"):
+                pass
\ No newline at end of file
@@ -1,7 +1,14 @@
+import hashlib
+import json
 import os
+import time
 from dotenv import load_dotenv
-from typing import Callable, Dict, List, Tuple
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, asdict, field
+
+from data.corpus_manifest import CorpusManifest
+from domain.entity.corpus import CorpusEntry
+from domain.entity.job import ScanJob, Shard, canonical_address
 
 @dataclass
 class Runner:
@@ -17,6 +24,17 @@ class Application:
     filter_languages: List[str]
     max_workers: int
     runners: Dict[str, dict]
+    max_attempts: int = 3
+    retry_backoff: float = 30
+    ground_truth_directory: str = "ground_truth"
+    line_tolerance: int = 3
+    cwe_families: Optional[Dict[str, List[int]]] = None
+    workspace_method: str = "archive"
+    workspace_directory: Optional[str] = None
+    incremental: bool = True
+    # Follow the load of the host between min_workers and max_workers
+    adaptive_concurrency: bool = False
+    min_workers: int = 1
 
     snyk_token = None
 
@@ -25,8 +43,8 @@ class Application:
 
 @dataclass
 class Repos:
-    vulnerable: Dict[str, List[str]]
-    non_vulnerable: Dict[str, List[str]]
+    vulnerable: Dict[str, List[str]] = field(default_factory=dict)
+    non_vulnerable: Dict[str, List[str]] = field(default_factory=dict)
 
     def to_dict(self):
         return {
@@ -34,11 +52,51 @@ class Repos:
             "non_vulnerable": self.non_vulnerable
         }
 
+@dataclass
+class Exclusions:
+    # Glob patterns relative to the repository root, "**" matching any number of directories
+    paths: List[str] = field(default_factory=list)
+    # Additional patterns per repository address
+    repositories: Dict[str, List[str]] = field(default_factory=dict)
+
+    def for_repository(self, address: str) -> List[str]:
+        """
+        Returns the patterns excluded from the scans of a repository: the global
+        ones followed by those of the repository.
+        """
+        patterns = list(self.paths)
+        for pattern in self.repositories.get(address, []):
+            if pattern not in patterns:
+                patterns.append(pattern)
+        return patterns
+
+    def fingerprint(self, address: str) -> str:
+        """Returns a short hash of the repository's patterns, part of the key of its results."""
+        patterns = json.dumps(sorted(self.for_repository(address)))
+        return hashlib.sha256(patterns.encode("utf-8")).hexdigest()[:16]
+
+    def to_dict(self):
+        return asdict(self)
+
+@dataclass
+class Corpus:
+    # JSON lines manifest of repositories, scanned in addition to `repos`
+    manifest: Optional[str] = None
+    # Only the manifest repositories with at least one of these tags
+    tags: List[str] = field(default_factory=list)
+    # Skip the manifest repositories with any of these tags
+    exclude_tags: List[str] = field(default_factory=list)
+
+    def to_dict(self):
+        return asdict(self)
+
 @dataclass
 class AppConfig:
     def __init__(self, json_data: Dict):
         self.application = Application(**json_data.get("application", {}))
         self.repos = Repos(**json_data.get("repos", {}))
+        self.exclusions = Exclusions(**json_data.get("exclusions", {}))
+        self.corpus = Corpus(**json_data.get("corpus", {}))
 
         # Load environment variables from the .env file
         load_dotenv()
@@ -46,6 +104,18 @@ class AppConfig:
         # Retrieve the token
         self.snyk_token = os.getenv("SNYK_TOKEN")
 
+        # Multi-node execution, set from the command line by main.py
+        self.shard: Optional[Shard] = None
+        self.job_queue = None
+        # Start of the run: the jobs of a queue update each clone once after it
+        self.started_at = time.time()
+
+        # Crash-safe record of the run, set by main.py
+        self.journal = None
+
+        # Durations of previous scans, used to order the jobs. Set by main.py
+        self.job_history = None
+
         self.repos.vulnerable = self._get_vulnerable_repos()
         self.repos.non_vulnerable = self._get_non_vulnerable_repos()
         self.application.runners = self._get_runners()
@@ -79,25 +149,107 @@ class AppConfig:
             for lang in self.application.filter_languages
         }
     
+    def iter_repositories(self) -> Iterator[CorpusEntry]:
+        """
+        Yields every filtered repository: those of `repos`, then those of the corpus
+        manifest, which is read lazily.
+
+        Raises:
+            ValueError: If two repositories would share a checkout and results directory,
+                or the manifest holds an invalid entry.
+        """
+        seen: Dict[Tuple[str, str, str], str] = {}
+
+        def check(entry: CorpusEntry, language: str) -> bool:
+            key = (entry.category, language, entry.id)
+            if key in seen:
+                if canonical_address(seen[key]) != canonical_address(entry.url):
+                    raise ValueError("{} and {} share the repository id {}".format(seen[key], entry.url, entry.id))
+                return False  # Listed twice, possibly spelled differently
+            seen[key] = entry.url
+            return True
+
+        for vulnerable, repos in ((True, self.repos.vulnerable), (False, self.repos.non_vulnerable)):
+            for language in repos:
+                for repository in repos[language]:
+                    entry = CorpusEntry(repository, vulnerable, (language,))
+                    if check(entry, language):
+                        yield entry
+
+        if self.corpus.manifest:
+            manifest = CorpusManifest(self.corpus.manifest, self.application.filter_languages,
+                                      self.corpus.tags, self.corpus.exclude_tags)
+            for entry in manifest:
+                if check(entry, self.language_of(entry)):
+                    yield entry
+
+    def language_of(self, entry: CorpusEntry) -> str:
+        """Returns the language a repository is benchmarked as, which names its directory."""
+        return entry.language_for(self.application.filter_languages)
+
+    def find_repository(self, address: str) -> Optional[CorpusEntry]:
+        """Returns a filtered repository by address, or None if it is not in the corpus."""
+        address = canonical_address(address)
+        return next((entry for entry in self.iter_repositories() if canonical_address(entry.url) == address), None)
+
+    def get_languages(self) -> List[str]:
+        """Returns the languages of the filtered repositories."""
+        return sorted({self.language_of(entry) for entry in self.iter_repositories()})
+
+    def size_hints(self) -> Dict[str, int]:
+        """Returns the size in bytes given by the manifest for the repositories that have one."""
+        return {entry.url: entry.size_bytes for entry in self.iter_repositories() if entry.size_bytes}
+
+    def get_scan_jobs(self, tool: str) -> List[ScanJob]:
+        """
+        Returns the jobs of the given tool for every filtered repository, restricted
+        to the current shard when one is set.
+
+        Args:
+            tool (str): Class name of the runner, as configured in `application.runners`.
+        """
+        jobs = [ScanJob(tool, entry.vulnerable, self.language_of(entry), entry.url) for entry in self.iter_repositories()]
+
+        if self.shard:
+            jobs = [job for job in jobs if self.shard.includes(job)]
+        return jobs
+
+    def is_repository_needed(self, vulnerable: bool, language: str, repository: str) -> bool:
+        """
+        Returns True if any enabled runner has a job for the repository on this node.
+        With a queue, none is known before it is claimed, and the job clones the
+        repository itself.
+        """
+        if self.job_queue is not None:
+            return False
+        if not self.shard:
+            return True
+        return any(
+            self.shard.includes(ScanJob(tool, vulnerable, language, repository))
+            for tool in self.application.runners
+        )
+
+    def _add_repositories_to_worker(self, vulnerable, github, logger, multiprocess_worker):
+        category = "vulnerable" if vulnerable else "non-vulnerable"
+        logger.info("Updating {} repositories".format(category))
+        for entry in self.iter_repositories():
+            language = self.language_of(entry)
+            if entry.vulnerable != vulnerable or not self.is_repository_needed(vulnerable, language, entry.url):
+                continue
+            logger.info("Updating {} repository: {}{}".format(category, entry.url, " at " + entry.ref if entry.ref else ""))
+            multiprocess_worker.add_worker(github.update_git_repositories, (vulnerable, language, entry.url, entry.ref))
+
     def add_vulnerable_reporitories_to_worker(self, github, logger, multiprocess_worker):
         """
         Adds vulnerable repositories to the worker.
         """
-        for language in self.repos.vulnerable:
-            logger.info("Updating vulnerable repositories for language {}".format(language))
-            for repository in self.repos.vulnerable[language]:
-                logger.info("Updating vulnerable repository: {}".format(repository))
-                multiprocess_worker.add_worker(github.update_git_repositories, (True, language, repository))
+        self._add_repositories_to_worker(True, github, logger, multiprocess_worker)
 
     def add_non_vulnerable_reporitories_to_worker(self, github, logger, multiprocess_worker):
         """
         Adds non-vulnerable repositories to the worker.
         """
-        for language in self.repos.non_vulnerable:
-            logger.info("Updating non-vulnerable repositories for language {}".format(language))
-            for repository in self.repos.non_vulnerable[language]:
-                logger.info("Updating non-vulnerable repository: {}".format(repository))
-                multiprocess_worker.add_worker(github.update_git_repositories, (False, language, repository))
+        self._add_repositories_to_worker(False, github, logger, multiprocess_worker)
 
     def to_dict(self) -> Dict:
         """
@@ -105,5 +257,7 @@ class AppConfig:
         """
         return {
             "application": self.application.to_dict(),
-            "repos": self.repos.to_dict()
+            "repos": self.repos.to_dict(),
+            "exclusions": self.exclusions.to_dict(),
+            "corpus": self.corpus.to_dict()
         }
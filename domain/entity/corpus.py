@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from domain.entity.job import repository_id
+
+
+@dataclass(frozen=True)
+class CorpusEntry:
+    """A repository of the benchmark corpus, from config.json or a corpus manifest."""
+    url: str
+    vulnerable: bool
+    languages: Tuple[str, ...]
+    # Commit, tag or branch to scan. None follows the default branch
+    ref: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+    # Size hints, used to plan the jobs before the repository is cloned
+    size_bytes: Optional[int] = None
+    loc: Optional[int] = None
+
+    @property
+    def category(self) -> str:
+        return "vulnerable" if self.vulnerable else "non-vulnerable"
+
+    @property
+    def id(self) -> str:
+        """Directory of the repository in the repositories/ and scan_results/ layouts."""
+        return repository_id(self.url)
+
+    def language_for(self, filter_languages: Optional[Iterable[str]] = None) -> Optional[str]:
+        """
+        Returns the language the repository is benchmarked as: its first language
+        among the filtered ones, or None if none of them is. Without a filter, its
+        first language.
+        """
+        if not filter_languages:
+            return self.languages[0] if self.languages else None
+        allowed = set(filter_languages)
+        return next((language for language in self.languages if language in allowed), None)
+
+    def to_dict(self) -> Dict:
+        entry = {"url": self.url, "category": self.category, "languages": list(self.languages)}
+        for key in ("ref", "size_bytes", "loc"):
+            if getattr(self, key) is not None:
+                entry[key] = getattr(self, key)
+        if self.tags:
+            entry["tags"] = list(self.tags)
+        return entry
+
+    @staticmethod
+    def from_dict(data: Dict) -> "CorpusEntry":
+        """
+        Builds an entry from a manifest line. The language may be given as
+        "language" or as a "languages" list, and the category as "category"
+        ("vulnerable" or "non-vulnerable") or as a "vulnerable" flag.
+
+        Raises:
+            ValueError: If the url, language or category is missing or invalid.
+        """
+        if not data.get("url"):
+            raise ValueError("missing url")
+
+        languages = data.get("languages") or data.get("language")
+        if isinstance(languages, str):
+            languages = [languages]
+        if not languages:
+            raise ValueError("missing language of {}".format(data["url"]))
+
+        if "vulnerable" in data:
+            vulnerable = bool(data["vulnerable"])
+        else:
+            category = str(data.get("category", "")).replace("_", "-")
+            if category not in ("vulnerable", "non-vulnerable"):
+                raise ValueError("category of {} must be vulnerable or non-vulnerable".format(data["url"]))
+            vulnerable = category == "vulnerable"
+
+        return CorpusEntry(
+            url=data["url"],
+            vulnerable=vulnerable,
+            languages=tuple(languages),
+            ref=data.get("ref"),
+            tags=tuple(data.get("tags", ())),
+            size_bytes=int(data["size_bytes"]) if data.get("size_bytes") is not None else None,
+            loc=int(data["loc"]) if data.get("loc") is not None else None,
+        )
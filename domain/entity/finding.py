@@ -0,0 +1,31 @@
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class Finding:
+    """A single SARIF result, normalized across tools."""
+    tool: str
+    rule_id: str
+    level: str
+    message: str
+    path: str
+    line: Optional[int]
+    cwe: Optional[str] = None
+    snippet_hash: Optional[str] = None
+    partial_fingerprints: Dict[str, str] = field(default_factory=dict)
+
+    # Cross-tool identity of the finding, see FindingFingerprinter
+    fingerprint: str = ""
+
+    @property
+    def dedupe_key(self) -> str:
+        """
+        Identity of the finding among the results of the same tool. The tool's own
+        partialFingerprints are preferred, as they survive line shifts between runs.
+        """
+        if self.partial_fingerprints:
+            return self.rule_id + "|" + "|".join(
+                f"{key}={value}" for key, value in sorted(self.partial_fingerprints.items())
+            )
+        return self.rule_id + "|" + self.fingerprint
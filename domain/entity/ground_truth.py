@@ -0,0 +1,44 @@
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class ExpectedIssue:
+    """A known vulnerability of a repository, as listed in its ground-truth manifest."""
+    id: str
+    path: str
+    start_line: int
+    end_line: int
+    cwe: Optional[str] = None
+    description: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: Dict, index: int = 0) -> "ExpectedIssue":
+        """
+        Builds an issue from a manifest entry. "line" is accepted in place of
+        "start_line"/"end_line" for single-line issues, and the CWE may be given
+        as "CWE-89", "89" or 89.
+
+        Args:
+            data (Dict): The manifest entry.
+            index (int): Position of the entry, used as id when none is given.
+        """
+        start_line = int(data.get("start_line", data.get("line", 0)))
+        end_line = int(data.get("end_line", start_line))
+        cwe = data.get("cwe")
+        if cwe is not None:
+            cwe = "CWE-{}".format(int(str(cwe).upper().replace("CWE-", "")))
+        path = data["path"].replace("\\", "/")
+        while path.startswith("./"):
+            path = path[2:]
+        return ExpectedIssue(
+            id=str(data.get("id", index)),
+            path=path.lstrip("/"),
+            start_line=min(start_line, end_line),
+            end_line=max(start_line, end_line),
+            cwe=cwe,
+            description=data.get("description", ""),
+        )
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import re
+from dataclasses import dataclass, asdict
+from typing import Dict
+
+# Hosts whose repositories are identified by "<owner>__<name>" alone
+DEFAULT_HOSTS = {"github.com", "www.github.com"}
+
+def canonical_address(address: str) -> str:
+    """
+    Returns "<host>/<path>" for a git address, so the https, http and ssh spellings
+    of a repository, with or without ".git", compare equal.
+
+    Args:
+        address (str): Git address, e.g. "https://github.com/owner/name" or "git@host:owner/name.git".
+    """
+    url = address.strip().rstrip("/")
+    if url.endswith(".git"):
+        url = url[:-len(".git")]
+    if "://" in url:
+        host, _, path = url.split("://", 1)[1].partition("/")
+    elif ":" in url:
+        host, path = url.split(":", 1)
+    else:
+        host, path = "", url
+    host = host.rpartition("@")[2].lower().partition(":")[0]
+    return "/".join([host] + [part for part in path.split("/") if part])
+
+def repository_id(address: str) -> str:
+    """
+    Returns the directory name of a repository under repositories/ and scan_results/.
+
+    The id is "<owner>__<name>" for GitHub repositories and is prefixed with the
+    host for other hosts, e.g. "gitlab.com__group__subgroup__name". It is derived
+    from the address alone, so it does not change when repositories are added to
+    or removed from the corpus. Characters unsafe in a path are replaced, and a
+    short hash of the address is appended when that happens, so two addresses
+    never share an id.
+
+    Args:
+        address (str): Git address, e.g. "https://github.com/owner/name" or "git@host:owner/name.git".
+    """
+    url = address.strip().rstrip("/")
+    if url.endswith(".git"):
+        url = url[:-len(".git")]
+    if "://" in url:
+        host, _, path = url.split("://", 1)[1].partition("/")
+    elif ":" in url:
+        host, path = url.split(":", 1)
+    else:
+        host, path = "", url
+    host = host.rpartition("@")[2].lower()
+
+    parts = [part for part in path.split("/") if part]
+    if host and host not in DEFAULT_HOSTS:
+        parts.insert(0, host)
+    identifier = "__".join(parts)
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", identifier)
+    ambiguous = any("__" in part or part.startswith("_") or part.endswith("_") for part in parts)
+    if safe != identifier or ambiguous or not safe.strip("."):
+        # Hashing the canonical address keeps the id the same for every spelling of the address
+        digest = hashlib.sha1(canonical_address(address).encode("utf-8")).hexdigest()[:8]
+        safe = "{}-{}".format(safe.strip("._") or "repository", digest)
+    return safe
+
+
+@dataclass(frozen=True)
+class ScanJob:
+    """A single unit of benchmark work: one tool scanning one repository."""
+    tool: str
+    vulnerable: bool
+    language: str
+    address: str
+
+    @property
+    def category(self) -> str:
+        return "vulnerable" if self.vulnerable else "non-vulnerable"
+
+    @property
+    def repo_id(self) -> str:
+        """Directory of the repository in the repositories/ and scan_results/ layouts."""
+        return repository_id(self.address)
+
+    @property
+    def repository_directory(self) -> str:
+        """Checkout of the repository, relative to the working directory."""
+        return os.path.join("repositories", self.category, self.language, self.repo_id)
+
+    @property
+    def key(self) -> str:
+        """Stable identifier of the job, shared by every host taking part in a run."""
+        return f"{self.tool}:{self.category}/{self.language}/{self.repo_id}"
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ScanJob":
+        return cls(
+            tool=data["tool"],
+            vulnerable=bool(data["vulnerable"]),
+            language=data["language"],
+            address=data["address"],
+        )
+
+
+@dataclass(frozen=True)
+class Shard:
+    """Static partition of the (repo, tool) matrix, selected with `--shard i/n`."""
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Shard":
+        """
+        Parses a shard specification.
+
+        Args:
+            value (str): Shard in the form "i/n", with 0 <= i < n.
+
+        Raises:
+            ValueError: If the specification is malformed or out of range.
+        """
+        try:
+            index, count = (int(part) for part in value.split("/"))
+        except ValueError:
+            raise ValueError(f"Invalid shard '{value}', expected the form i/n")
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Invalid shard '{value}', index must be in [0, {count})")
+        return cls(index, count)
+
+    def includes(self, job: ScanJob) -> bool:
+        """
+        Returns True if the job belongs to this shard.
+
+        The job key is hashed rather than using Python's hash(), so every host
+        computes the same partition regardless of PYTHONHASHSEED.
+        """
+        digest = hashlib.sha1(job.key.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self.count == self.index
@@ -1,6 +1,423 @@
+import hashlib
+import json
+import os
+import subprocess
+import time
+import uuid
 from abc import ABCMeta, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+from adapter.logger import set_log_context
+from adapter.resource_monitor import ResourceMonitor, repository_bytes, repository_size
+from adapter.sarif_io import COMPRESSED_SUFFIX, compact_sarif
+from adapter.tracing import tracer
+from adapter.workspace import ScanWorkspace
+from data.github import GitHubManager
+from domain.entity.job import ScanJob
+from domain.use_case.incremental_scan import ScanPlan, SCAN_STATE_FILE, merge_sarif, plan_scan, write_scan_state
+from domain.use_case.job_planner import JobPlanner
 
 class SastRunner(metaclass=ABCMeta):
+    # Human readable tool name, used in log messages
+    name = "SAST"
+
+    # Runners able to scan a subset of the files set this, and restrict the tool to
+    # scan_targets() when it returns a list
+    supports_incremental = False
+
+    # How the current job is scanned, set before scan() is called
+    scan_plan: Optional[ScanPlan] = None
+
+    # Local ids of the images resolved by image_version
+    _image_ids: Optional[Dict[str, str]] = None
+
     @abstractmethod
+    def scan(self, job: ScanJob, configs) -> bool:
+        """
+        Scans a single repository. Called inside a worker process.
+
+        Args:
+            job (ScanJob): The repository to scan.
+            configs: The application configuration.
+
+        Returns:
+            bool: True if the tool ran successfully.
+        """
+        pass
+
+    def get_report_file(self, job: ScanJob) -> Optional[str]:
+        """
+        Returns the SARIF file of a job, relative to the working directory. When it
+        ends in .sarif.gz, the tool writes the uncompressed .sarif next to it and
+        compact_report converts it after the scan.
+        """
+        return None
+
+    def get_report_directory(self, job: ScanJob) -> str:
+        """
+        Returns the absolute directory of a job's report file, where the tool also
+        writes its log. The directory is created if it does not exist.
+        """
+        report_directory = os.path.abspath(os.path.dirname(self.get_report_file(job)))
+        os.makedirs(report_directory, exist_ok=True)
+        return report_directory
+
+    def compact_report(self, job: ScanJob) -> None:
+        """
+        Replaces the pretty-printed SARIF file written by the tool with the compact,
+        compressed report file of the job.
+        """
+        report_file = self.get_report_file(job)
+        if not report_file or not report_file.endswith(COMPRESSED_SUFFIX):
+            return
+
+        tool_file = report_file[:-len(".gz")]
+        if not os.path.isfile(tool_file):
+            return
+        try:
+            with tracer.span("sarif_compact", tool=self.name, repo=job.address):
+                compact_sarif(tool_file, report_file)
+        except (ValueError, OSError, EOFError) as e:
+            self.logger.warning("Could not compact {}: {}".format(tool_file, e))
+
+    def workspace(self, job: ScanJob, configs) -> ScanWorkspace:
+        """
+        Returns the workspace of a job: a private copy of the repository's tree,
+        without .git, to mount into the tool's container instead of the clone.
+
+        Usage:
+            with self.workspace(job, configs) as source_directory:
+                ...
+        """
+        return ScanWorkspace(
+            job.repository_directory,
+            configs.application.workspace_method,
+            configs.application.workspace_directory,
+            self.get_exclusions(job, configs),
+        )
+
+    def get_exclusions(self, job: ScanJob, configs) -> List[str]:
+        """
+        Returns the glob patterns, relative to the repository root, excluded from the
+        job's scan. Runners pass them to the tool's own exclusion mechanism.
+        """
+        return configs.exclusions.for_repository(job.address)
+
+    def tool_version(self, job: ScanJob) -> str:
+        """
+        Returns the version of the tool scanning the job, so that its results are
+        not reused once the tool is upgraded. Runners return image_version of their
+        images, or the version of their binary.
+        """
+        return ""
+
+    def image_version(self, *images: str) -> str:
+        """
+        Returns the local ids of the given images, which change when a tag such as
+        "latest" is pulled again. An image that is not pulled, or a host without
+        Docker, is identified by its name.
+        """
+        if self._image_ids is None:
+            self._image_ids = {}
+        for image in images:
+            if image not in self._image_ids:
+                try:
+                    inspect = subprocess.run(["docker", "image", "inspect", "--format", "{{.Id}}", image],
+                                             capture_output=True, text=True)
+                except OSError:
+                    inspect = None
+                self._image_ids[image] = inspect.stdout.strip() if inspect and inspect.returncode == 0 else image
+        return ",".join(self._image_ids[image] for image in images)
+
+    def cache_key(self, job: ScanJob, configs) -> str:
+        """
+        Returns a digest of the settings the job's result depends on: its exclusions
+        and the version of the tool. A resumed run, or an incremental scan, reuses a
+        result only if its key is unchanged.
+        """
+        settings = json.dumps([configs.exclusions.fingerprint(job.address), self.tool_version(job)])
+        return hashlib.sha256(settings.encode("utf-8")).hexdigest()[:16]
+
+    def plan_scan(self, job: ScanJob, configs) -> ScanPlan:
+        """
+        Decides whether the job needs a full scan, only a scan of the files changed
+        since the commit of its previous results, or none. For an incremental scan
+        the previous SARIF file is moved aside until finish_scan merges it.
+        """
+        report_file = self.get_report_file(job)
+        if not report_file or not configs.application.incremental:
+            return ScanPlan(ScanPlan.FULL)
+
+        plan = plan_scan(job.repository_directory, report_file, self.cache_key(job, configs), self.supports_incremental)
+        if plan.is_incremental:
+            plan.previous_report = os.path.join(os.path.dirname(report_file), ".previous-" + os.path.basename(report_file))
+            os.replace(report_file, plan.previous_report)
+            self.logger.info("Scanning {} changed files of {} since {}".format(
+                len(plan.changed_files), job.key, plan.previous_commit[:12]
+            ))
+        elif plan.mode == ScanPlan.FULL:
+            # The results are about to be replaced, they no longer match the recorded commit
+            state_file = os.path.join(os.path.dirname(report_file), SCAN_STATE_FILE)
+            if os.path.isfile(state_file):
+                os.remove(state_file)
+        return plan
+
+    def scan_targets(self, source_directory: str) -> Optional[List[str]]:
+        """
+        Returns the files, relative to the workspace, an incremental scan is restricted
+        to, or None for a full scan. Changed files that are excluded are left out.
+        """
+        if self.scan_plan is None or not self.scan_plan.is_incremental:
+            return None
+        return [path for path in self.scan_plan.changed_files if os.path.isfile(os.path.join(source_directory, path))]
+
+    def finish_scan(self, job: ScanJob, configs, plan: ScanPlan, success: bool) -> bool:
+        """
+        Merges the results of an incremental scan into the previous ones, or restores
+        them if the scan failed, and records the commit the results correspond to.
+
+        Returns:
+            bool: False if the scan failed or its results could not be merged.
+        """
+        report_file = self.get_report_file(job)
+        state_file = os.path.join(os.path.dirname(report_file or "."), SCAN_STATE_FILE)
+        if plan.is_incremental:
+            if success:
+                try:
+                    with tracer.span("sarif_merge", tool=self.name, repo=job.address):
+                        merge_sarif(plan.previous_report, report_file, set(plan.changed_files) | set(plan.deleted_files),
+                                    job.repo_id, report_file)
+                    os.remove(plan.previous_report)
+                except (ValueError, OSError, EOFError) as e:
+                    # Forget the recorded commit, so the next attempt runs a full scan
+                    self.logger.error("Could not merge the results of {}: {}".format(job.key, e))
+                    os.replace(plan.previous_report, report_file)
+                    os.remove(state_file)
+                    return False
+            else:
+                os.replace(plan.previous_report, report_file)
+
+        if success and plan.commit and report_file and os.path.isfile(report_file):
+            write_scan_state(report_file, plan.commit, self.cache_key(job, configs), plan.mode)
+        return success
+
+    def setup(self, configs) -> None:
+        """Prepares the tool before any job is submitted."""
+        pass
+
+    def pull_images(self, images: List[str]) -> None:
+        """
+        Pulls the tool's Docker images once, before the workers start, so that
+        concurrent containers do not each trigger the same download.
+        """
+        for image in images:
+            with tracer.span("image_pull", tool=self.name, image=image):
+                if os.system(f"docker pull --quiet {image}") != 0:
+                    self.logger.warning("Failed to pull {}".format(image))
+
+    def new_container_name(self) -> str:
+        """Returns a unique container name, so the container can be monitored while it runs."""
+        return "sast-{}-{}".format(self.name.lower(), uuid.uuid4().hex[:12])
+
+    def measure(self, container_name: Optional[str] = None) -> ResourceMonitor:
+        """
+        Returns a monitor measuring the tool's resource usage for the current job.
+        Runners wrap the tool invocation with it; the usage is saved next to the SARIF file.
+
+        Args:
+            container_name (Optional[str]): Name of the tool's container, or None for a local binary.
+        """
+        self.resource_monitor = ResourceMonitor(container_name)
+        return self.resource_monitor
+
+    def save_resource_usage(self, job: ScanJob) -> None:
+        """
+        Writes resource_usage.json, with the usage measured by the last monitor and
+        the size of the repository, next to the job's SARIF file.
+        """
+        monitor = getattr(self, "resource_monitor", None)
+        report_file = self.get_report_file(job)
+        if monitor is None or not monitor.usage or not report_file:
+            return
+
+        usage = dict(monitor.usage, tool=self.name, repository=repository_size(job.repository_directory))
+        os.makedirs(os.path.dirname(report_file), exist_ok=True)
+        with open(os.path.join(os.path.dirname(report_file), "resource_usage.json"), "w") as f:
+            json.dump(usage, f)
+
+    def teardown(self, configs) -> None:
+        """Releases the resources acquired by setup once every job has finished."""
+        pass
+
+    def get_jobs(self, configs) -> Iterator[ScanJob]:
+        """
+        Yields the jobs this node should run, longest expected first.
+
+        Without a shared queue these are the configured repositories (restricted to
+        the node's shard, if any). With a queue, the whole matrix of the tool is
+        seeded in that order and jobs are claimed one at a time, only when a worker
+        slot is free, so faster hosts naturally take more of the work. Failed jobs
+        of the queue are run again until they were claimed max_attempts times.
+        """
+        tool = type(self).__name__
+        jobs = JobPlanner(configs.job_history, configs.size_hints()).order(configs.get_scan_jobs(tool))
+        if configs.job_queue is None:
+            yield from jobs
+            return
+
+        configs.job_queue.seed(jobs, configs.application.max_attempts)
+        counts = configs.job_queue.counts(tool)
+        if not counts.get(configs.job_queue.QUEUED) and not counts.get(configs.job_queue.RUNNING):
+            self.logger.warning("The queue holds no {} job left to run ({}), use a new queue directory for a new run".format(
+                self.name, ", ".join("{} {}".format(count, state) for state, count in sorted(counts.items())) or "empty"
+            ))
+        while True:
+            self.process_manager.wait_for_slot()
+            job = configs.job_queue.claim(tool)
+            if job is None:
+                return
+            yield job
+
+    def should_skip(self, job: ScanJob, configs) -> bool:
+        """
+        Returns True if a resumed run already holds the result of the job, or if
+        the job has failed too many times to be retried.
+        """
+        journal = configs.journal
+        if journal is None or not journal.resume:
+            return False
+
+        if journal.is_done(job, self.cache_key(job, configs)):
+            self.logger.info("Skipping {}, already completed".format(job.key))
+            return True
+        if journal.attempts(job) >= configs.application.max_attempts:
+            self.logger.warning("Skipping {}, it failed {} times".format(job.key, journal.attempts(job)))
+            return True
+        return False
+
+    def execute_job(self, job: ScanJob, configs, submitted_at: Optional[float] = None) -> bool:
+        """
+        Worker process entry point: runs the scan, retrying failures with exponential
+        backoff, and records the outcome in the journal and the queue.
+
+        A job claimed from the queue first updates its repository's clone, which
+        nodes of a queue run do not clone up front, and keeps its lease alive while
+        it runs. If the lease was lost anyway, the job is reported as failed and its
+        outcome is left to the worker that claimed it again.
+
+        Returns:
+            bool: True if the job succeeded.
+        """
+        set_log_context(job=job.key, repo=job.address)
+        if submitted_at is not None:
+            tracer.record("queue_wait", submitted_at, time.time(), tool=self.name, repo=job.address)
+
+        if configs.job_queue is None:
+            with tracer.span("job", tool=self.name, repo=job.address):
+                return self._execute_with_retries(job, configs)
+
+        with configs.job_queue.keep_alive(job) as lost:
+            try:
+                self.update_repository(job, configs)
+            except Exception as e:
+                self.logger.exception("Could not update the repository of {}".format(job.key))
+                if configs.journal:
+                    configs.journal.record(job, configs.journal.FAILED, error="Could not update the repository: {!r}".format(e))
+                success = False
+            else:
+                set_log_context(job=job.key, repo=job.address)
+                with tracer.span("job", tool=self.name, repo=job.address):
+                    success = self._execute_with_retries(job, configs)
+
+        if not configs.job_queue.complete(job, success) or lost.is_set():
+            self.logger.warning("{} lost its lease to another worker, its results are left to that worker".format(job.key))
+            if configs.journal:
+                configs.journal.record(job, configs.journal.FAILED, error="Lease lost to another worker")
+            return False
+        return success
+
+    def update_repository(self, job: ScanJob, configs) -> None:
+        """
+        Clones or updates the job's repository, once per run on this host whatever
+        the number of tools scanning it. Used by the jobs of a queue, which clone only
+        the repositories this host claims.
+        """
+        entry = configs.find_repository(job.address)
+        GitHubManager().update_git_repositories(job.vulnerable, job.language, job.address,
+                                                entry.ref if entry else None, since=configs.started_at)
+
+    def _execute_with_retries(self, job: ScanJob, configs) -> bool:
+        journal = configs.journal
+        attempt = journal.attempts(job) if journal else 0
+
+        while True:
+            attempt += 1
+            if journal:
+                journal.record(job, journal.RUNNING)
+
+            error = None
+            self.resource_monitor = None
+            self.scan_plan = plan = self.plan_scan(job, configs)
+            if plan.is_unchanged:
+                self.logger.info("Results of {} are up to date with {}".format(job.key, plan.commit[:12]))
+                success = True
+            else:
+                started = time.monotonic()
+                try:
+                    success = self.scan(job, configs)
+                except Exception as e:
+                    self.logger.exception("Unexpected error when running {} for {}".format(self.name, job.key))
+                    success = False
+                    error = repr(e)
+                self.compact_report(job)
+                success = self.finish_scan(job, configs, plan, success)
+
+                # Incremental scans say nothing of the duration of the next full scan
+                if success and plan.mode == ScanPlan.FULL and configs.job_history is not None:
+                    configs.job_history.record(job, time.monotonic() - started, repository_bytes(job.repository_directory))
+
+            if success:
+                # Only full scans measure the tool on the whole repository
+                if plan.mode == ScanPlan.FULL:
+                    self.save_resource_usage(job)
+                if journal:
+                    journal.record(job, journal.DONE, sarif=self.get_report_file(job), cache_key=self.cache_key(job, configs))
+                break
+
+            if journal:
+                journal.record(job, journal.FAILED, error=error or "{} exited with an error".format(self.name))
+            if attempt >= configs.application.max_attempts:
+                self.logger.error("Giving up {} after {} attempts".format(job.key, attempt))
+                break
+
+            delay = configs.application.retry_backoff * 2 ** (attempt - 1)
+            self.logger.warning("Retrying {} in {} seconds (attempt {})".format(job.key, delay, attempt + 1))
+            time.sleep(delay)
+
+        return success
+
     def run(self, configs) -> None:
-        pass
\ No newline at end of file
+        """
+        Executes the scan for every job of this node based on provided configurations.
+
+        Args:
+            configs: The configurations containing information like vulnerable repos.
+        """
+        with tracer.span("setup", tool=self.name):
+            self.setup(configs)
+        try:
+            for job in self.get_jobs(configs):
+                if self.should_skip(job, configs):
+                    if configs.job_queue is not None:
+                        configs.job_queue.complete(job, configs.journal.is_done(job, self.cache_key(job, configs)))
+                    continue
+
+                self.logger.info("Running {} for repository: {}".format(self.name, job.address))
+                if configs.journal:
+                    configs.journal.record(job, configs.journal.QUEUED)
+                self.process_manager.add_worker(self.execute_job, (job, configs, time.time()))
+
+            self.process_manager.wait_for_all()
+        finally:
+            with tracer.span("teardown", tool=self.name):
+                self.teardown(configs)
@@ -0,0 +1,383 @@
+import importlib
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from adapter.logger import set_log_context
+from domain.entity.config import AppConfig
+from domain.entity.job import ScanJob
+from domain.use_case.scorecard import ScorecardBuilder
+
+# Addresses accepted for repositories that are not in config.json: https and ssh URLs
+_REPOSITORY_ADDRESS = re.compile(r"^(?!-|.*\.\.)(?:(?:https|ssh)://(?:[\w.-]+@)?[\w.-]+(?::\d+)?/|[\w.-]+@[\w.-]+:)[\w.~-]+(?:/[\w.~-]+)*/?$")
+
+def _run_job(runner, job: ScanJob, configs, submitted_at: float) -> None:
+    """Worker process entry point of the daemon. The exit code tells whether the job succeeded."""
+    sys.exit(0 if runner.execute_job(job, configs, submitted_at) else 1)
+
+@dataclass
+class Submission:
+    QUEUED = "queued"
+    PREPARING = "preparing"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    id: str
+    repository: str
+    vulnerable: bool
+    language: str
+    # Commit, tag or branch the repository is pinned to
+    ref: Optional[str]
+    # "api" for the jobs submitted through the API, "config" for those scheduled by a change of config.json
+    source: str
+    submitted_at: float
+    # tool -> {"job", "state", "process", "started_at", "finished_at", "error"}
+    jobs: Dict[str, dict] = field(default_factory=dict)
+
+    def refresh(self) -> None:
+        """Updates the state of the jobs whose worker process has exited."""
+        for entry in self.jobs.values():
+            process = entry.get("process")
+            if entry["state"] == self.RUNNING and process is not None and process.exitcode is not None:
+                entry["state"] = self.DONE if process.exitcode == 0 else self.FAILED
+                entry["finished_at"] = time.time()
+
+    @property
+    def state(self) -> str:
+        states = {entry["state"] for entry in self.jobs.values()}
+        for state in (self.PREPARING, self.RUNNING, self.QUEUED, self.FAILED):
+            if state in states:
+                return state
+        return self.DONE
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "repository": self.repository,
+            "vulnerable": self.vulnerable,
+            "language": self.language,
+            "ref": self.ref,
+            "source": self.source,
+            "state": self.state,
+            "submitted_at": self.submitted_at,
+            "jobs": {
+                tool: {"job": entry["job"].key, **{key: value for key, value in entry.items()
+                                                   if key not in ("job", "process") and value is not None}}
+                for tool, entry in self.jobs.items()
+            },
+        }
+
+class BenchmarkDaemon:
+    def __init__(self, configs: AppConfig, config_path: str, logger, process_manager, github,
+                 scorecards: Optional[ScorecardBuilder] = None, watch_interval: float = 2.0):
+        """
+        Initialize the BenchmarkDaemon.
+
+        Keeps the benchmark running between scans: runners are set up once, so their
+        images stay pulled and the SonarQube server stays up, the concurrency
+        controller persists, and parsed results are cached by the scorecard builder.
+        Jobs are submitted per repository and dispatched by a scheduler thread, which
+        updates the clone and then forks one worker process per tool. Workers are not
+        reused, and each scan still starts its tool's container. config.json and the corpus manifest are watched, and repositories
+        added to them, or whose pinned ref or exclusions changed, are scheduled for
+        the enabled tools.
+
+        Args:
+            configs (AppConfig): The application configuration.
+            config_path (str): Path of config.json, watched for changes.
+            logger: The application logger.
+            process_manager (ProcessManager): Runs the jobs.
+            github (GitHubManager): Clones and updates the repositories.
+            scorecards (Optional[ScorecardBuilder]): Summarizes the results of the jobs.
+            watch_interval (float): Seconds between two checks of config.json and the manifest.
+        """
+        self.configs = configs
+        self.config_path = config_path
+        self.logger = logger
+        self.process_manager = process_manager
+        self.github = github
+        self.scorecards = scorecards or ScorecardBuilder()
+        self.watch_interval = watch_interval
+
+        self.submissions: Dict[str, Submission] = {}
+        self._runners: Dict[str, object] = {}
+        self._ready = set()
+        self._pending: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.RLock()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._config_version = self._config_mtime(configs)
+        self._known_jobs = self._job_fingerprints(configs)
+
+    def start(self) -> None:
+        """Sets up every enabled runner, then starts the scheduler and the config.json watcher."""
+        for tool in self.configs.application.runners:
+            try:
+                self.ready_runner(tool)
+            except Exception:
+                self.logger.exception("Could not set up {}".format(tool))
+
+        for target in (self._schedule, self._watch_config):
+            thread = threading.Thread(target=target, name=target.__name__.strip("_"), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stops scheduling, waits for the running jobs and tears the runners down."""
+        self._stopping.set()
+        self._pending.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.process_manager.wait_for_all()
+        for tool in list(self._ready):
+            try:
+                self._runners[tool].teardown(self.configs)
+            except Exception:
+                self.logger.exception("Could not tear down {}".format(tool))
+
+    def runner(self, tool: str):
+        """Returns the runner of a tool, without setting it up."""
+        with self._lock:
+            if tool not in self._runners:
+                settings = self.configs.application.runners.get(tool)
+                if settings is None:
+                    raise ValueError("Unknown or disabled tool {}, enabled: {}".format(
+                        tool, ", ".join(self.configs.application.runners)
+                    ))
+                module = importlib.import_module(settings["module_name"])
+                self._runners[tool] = getattr(module, settings["class_name"])(self.logger, self.process_manager)
+            return self._runners[tool]
+
+    def ready_runner(self, tool: str):
+        """Returns the runner of a tool, set up on first use."""
+        with self._lock:
+            runner = self.runner(tool)
+            if tool not in self._ready:
+                self.logger.info("Setting up {}".format(runner.name))
+                runner.setup(self.configs)
+                self._ready.add(tool)
+            return runner
+
+    def submit(self, repository: str, tools: Optional[List[str]] = None, language: Optional[str] = None,
+               vulnerable: Optional[bool] = None, source: str = "api") -> dict:
+        """
+        Schedules the scan of a repository.
+
+        Args:
+            repository (str): Address of the repository.
+            tools (Optional[List[str]]): Class names of the runners. Defaults to every enabled runner.
+            language (Optional[str]): Language of the repository, required if it is not in config.json.
+                It must be one of the filtered languages.
+            vulnerable (Optional[bool]): Whether the repository is vulnerable, required if it is not in config.json.
+            source (str): What submitted the jobs.
+
+        Raises:
+            ValueError: If the repository is unknown and its address is not an https or ssh URL, its language
+                is not given or not filtered, or a tool is not enabled.
+        """
+        with self._lock:
+            configured = self.configs.find_repository(repository)
+            ref = None
+            if configured is not None:
+                repository = configured.url  # As spelled in the corpus, which names its results
+                vulnerable, language, ref = configured.vulnerable, self.configs.language_of(configured), configured.ref
+            elif language is None or vulnerable is None:
+                raise ValueError("{} is not in {}, its language and vulnerable flag are required".format(
+                    repository, self.config_path
+                ))
+            elif not _REPOSITORY_ADDRESS.match(repository):
+                raise ValueError("{} is not in {} and is not an https or ssh URL".format(repository, self.config_path))
+            elif language not in self.configs.application.filter_languages:
+                raise ValueError("Language {} is not one of {}".format(
+                    language, ", ".join(self.configs.application.filter_languages)
+                ))
+            elif not isinstance(vulnerable, bool):
+                raise ValueError("vulnerable must be true or false")
+
+            tools = list(tools or self.configs.application.runners)
+            for tool in tools:
+                self.runner(tool)
+
+            submission = Submission(uuid.uuid4().hex[:12], repository, bool(vulnerable), language, ref, source, time.time())
+            for tool in tools:
+                submission.jobs[tool] = {"job": ScanJob(tool, bool(vulnerable), language, repository),
+                                         "state": Submission.QUEUED}
+            self.submissions[submission.id] = submission
+
+        self.logger.info("Submission {} ({}): {} with {}".format(submission.id, source, repository, ", ".join(tools)))
+        self._pending.put(submission.id)
+        return submission.to_dict()
+
+    def status(self, submission_id: Optional[str] = None):
+        """Returns a submission, None if it is unknown, or every submission if no id is given."""
+        with self._lock:
+            if submission_id is None:
+                for submission in self.submissions.values():
+                    submission.refresh()
+                return [submission.to_dict() for submission in self.submissions.values()]
+            submission = self.submissions.get(submission_id)
+            if submission is None:
+                return None
+            submission.refresh()
+            return submission.to_dict()
+
+    def scorecard(self, submission_id: str) -> Optional[dict]:
+        """Returns the status of a submission with the scorecard of each of its jobs."""
+        status = self.status(submission_id)
+        if status is None:
+            return None
+        submission = self.submissions[submission_id]
+        status["scorecards"] = [
+            self.scorecards.build(entry["job"], self.runner(tool).get_report_file(entry["job"]))
+            for tool, entry in submission.jobs.items()
+        ]
+        return status
+
+    def repository_scorecard(self, repository: str) -> dict:
+        """
+        Returns the scorecards of a configured repository for every enabled tool, from
+        the results on disk.
+
+        Raises:
+            ValueError: If the repository is not in config.json.
+        """
+        configured = self.configs.find_repository(repository)
+        if configured is None:
+            raise ValueError("{} is not in {}".format(repository, self.config_path))
+        scorecards = []
+        for tool in self.configs.application.runners:
+            job = ScanJob(tool, configured.vulnerable, self.configs.language_of(configured), repository)
+            scorecards.append(self.scorecards.build(job, self.runner(tool).get_report_file(job)))
+        return {"repository": repository, "scorecards": scorecards}
+
+    def _running_process(self, job: ScanJob):
+        """Returns the worker process running a job for another submission, if any."""
+        for submission in self.submissions.values():
+            submission.refresh()
+            for entry in submission.jobs.values():
+                if entry["job"] == job and entry["state"] == Submission.RUNNING:
+                    return entry["process"]
+        return None
+
+    def _schedule(self) -> None:
+        """Scheduler thread: prepares and dispatches the submissions in order."""
+        while True:
+            submission_id = self._pending.get()
+            if submission_id is None or self._stopping.is_set():
+                return
+            try:
+                self._dispatch(self.submissions[submission_id])
+            except Exception:
+                self.logger.exception("Could not dispatch submission {}".format(submission_id))
+
+    def _dispatch(self, submission: Submission) -> None:
+        with self._lock:
+            for entry in submission.jobs.values():
+                entry["state"] = Submission.PREPARING
+
+        try:
+            self.github.update_git_repositories(submission.vulnerable, submission.language, submission.repository,
+                                                submission.ref)
+            error = None
+        except Exception as e:
+            error = "Could not update the repository: {}".format(e)
+            self.logger.error("{} of submission {}".format(error, submission.id))
+        finally:
+            # The clone tags the records of this process with its repository, unlike in the workers
+            # the context would outlive it and tag every record of the daemon
+            set_log_context()
+
+        for tool, entry in submission.jobs.items():
+            job = entry["job"]
+            if error is None:
+                try:
+                    runner = self.ready_runner(tool)
+                except Exception as e:
+                    self.logger.exception("Could not set up {}".format(tool))
+                    entry.update(state=Submission.FAILED, error="Could not set up {}: {}".format(tool, e))
+                    continue
+            else:
+                entry.update(state=Submission.FAILED, error=error)
+                continue
+
+            with self._lock:
+                # Two workers writing the same results would corrupt them, follow the running one instead
+                process = self._running_process(job)
+                if process is not None:
+                    entry.update(state=Submission.RUNNING, process=process, started_at=time.time())
+                    continue
+
+            if self.configs.journal:
+                self.configs.journal.record(job, self.configs.journal.QUEUED)
+            process = self.process_manager.add_worker(_run_job, (runner, job, self.configs, time.time()))
+            with self._lock:
+                entry.update(state=Submission.RUNNING, process=process, started_at=time.time())
+            self.process_manager.clean_up()
+
+    @staticmethod
+    def _job_fingerprints(configs: AppConfig) -> Dict[str, Tuple[str, Optional[str], str]]:
+        """Returns, for each job of the configuration, its repository, pinned ref and exclusion fingerprint."""
+        refs = {entry.url: entry.ref for entry in configs.iter_repositories()}
+        return {
+            job.key: (job.address, refs.get(job.address), configs.exclusions.fingerprint(job.address))
+            for tool in configs.application.runners
+            for job in configs.get_scan_jobs(tool)
+        }
+
+    def _config_mtime(self, configs: AppConfig) -> Tuple[Optional[int], ...]:
+        """Returns the modification times of config.json and of the corpus manifest."""
+        versions = []
+        for path in (self.config_path, configs.corpus.manifest):
+            try:
+                versions.append(os.stat(path).st_mtime_ns if path else None)
+            except OSError:
+                versions.append(None)
+        return tuple(versions)
+
+    def _watch_config(self) -> None:
+        """Watcher thread: reloads the configuration when it changes and schedules the new or changed jobs."""
+        while not self._stopping.wait(self.watch_interval):
+            version = self._config_mtime(self.configs)
+            if version == self._config_version:
+                continue
+            self._config_version = version
+            try:
+                with open(self.config_path, "r", encoding="utf-8") as f:
+                    configs = AppConfig(json.load(f))
+                self.reload(configs)
+            except (OSError, ValueError, TypeError, KeyError) as e:
+                self.logger.error("Ignoring invalid configuration: {}".format(e))
+                continue
+            self._config_version = self._config_mtime(self.configs)
+
+    def reload(self, configs: AppConfig) -> None:
+        """
+        Replaces the configuration, then schedules the jobs that are new or whose
+        pinned ref or exclusions changed, one submission per repository.
+        """
+        configs.shard = self.configs.shard
+        configs.job_queue = self.configs.job_queue
+        configs.journal = self.configs.journal
+        configs.job_history = self.configs.job_history
+
+        known_jobs = self._job_fingerprints(configs)
+        changed: Dict[str, List[str]] = {}
+        for tool in configs.application.runners:
+            for job in configs.get_scan_jobs(tool):
+                if self._known_jobs.get(job.key) != known_jobs[job.key]:
+                    changed.setdefault(job.address, []).append(tool)
+
+        with self._lock:
+            self.configs = configs
+            self._known_jobs = known_jobs
+        self.logger.info("Reloaded {}, {} repositories to scan".format(self.config_path, len(changed)))
+        for repository, tools in changed.items():
+            self.submit(repository, tools, source="config")
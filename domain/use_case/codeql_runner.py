@@ -1,21 +1,31 @@
+import json
 import os
 import logging
+from adapter.executor import run_command
+from adapter.tracing import tracer
+from domain.entity.job import ScanJob
 from domain.interface.sast_runner import SastRunner
 
 class CodeQLRunner(SastRunner):
+    name = "CodeQL"
+
     def __init__(self, logger, process_manager):
         self.logger = logger
         self.process_manager = process_manager
+        self.docker_image = "mcr.microsoft.com/cstsectools/codeql-container"
+
+    def tool_version(self, job: ScanJob) -> str:
+        return self.image_version(self.docker_image)
 
-    def run_codeql_scan(self, vulnerable: bool, language: str, address: str) -> None:
+    def run_codeql_scan(self, job: ScanJob, source_directory: str, exclusions=()) -> bool:
         """
         Run CodeQL scan on the given repository.
-        :param vulnerable: True if repository is vulnerable, False if repository is non-vulnerable
-        :param language: Programming language of the repository
-        :param address: Git repository address
-        :return: None
+        :param job: The repository to scan
+        :param source_directory: The job's workspace, writable as compiled languages are built in place
+        :param exclusions: Glob patterns to skip, written as paths-ignore of a CodeQL configuration file
+        :return: True if the scan succeeded or the language is not supported
         """
-        current_directory = os.getcwd()
+        language = job.language
         code_ql_languages = {
             "JS_TS": "javascript",
             "Python": "python",
@@ -29,52 +39,46 @@ class CodeQLRunner(SastRunner):
         
         if language not in code_ql_languages:
             logging.error(f"Unsupported language: {language}")
-            return
+            return True
         
-        repo_name = address.split("/")[-1]
-        if vulnerable:
-            repo_directory = f"repositories/vulnerable/{language}/{repo_name}"
-            report_dir = f"/src/scan_results/codeql_scan/vulnerable/{language}/{repo_name}"
-        else:
-            repo_directory = f"repositories/non-vulnerable/{language}/{repo_name}"
-            report_dir = f"/src/scan_results/codeql_scan/non-vulnerable/{language}/{repo_name}"
+        repo_directory = job.repository_directory
+        report_dir = self.get_report_directory(job)
+        log_file = os.path.join(report_dir, "codeql.log.gz")
 
-        project_directory = f"/src/{repo_directory}"
+        config_argument = ""
+        if exclusions:
+            with open(os.path.join(report_dir, "codeql-config.yml"), "w") as f:
+                f.write("paths-ignore:\n")
+                for pattern in exclusions:
+                    f.write("  - {}\n".format(json.dumps(pattern)))
+            config_argument = "--codescanning-config=/report/codeql-config.yml "
 
         # Run the CodeQL scan using Docker
-        exit_code = os.system(
-            f"docker run --rm -it --privileged "
-            f"-v {current_directory}:/src:Z --entrypoint /bin/bash mcr.microsoft.com/cstsectools/codeql-container "
-            f"-c \"mkdir -p {report_dir} "
-            f"&& cd {project_directory} "
-            f"&& codeql database create  /tmp/database --language={code_ql_languages[language]} --overwrite "
-            f"&& codeql database analyze /tmp/database --format sarifv2.1.0 -o {report_dir}/report.sarif\""
-        )
+        container_name = self.new_container_name()
+        command = [
+            "docker", "run", "--rm", "--privileged", "--name", container_name,
+            "-v", f"{source_directory}:/src:Z",
+            "-v", f"{report_dir}:/report:Z",
+            "--entrypoint", "/bin/bash", self.docker_image,
+            "-c", f"cd /src "
+                  f"&& codeql database create  /tmp/database --language={code_ql_languages[language]} --overwrite {config_argument}"
+                  f"&& codeql database analyze /tmp/database --format sarifv2.1.0 -o /report/report.sarif"
+        ]
+        with tracer.span("analysis", tool=self.name, repo=job.address), self.measure(container_name):
+            result = run_command(command, log_file)
 
-        if exit_code == 0:
+        if result.returncode == 0:
             self.logger.info("Success when running codeql for {}".format(repo_directory))
         else:
-            self.logger.error("Error when running codeql for {}".format(repo_directory))
-    
-    def run(self, configs) -> None:
-        """
-        Executes the CodeQL scan for repositories based on provided configurations.
-
-        Args:
-            configs: The configurations containing information like vulnerable repos.
-        """
-        for language in configs.repos.vulnerable:
-            self.logger.info("Running CodeQL for language {}".format(language))
-            for repository in configs.repos.vulnerable[language]:
-                self.logger.info("Running CodeQL for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_codeql_scan, (True, language, repository))
-
-        for language in configs.repos.non_vulnerable:
-            self.logger.info("Running CodeQL for language {}".format(language))
-            for repository in configs.repos.non_vulnerable[language]:
-                self.logger.info("Running CodeQL for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_codeql_scan, (False, language, repository))
+            self.logger.error("Error when running codeql for {}, see {}:\n{}".format(repo_directory, log_file, result.tail))
+        return result.returncode == 0
 
-        self.process_manager.wait_for_all()
+    def scan(self, job: ScanJob, configs) -> bool:
+        with self.workspace(job, configs) as source_directory:
+            return self.run_codeql_scan(job, source_directory, self.get_exclusions(job, configs))
 
+    def setup(self, configs) -> None:
+        self.pull_images([self.docker_image])
 
+    def get_report_file(self, job: ScanJob) -> str:
+        return os.path.join("scan_results", "codeql_scan", job.category, job.language, job.repo_id, "report.sarif.gz")
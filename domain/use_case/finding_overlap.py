@@ -0,0 +1,196 @@
+import hashlib
+import os
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from adapter.sarif_io import relative_uri
+from domain.entity.finding import Finding
+
+CWE_PATTERN = re.compile(r"cwe[-_/: ]*0*(\d+)", re.IGNORECASE)
+
+@lru_cache(maxsize=256)
+def _read_lines(path: str) -> Tuple[str, ...]:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return tuple(f.read().splitlines())
+    except OSError:
+        return ()
+
+def iter_sarif_results(sarif_data: dict) -> Iterable[Tuple[str, dict, dict]]:
+    """
+    Yields (driver name, rule, result) for every result of a SARIF document. Rules
+    are looked up in a per-run dictionary rather than by scanning the rule list.
+    """
+    for run in sarif_data.get("runs", []):
+        driver = run.get("tool", {}).get("driver", {})
+        rules = {rule.get("id"): rule for rule in driver.get("rules", [])}
+        for result in run.get("results", []):
+            yield driver.get("name", "N/A"), rules.get(result.get("ruleId"), {}), result
+
+class FindingFingerprinter:
+    def __init__(self, repositories_dir: str = "repositories", line_bucket: int = 5):
+        """
+        Initialize the FindingFingerprinter.
+
+        The fingerprint of a finding identifies the same issue across tools: it is
+        derived from the normalized path, the CWE and, when the flagged source line
+        can be read, a hash of that line with whitespace collapsed, which keeps it
+        stable when lines shift. Without source, the line bucket is used instead.
+
+        Args:
+            repositories_dir (str): Root of the cloned repositories, used to read flagged lines.
+            line_bucket (int): Number of lines grouped into one bucket when no snippet is available.
+        """
+        self.repositories_dir = repositories_dir
+        self.line_bucket = line_bucket
+
+    @staticmethod
+    def normalize_path(uri: str, repo_name: str) -> str:
+        """
+        Reduces the location reported by a tool to a path relative to the repository root.
+        """
+        return relative_uri(uri, repo_name)
+
+    @staticmethod
+    def extract_cwe(rule: dict, result: dict) -> Optional[str]:
+        """Returns the lowest CWE referenced by the result or its rule, e.g. "CWE-89"."""
+        candidates = []
+        for source in (result.get("properties", {}), rule.get("properties", {})):
+            for key in ("tags", "cwe", "security-severity-cwe"):
+                values = source.get(key, [])
+                for value in values if isinstance(values, list) else [values]:
+                    candidates.extend(int(number) for number in CWE_PATTERN.findall(str(value)))
+        return "CWE-{}".format(min(candidates)) if candidates else None
+
+    @staticmethod
+    def _normalize_snippet(text: str) -> Optional[str]:
+        text = " ".join(text.split())
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16] if text else None
+
+    def snippet_hash(self, repo_root: Optional[str], path: str, line: Optional[int], region: dict) -> Optional[str]:
+        """
+        Hashes the flagged line, read from the checked out repository when possible
+        so every tool hashes the same text, otherwise from the SARIF snippet.
+        """
+        if repo_root and line:
+            lines = _read_lines(os.path.join(repo_root, path))
+            if 0 < line <= len(lines):
+                return self._normalize_snippet(lines[line - 1])
+
+        snippet = region.get("snippet", {}).get("text")
+        return self._normalize_snippet(snippet.splitlines()[0]) if snippet and snippet.strip() else None
+
+    def fingerprint(self, finding: Finding) -> str:
+        if finding.snippet_hash:
+            anchor = "s:" + finding.snippet_hash
+        elif finding.line is not None:
+            anchor = "l:{}".format(finding.line // self.line_bucket)
+        else:
+            anchor = "-"
+        key = "|".join((finding.path, finding.cwe or "", anchor))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def findings_from_sarif(self, sarif_data: dict, tool: str, vuln_status: str,
+                            language: str, repository: str) -> List[Finding]:
+        """
+        Builds fingerprinted findings from a SARIF document.
+
+        Args:
+            sarif_data (dict): The parsed SARIF document.
+            tool (str): Name of the tool, as used in the report.
+            vuln_status (str): "vulnerable" or "non-vulnerable".
+            language (str): Language of the repository.
+            repository (str): Name of the repository.
+        """
+        repo_root = os.path.join(self.repositories_dir, vuln_status, language, repository)
+        if not os.path.isdir(repo_root):
+            repo_root = None
+
+        findings = []
+        for _, rule, result in iter_sarif_results(sarif_data):
+            location = (result.get("locations") or [{}])[0].get("physicalLocation", {})
+            region = location.get("region", {})
+            line = region.get("startLine")
+            line = line if isinstance(line, int) else None
+            path = self.normalize_path(location.get("artifactLocation", {}).get("uri", ""), repository)
+
+            finding = Finding(
+                tool=tool,
+                rule_id=result.get("ruleId", "N/A"),
+                level=result.get("level", rule.get("defaultConfiguration", {}).get("level", "N/A")),
+                message=result.get("message", {}).get("text", ""),
+                path=path,
+                line=line,
+                cwe=self.extract_cwe(rule, result),
+                snippet_hash=self.snippet_hash(repo_root, path, line, region),
+                partial_fingerprints=result.get("partialFingerprints", {}),
+            )
+            finding.fingerprint = self.fingerprint(finding)
+            findings.append(finding)
+        return findings
+
+class OverlapAnalyzer:
+    def __init__(self):
+        """
+        Initialize the OverlapAnalyzer.
+
+        Findings are indexed by fingerprint in a hash map per repository, so the
+        overlap between all tools is computed in a single pass over the findings
+        instead of comparing every pair of tools.
+        """
+        # repository key -> fingerprint -> tools that reported it
+        self.index: Dict[Tuple, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        # repository key -> tool -> distinct findings, deduplicated across SARIF files and runs
+        self.distinct: Dict[Tuple, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.tools: Set[str] = set()
+
+    def add(self, repository: Tuple, findings: Iterable[Finding]) -> None:
+        """
+        Indexes the findings of one tool on one repository.
+
+        Args:
+            repository (Tuple): Key of the repository, e.g. (language, name, vuln_status).
+            findings (Iterable[Finding]): Fingerprinted findings.
+        """
+        index = self.index[repository]
+        distinct = self.distinct[repository]
+        for finding in findings:
+            self.tools.add(finding.tool)
+            index[finding.fingerprint].add(finding.tool)
+            distinct[finding.tool].add(finding.dedupe_key)
+
+    def summarize(self, repository: Optional[Tuple] = None) -> dict:
+        """
+        Summarizes the overlap of one repository, or of every repository when None.
+
+        Returns:
+            dict: "tools" (sorted tool names), "per_tool" (distinct findings, issues
+            and issues found only by the tool), "shared_by" (number of issues found
+            by exactly k tools) and "matrix" (issues found by both tools of each pair).
+        """
+        repositories = [repository] if repository is not None else list(self.index)
+        per_tool = {tool: {"findings": 0, "issues": 0, "unique": 0} for tool in self.tools}
+        shared_by: Counter = Counter()
+        matrix = {a: {b: 0 for b in self.tools} for a in self.tools}
+
+        for key in repositories:
+            for tool, dedupe_keys in self.distinct[key].items():
+                per_tool[tool]["findings"] += len(dedupe_keys)
+            for tools in self.index[key].values():
+                shared_by[len(tools)] += 1
+                for a in tools:
+                    per_tool[a]["issues"] += 1
+                    if len(tools) == 1:
+                        per_tool[a]["unique"] += 1
+                    for b in tools:
+                        matrix[a][b] += 1
+
+        names = sorted(tool for tool in self.tools if per_tool[tool]["findings"])
+        return {
+            "tools": names,
+            "per_tool": {tool: per_tool[tool] for tool in names},
+            "shared_by": dict(sorted(shared_by.items())),
+            "matrix": {a: {b: matrix[a][b] for b in names} for a in names},
+        }
@@ -2,6 +2,11 @@ import os
 import json
 from jinja2 import Template
 
+from adapter.sarif_io import is_sarif_file, load_sarif
+from adapter.tracing import tracer
+from domain.use_case.finding_overlap import FindingFingerprinter, OverlapAnalyzer, iter_sarif_results
+from domain.use_case.ground_truth import GroundTruthScorer
+
 class SarifReportGenerator:
     """Generates an HTML report from SARIF files in a specified directory structure."""
 
@@ -19,16 +24,75 @@ class SarifReportGenerator:
             ul { list-style-type: none; padding-left: 20px; }
             li { margin-bottom: 10px; }
             .issue { margin-left: 20px; font-size: 14px; color: #444; }
+            table { border-collapse: collapse; font-size: 14px; }
+            th, td { border: 1px solid #ccc; padding: 4px 8px; text-align: right; }
+            th:first-child, td:first-child, th:nth-child(2), td:nth-child(2) { text-align: left; }
         </style>
     </head>
     <body>
         <h1>SARIF Analysis Report</h1>
+        {% if performance %}
+            <h2>Tool Performance</h2>
+            <table>
+                <tr>
+                    <th>Tool</th><th>Language</th><th>Repositories</th><th>Files</th><th>LOC</th>
+                    <th>Wall time (s)</th><th>CPU time (s)</th><th>Max peak RSS (MiB)</th>
+                    <th>Findings</th><th>Findings/s</th><th>kLOC/s</th>
+                </tr>
+                {% for row in performance %}
+                <tr>
+                    <td>{{ row.tool }}</td><td>{{ row.language }}</td><td>{{ row.repositories }}</td>
+                    <td>{{ row.files }}</td><td>{{ row.loc }}</td>
+                    <td>{{ "%.1f" | format(row.wall_seconds) }}</td><td>{{ "%.1f" | format(row.cpu_seconds) }}</td>
+                    <td>{{ "%.0f" | format(row.peak_rss_mib) }}</td><td>{{ row.findings }}</td>
+                    <td>{{ "%.2f" | format(row.findings_per_second) }}</td><td>{{ "%.2f" | format(row.kloc_per_second) }}</td>
+                </tr>
+                {% endfor %}
+            </table>
+        {% endif %}
+        {% if overlap.tools %}
+            <h2>Tool Overlap</h2>
+            <p>Findings of different tools are matched by fingerprint (normalized path, CWE and the hash of the flagged line, or its line bucket).</p>
+            <table>
+                <tr><th>Tool</th><th>Distinct findings</th><th>Issues</th><th>Found only by this tool</th>
+                {% for other in overlap.tools %}<th>Shared with {{ other }}</th>{% endfor %}</tr>
+                {% for tool in overlap.tools %}
+                <tr>
+                    <td>{{ tool }}</td><td>{{ overlap.per_tool[tool].findings }}</td>
+                    <td>{{ overlap.per_tool[tool].issues }}</td><td>{{ overlap.per_tool[tool].unique }}</td>
+                    {% for other in overlap.tools %}<td>{{ overlap.matrix[tool][other] if other != tool else "-" }}</td>{% endfor %}
+                </tr>
+                {% endfor %}
+            </table>
+            <p>Issues found by exactly k tools:
+            {% for k, count in overlap.shared_by.items() %}k={{ k }}: {{ count }}{% if not loop.last %}, {% endif %}{% endfor %}</p>
+        {% endif %}
+        {% if ground_truth %}
+            <h2>Ground Truth</h2>
+            <p>Findings on vulnerable repositories with a ground-truth manifest, matched by file, line range and CWE family. The lists are in ground_truth_results.json.</p>
+            <table>
+                <tr><th>Tool</th><th>Repositories</th><th>True positives</th><th>False negatives</th>
+                <th>False positives</th><th>Precision</th><th>Recall</th></tr>
+                {% for row in ground_truth %}
+                <tr>
+                    <td>{{ row.tool }}</td><td>{{ row.repositories }}</td><td>{{ row.true_positives }}</td>
+                    <td>{{ row.false_negatives }}</td><td>{{ row.false_positives }}</td>
+                    <td>{{ "%.2f" | format(row.precision) }}</td><td>{{ "%.2f" | format(row.recall) }}</td>
+                </tr>
+                {% endfor %}
+            </table>
+        {% endif %}
         {% for language, repositories in data.items() %}
             <h2>Language: {{ language }}</h2>
             {% for repository, vulnerability_data in repositories.items() %}
                 <h3>Repository: {{ repository }}</h3>
                 {% for vuln_status, tools in vulnerability_data.items() %}
                     <h4>{{ vuln_status | capitalize }}</h4>
+                    {% set repo_overlap = repository_overlap[(language, repository, vuln_status)] %}
+                    {% if repo_overlap.tools | length > 1 %}
+                        <p>Found only by: {% for tool in repo_overlap.tools %}{{ tool }} {{ repo_overlap.per_tool[tool].unique }}/{{ repo_overlap.per_tool[tool].issues }}{% if not loop.last %}, {% endif %}{% endfor %}.
+                        Issues found by exactly k tools: {% for k, count in repo_overlap.shared_by.items() %}k={{ k }}: {{ count }}{% if not loop.last %}, {% endif %}{% endfor %}.</p>
+                    {% endif %}
                     {% for tool, findings in tools.items() %}
                         <h5>Tool: {{ tool }}. Number of findings:{{ findings | length }}</h5>
                         <ul>
@@ -44,40 +108,83 @@ class SarifReportGenerator:
     </html>
     """
 
-    def __init__(self, base_dir):
+    def __init__(self, base_dir, repositories_dir="repositories", ground_truth=None):
         """
         Initialize the SARIF report generator.
         
         Args:
             base_dir (str): Base directory containing SARIF files organized by tool.
+            repositories_dir (str): Base directory of the cloned repositories, used to
+                fingerprint findings on the flagged source lines.
+            ground_truth (GroundTruthScorer): Scores the findings on vulnerable repositories
+                against their manifests. Defaults to the manifests of "ground_truth".
         """
         self.base_dir = base_dir
+        self.fingerprinter = FindingFingerprinter(repositories_dir)
+        self.overlap = OverlapAnalyzer()
+        self.ground_truth = ground_truth or GroundTruthScorer()
+
+    def load_sarif(self, file_path):
+        """Load a SARIF file, compressed (.sarif.gz, .sarif.xz) or not."""
+        return load_sarif(file_path)
 
     def parse_sarif_file(self, file_path):
         """Parse a SARIF file and extract findings."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            sarif_data = json.load(f)
+        return self.format_findings(self.load_sarif(file_path))
 
+    def format_findings(self, sarif_data):
+        """Format the results of a SARIF document as sorted report lines."""
         findings = []
-        runs = sarif_data.get("runs", [])
-        for run in runs:
-            results = run.get("results", [])
-            for result in results:
-                rule_id = result.get("ruleId", "N/A")
-                message = result.get("message", {}).get("text", "No message provided")
-                if run['tool']['driver']['name'] == 'CodeQL':
-                    level = [rule for rule in run['tool']['driver']['rules'] if rule['id'] == rule_id][0].get("defaultConfiguration", {}).get("level", "N/A")
-                else: 
-                    level = result.get("level", "N/A")
-                location = result.get("locations", [{}])[0].get("physicalLocation", {}).get("artifactLocation", {}).get("uri", "N/A")
-                line = result.get("locations", [{}])[0].get("physicalLocation", {}).get("region", {}).get("startLine", "N/A")
-                findings.append(f"[{level}] Rule {rule_id}: {message} At {location} , Line {line}")
+        for driver_name, rule, result in iter_sarif_results(sarif_data):
+            rule_id = result.get("ruleId", "N/A")
+            message = result.get("message", {}).get("text", "No message provided")
+            if driver_name == 'CodeQL':
+                level = rule.get("defaultConfiguration", {}).get("level", "N/A")
+            else: 
+                level = result.get("level", "N/A")
+            location = result.get("locations", [{}])[0].get("physicalLocation", {}).get("artifactLocation", {}).get("uri", "N/A")
+            line = result.get("locations", [{}])[0].get("physicalLocation", {}).get("region", {}).get("startLine", "N/A")
+            findings.append(f"[{level}] Rule {rule_id}: {message} At {location} , Line {line}")
 
         return sorted(findings)
 
+    def build_performance_table(self, usages):
+        """
+        Aggregates the resource usage of every scan per tool and language.
+
+        Args:
+            usages (list): (tool, language, usage, number of findings) tuples, where
+                usage is the content of a resource_usage.json file.
+
+        Returns:
+            list: One row per tool and language, sorted by tool then language.
+        """
+        rows = {}
+        for tool, language, usage, findings in usages:
+            row = rows.setdefault((tool, language), {
+                "tool": tool, "language": language, "repositories": 0, "files": 0, "loc": 0,
+                "wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_mib": 0.0, "findings": 0,
+            })
+            repository = usage.get("repository", {})
+            row["repositories"] += 1
+            row["files"] += repository.get("files", 0)
+            row["loc"] += repository.get("loc", 0)
+            row["wall_seconds"] += usage.get("wall_seconds", 0)
+            row["cpu_seconds"] += usage.get("cpu_seconds", 0)
+            row["peak_rss_mib"] = max(row["peak_rss_mib"], usage.get("peak_rss_bytes", 0) / 1024 ** 2)
+            row["findings"] += findings
+
+        for row in rows.values():
+            wall_seconds = row["wall_seconds"] or float("nan")
+            row["findings_per_second"] = row["findings"] / wall_seconds
+            row["kloc_per_second"] = row["loc"] / 1000 / wall_seconds
+
+        return [rows[key] for key in sorted(rows)]
+
     def generate_report(self):
         """Generate the HTML report from SARIF files."""
         data = {}
+        usages = []
 
         # Walk through the directory structure
         for tool in os.listdir(self.base_dir):
@@ -92,16 +199,50 @@ class SarifReportGenerator:
 
                             # Parse SARIF files in the repository directory
                             findings = []
+                            tool_findings = []
+                            usage = None
                             for file in os.listdir(repo_dir):
-                                if file.endswith(".sarif"):
-                                    findings.extend(self.parse_sarif_file(os.path.join(repo_dir, file)))
+                                if file == "resource_usage.json":
+                                    with open(os.path.join(repo_dir, file), 'r', encoding='utf-8') as f:
+                                        usage = json.load(f)
+                                elif is_sarif_file(file):
+                                    with tracer.span("parse_sarif", tool=tool, repo=repository):
+                                        sarif_data = self.load_sarif(os.path.join(repo_dir, file))
+                                        findings.extend(self.format_findings(sarif_data))
+                                    with tracer.span("fingerprint", tool=tool, repo=repository):
+                                        tool_findings.extend(
+                                            self.fingerprinter.findings_from_sarif(sarif_data, tool, vuln_status, language, repository)
+                                        )
+
+                            self.overlap.add((language, repository, vuln_status), tool_findings)
+                            if vuln_status == "vulnerable":
+                                with tracer.span("ground_truth", tool=tool, repo=repository):
+                                    self.ground_truth.score(tool, language, repository, tool_findings)
+
+                            if usage is not None:
+                                usages.append((usage.get("tool", tool), language, usage, len(findings)))
 
                             # Organize data
                             data.setdefault(language, {}).setdefault(repository, {}).setdefault(vuln_status, {}).setdefault(tool, []).extend(findings)
 
         # Render HTML
-        template = Template(self.HTML_TEMPLATE)
-        html_content = template.render(data=data)
+        with tracer.span("render_report"):
+            template = Template(self.HTML_TEMPLATE)
+            html_content = template.render(
+                data=data,
+                performance=self.build_performance_table(usages),
+                overlap=self.overlap.summarize(),
+                repository_overlap={
+                    (language, repository, vuln_status): self.overlap.summarize((language, repository, vuln_status))
+                    for language, repositories in data.items()
+                    for repository, vulnerability_data in repositories.items()
+                    for vuln_status in vulnerability_data
+                },
+                ground_truth=self.ground_truth.summarize(),
+            )
+
+        if self.ground_truth.results:
+            self.ground_truth.save(os.path.join(self.base_dir, "ground_truth_results.json"))
 
         # Save HTML report
         report_path = os.path.join(self.base_dir, "SARIF_Analysis_Report.html")
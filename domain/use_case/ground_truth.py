@@ -0,0 +1,258 @@
+import json
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from domain.entity.finding import Finding
+from domain.entity.ground_truth import ExpectedIssue
+
+# CWEs reported interchangeably by the tools for the same weakness. A finding
+# matches an expected issue when both CWEs belong to the same family.
+DEFAULT_CWE_FAMILIES: Dict[str, List[int]] = {
+    "sql-injection": [89, 564, 943],
+    "command-injection": [77, 78, 88],
+    "code-injection": [94, 95, 1336],
+    "xss": [79, 80, 83, 87],
+    "path-traversal": [22, 23, 35, 36, 73],
+    "xxe": [611, 776, 827],
+    "ssrf": [918],
+    "open-redirect": [601],
+    "deserialization": [502],
+    "ldap-injection": [90],
+    "xpath-injection": [643, 652],
+    "weak-crypto": [326, 327, 328, 916],
+    "hardcoded-credentials": [259, 321, 798],
+}
+
+def _cwe_number(cwe: Optional[str]) -> Optional[int]:
+    return int(cwe.split("-")[-1]) if cwe else None
+
+class CweFamilies:
+    def __init__(self, families: Optional[Dict[str, List[int]]] = None):
+        """
+        Initialize the CweFamilies.
+
+        Args:
+            families (Optional[Dict[str, List[int]]]): CWE numbers grouped by family name.
+                Defaults to DEFAULT_CWE_FAMILIES. A CWE outside every family only
+                matches itself.
+        """
+        self.family_of: Dict[int, str] = {}
+        for name, cwes in (DEFAULT_CWE_FAMILIES if families is None else families).items():
+            for cwe in cwes:
+                self.family_of[int(cwe)] = name
+
+    def equivalent(self, a: Optional[str], b: Optional[str]) -> bool:
+        """
+        Returns True if the two CWEs belong to the same family. A missing CWE is
+        equivalent to any other, as some tools report none.
+        """
+        a, b = _cwe_number(a), _cwe_number(b)
+        if a is None or b is None or a == b:
+            return True
+        return self.family_of.get(a, a) == self.family_of.get(b, b)
+
+class FileIntervalIndex:
+    def __init__(self, issues: Iterable[ExpectedIssue]):
+        """
+        Initialize the FileIntervalIndex.
+
+        The expected issues of one file are kept sorted by start line, as the
+        in-order walk of an implicit balanced tree: the issue in the middle of a
+        range is its root. Each root records the largest end line of its range, so
+        a lookup skips every range ending before the line, and a long issue only
+        costs the lookups it overlaps. A lookup takes O(log n + k) for k matches.
+
+        Args:
+            issues (Iterable[ExpectedIssue]): Expected issues of the file.
+        """
+        self.issues = sorted(issues, key=lambda issue: (issue.start_line, issue.end_line))
+        self.max_end = [0] * len(self.issues)
+        self._build(0, len(self.issues))
+
+    def _build(self, low: int, high: int) -> int:
+        """Records the largest end line of each range at its root, and returns that of [low, high)."""
+        if low >= high:
+            return -1
+        root = (low + high) // 2
+        self.max_end[root] = max(self.issues[root].end_line, self._build(low, root), self._build(root + 1, high))
+        return self.max_end[root]
+
+    def overlapping(self, line: int, tolerance: int) -> List[ExpectedIssue]:
+        """
+        Returns the issues whose line range, widened by `tolerance` on each side,
+        contains the given line, sorted by start line.
+        """
+        found: List[ExpectedIssue] = []
+        self._collect(0, len(self.issues), line - tolerance, line + tolerance, found)
+        return found
+
+    def _collect(self, low: int, high: int, first: int, last: int, found: List[ExpectedIssue]) -> None:
+        """Appends the issues of [low, high) that start at or before `last` and end at or after `first`."""
+        if low >= high:
+            return
+        root = (low + high) // 2
+        if self.max_end[root] < first:
+            return
+        self._collect(low, root, first, last, found)
+        issue = self.issues[root]
+        if issue.start_line > last:
+            return  # Neither it nor the issues after it start early enough
+        if issue.end_line >= first:
+            found.append(issue)
+        self._collect(root + 1, high, first, last, found)
+
+class GroundTruthMatcher:
+    def __init__(self, issues: List[ExpectedIssue], line_tolerance: int = 3,
+                 cwe_families: Optional[CweFamilies] = None):
+        """
+        Initialize the GroundTruthMatcher.
+
+        Args:
+            issues (List[ExpectedIssue]): Expected issues of one repository.
+            line_tolerance (int): Lines a finding may be away from an issue and still match it.
+            cwe_families (Optional[CweFamilies]): CWE equivalence used to compare findings and issues.
+        """
+        self.issues = issues
+        self.line_tolerance = line_tolerance
+        self.cwe_families = cwe_families or CweFamilies()
+
+        by_file: Dict[str, List[ExpectedIssue]] = defaultdict(list)
+        for issue in issues:
+            by_file[issue.path].append(issue)
+        self.files = {path: FileIntervalIndex(file_issues) for path, file_issues in by_file.items()}
+
+    def find(self, finding: Finding) -> Optional[ExpectedIssue]:
+        """Returns the expected issue matched by the finding, the closest one if several are."""
+        index = self.files.get(finding.path)
+        if index is None or finding.line is None:
+            return None
+
+        candidates = [
+            issue for issue in index.overlapping(finding.line, self.line_tolerance)
+            if self.cwe_families.equivalent(issue.cwe, finding.cwe)
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda issue: (
+            0 if issue.start_line <= finding.line <= issue.end_line
+            else min(abs(finding.line - issue.start_line), abs(finding.line - issue.end_line)),
+            issue.cwe != finding.cwe,
+        ))
+
+    def match(self, findings: Iterable[Finding]) -> dict:
+        """
+        Matches the findings of one tool against the expected issues.
+
+        Returns:
+            dict: "true_positives" (each matched issue with the findings matching it),
+            "false_negatives" (issues no finding matched) and "false_positives"
+            (findings matching no issue). Repeated findings of the tool are counted once.
+        """
+        matched: Dict[str, List[dict]] = defaultdict(list)
+        false_positives = []
+        seen = set()
+        for finding in findings:
+            if finding.dedupe_key in seen:
+                continue
+            seen.add(finding.dedupe_key)
+
+            issue = self.find(finding)
+            entry = {"rule_id": finding.rule_id, "path": finding.path, "line": finding.line, "cwe": finding.cwe}
+            if issue is None:
+                false_positives.append(entry)
+            else:
+                matched[issue.id].append(entry)
+
+        return {
+            "true_positives": [dict(issue.to_dict(), findings=matched[issue.id]) for issue in self.issues if issue.id in matched],
+            "false_negatives": [issue.to_dict() for issue in self.issues if issue.id not in matched],
+            "false_positives": false_positives,
+        }
+
+class GroundTruthScorer:
+    def __init__(self, manifest_dir: str = "ground_truth", line_tolerance: int = 3,
+                 cwe_families: Optional[Dict[str, List[int]]] = None, logger=None):
+        """
+        Initialize the GroundTruthScorer.
+
+        Manifests are optional: only vulnerable repositories with a file
+        `<manifest_dir>/<language>/<repository>.json` are scored. A manifest that
+        cannot be read is reported and its repository is left unscored.
+
+        Args:
+            manifest_dir (str): Directory of the ground-truth manifests.
+            line_tolerance (int): Lines a finding may be away from an issue and still match it.
+            cwe_families (Optional[Dict[str, List[int]]]): CWE numbers grouped by family name.
+            logger: The application logger. Invalid manifests are printed without one.
+        """
+        self.manifest_dir = manifest_dir
+        self.logger = logger
+        self.line_tolerance = line_tolerance
+        self.cwe_families = CweFamilies(cwe_families)
+        self.matchers: Dict[Tuple[str, str], Optional[GroundTruthMatcher]] = {}
+        # tool -> (language, repository) -> matched lists
+        self.results: Dict[str, Dict[Tuple[str, str], dict]] = defaultdict(dict)
+
+    @staticmethod
+    def load_manifest(path: str) -> List[ExpectedIssue]:
+        """
+        Loads a manifest: {"issues": [{"id", "path", "start_line", "end_line", "cwe", "description"}]}.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return [ExpectedIssue.from_dict(entry, index) for index, entry in enumerate(manifest.get("issues", []))]
+
+    def get_matcher(self, language: str, repository: str) -> Optional[GroundTruthMatcher]:
+        """Returns the matcher of the repository, or None if it has no valid manifest."""
+        key = (language, repository)
+        if key not in self.matchers:
+            path = os.path.join(self.manifest_dir, language, repository + ".json")
+            self.matchers[key] = None
+            if os.path.isfile(path):
+                try:
+                    self.matchers[key] = GroundTruthMatcher(self.load_manifest(path), self.line_tolerance, self.cwe_families)
+                except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+                    message = "Ignoring the invalid ground-truth manifest {}: {}".format(path, e)
+                    if self.logger:
+                        self.logger.error(message)
+                    else:
+                        print(message)
+        return self.matchers[key]
+
+    def score(self, tool: str, language: str, repository: str, findings: List[Finding]) -> bool:
+        """
+        Matches the findings of a tool on a vulnerable repository against its manifest.
+
+        Returns:
+            bool: False if the repository has no manifest.
+        """
+        matcher = self.get_matcher(language, repository)
+        if matcher is None:
+            return False
+        self.results[tool][(language, repository)] = matcher.match(findings)
+        return True
+
+    def summarize(self) -> List[dict]:
+        """Returns per tool the true positive, false negative and false positive counts, precision and recall."""
+        rows = []
+        for tool in sorted(self.results):
+            row = {"tool": tool, "repositories": len(self.results[tool]), "true_positives": 0,
+                   "false_negatives": 0, "false_positives": 0}
+            for result in self.results[tool].values():
+                for kind in ("true_positives", "false_negatives", "false_positives"):
+                    row[kind] += len(result[kind])
+            reported = row["true_positives"] + row["false_positives"]
+            expected = row["true_positives"] + row["false_negatives"]
+            row["precision"] = row["true_positives"] / reported if reported else float("nan")
+            row["recall"] = row["true_positives"] / expected if expected else float("nan")
+            rows.append(row)
+        return rows
+
+    def save(self, path: str) -> None:
+        """Writes the true positive, false negative and false positive lists of every tool and repository."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                tool: {"{}/{}".format(*key): result for key, result in sorted(repositories.items())}
+                for tool, repositories in sorted(self.results.items())
+            }, f, indent=2)
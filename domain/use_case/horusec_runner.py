@@ -1,63 +1,90 @@
+import json
 import os
-import subprocess
+from typing import List
+from adapter.executor import run_command
+from adapter.tracing import tracer
+from domain.entity.job import ScanJob
 from domain.interface.sast_runner import SastRunner
 
 class HorusecRunner(SastRunner):
+    name = "Horusec"
+
     def __init__(self, logger, process_manager):
         self.logger = logger
         self.process_manager = process_manager
         self.docker_image = "horuszup/horusec-cli:v2.9.0-beta.3"
 
-    def run_horusec_scan(self, vulnerable, language, address):
+    def tool_version(self, job: ScanJob) -> str:
+        return self.image_version(self.docker_image)
+
+    def ignored_paths(self, config_file: str, exclusions=()) -> List[str]:
+        """
+        Returns the ignore list of the Horusec config file followed by the exclusions
+        it does not already hold. --ignore replaces the list of the config file, so
+        it is given both.
+        """
+        try:
+            with open(config_file, "r", encoding="utf-8") as f:
+                configured = json.load(f).get("horusecCliFilesOrPathsToIgnore") or []
+        except (OSError, ValueError) as e:
+            self.logger.warning("Could not read the ignore list of {}: {}".format(config_file, e))
+            configured = []
+        return list(dict.fromkeys([*configured, *exclusions]))
+
+    def run_horusec_scan(self, job: ScanJob, source_directory, exclusions=()):
         """
         Run Horusec scan on the specified repository and save the results to a report directory.
 
         Args:
-            vulnerable (bool): Whether the repository is vulnerable.
-            language (str): The language of the repository.
-            address (str): The repository address.
+            job (ScanJob): The repository to scan.
+            source_directory (str): The job's workspace. Horusec writes its analysis
+                folder into the project, so it is mounted writable.
+            exclusions (List[str]): Glob patterns to skip, added to the ignore list of
+                .horusec/horusec-config.json.
+
+        Returns:
+            bool: True if the scan succeeded.
         """
         current_directory = os.getcwd()
-        repo_name = address.split("/")[-1]
-        if vulnerable:
-            repo_directory = f"repositories/vulnerable/{language}/{repo_name}"
-            report_dir = f"scan_results/horusec_scan/vulnerable/{language}/{repo_name}"
-        else:
-            repo_directory = f"repositories/non-vulnerable/{language}/{repo_name}"
-            report_dir = f"scan_results/horusec_scan/non-vulnerable/{language}/{repo_name}"
+        repo_directory = job.repository_directory
+        report_dir = self.get_report_directory(job)
 
-        os.makedirs(report_dir, exist_ok=True)
+        config_file = f"{os.path.abspath(current_directory)}/.horusec/horusec-config.json"
+        ignored = self.ignored_paths(config_file, exclusions) if exclusions else []
 
+        container_name = self.new_container_name()
         command = [
-            "docker", "run", "--rm", "-it", "--privileged",
+            "docker", "run", "--rm", "--privileged", "--name", container_name,
             "-v", "/var/run/docker.sock:/var/run/docker.sock",
-            "-v", f"{os.path.abspath(current_directory)}:/src", self.docker_image,
-            "horusec", "start", "-p", f"/src/{repo_directory}", "-P", f"{os.path.abspath(current_directory)}",
-            "--output-format", "sarif", "--json-output-file", f"/src/{report_dir}/report.sarif",
-            "--config-file-path", "/src/.horusec/horusec-config.json"
+            "-v", f"{source_directory}:/src",
+            "-v", f"{report_dir}:/report",
+            "-v", f"{config_file}:/config/horusec-config.json:ro",
+            self.docker_image,
+            # -P is the host path of the project, mounted by the containers Horusec starts
+            "horusec", "start", "-p", "/src", "-P", source_directory,
+            "--output-format", "sarif", "--json-output-file", "/report/report.sarif",
+            "--config-file-path", "/config/horusec-config.json",
+            *([f"--ignore={','.join(ignored)}"] if ignored else []),
         ]
 
-        result = subprocess.run(command, capture_output=True, text=True)
+        with tracer.span("analysis", tool=self.name, repo=job.address), self.measure(container_name):
+            result = run_command(command, f"{report_dir}/horusec.log.gz")
 
         if result.returncode == 0:
             self.logger.info("Success when running horusec for {}".format(repo_directory))
         else:
-            self.logger.error("Error when running horusec for {}".format(repo_directory))
+            self.logger.error("Error when running horusec for {}, see {}:\n{}".format(repo_directory, result.log_file, result.tail))
+        return result.returncode == 0
 
-    def run(self, configs):
-        for language in configs.repos.vulnerable:
-            self.logger.info(f"Running Horusec for language {language}")
-            for repository in configs.repos.vulnerable[language]:
-                self.logger.info(f"Running Horusec for repository: {repository}")
-                self.process_manager.add_worker(self.run_horusec_scan, (True, language, repository))
+    def scan(self, job: ScanJob, configs) -> bool:
+        with self.workspace(job, configs) as source_directory:
+            return self.run_horusec_scan(job, source_directory, self.get_exclusions(job, configs))
 
-        for language in configs.repos.non_vulnerable:
-            self.logger.info(f"Running Horusec for language {language}")
-            for repository in configs.repos.non_vulnerable[language]:
-                self.logger.info(f"Running Horusec for repository: {repository}")
-                self.process_manager.add_worker(self.run_horusec_scan, (False, language, repository))
+    def setup(self, configs) -> None:
+        self.pull_images([self.docker_image])
 
-        self.process_manager.wait_for_all()
+    def get_report_file(self, job: ScanJob) -> str:
+        return os.path.join("scan_results", "horusec_scan", job.category, job.language, job.repo_id, "report.sarif.gz")
 
     def get_report(self):
-        pass
\ No newline at end of file
+        pass
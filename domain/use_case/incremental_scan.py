@@ -0,0 +1,147 @@
+import json
+import os
+import subprocess
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+from adapter.sarif_io import dump_sarif, load_sarif, relative_uri, result_uri
+
+# Name of the file recording, next to a job's results, the commit they were produced from
+SCAN_STATE_FILE = "scan_state.json"
+
+# Beyond this many changed files a full scan is run, as passing them one by one
+# stops being cheaper than letting the tool walk the tree
+MAX_INCREMENTAL_FILES = 500
+
+@dataclass
+class ScanPlan:
+    FULL = "full"
+    INCREMENTAL = "incremental"
+    UNCHANGED = "unchanged"
+
+    mode: str
+    commit: Optional[str] = None
+    previous_commit: Optional[str] = None
+    # Added or modified files, relative to the repository root, to scan again
+    changed_files: List[str] = field(default_factory=list)
+    # Removed files, whose previous results are dropped
+    deleted_files: List[str] = field(default_factory=list)
+    # Previous SARIF file, moved aside while the changed files are scanned
+    previous_report: Optional[str] = None
+
+    @property
+    def is_incremental(self) -> bool:
+        return self.mode == self.INCREMENTAL
+
+    @property
+    def is_unchanged(self) -> bool:
+        return self.mode == self.UNCHANGED
+
+def head_commit(repository_directory: str) -> Optional[str]:
+    """Returns the commit checked out in a repository, or None if it is not a git repository."""
+    result = subprocess.run(["git", "-C", repository_directory, "rev-parse", "HEAD"],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    return result.stdout.decode().strip() if result.returncode == 0 else None
+
+def diff_files(repository_directory: str, base: str, head: str) -> Optional[tuple]:
+    """
+    Returns the (changed, deleted) files between two commits, renames counting as a
+    deletion and an addition, or None if the base commit is no longer known.
+    """
+    result = subprocess.run(
+        ["git", "-C", repository_directory, "diff", "--name-status", "--no-renames", "-z", base, head],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    if result.returncode != 0:
+        return None
+
+    fields = result.stdout.decode("utf-8", errors="surrogateescape").split("\0")
+    changed, deleted = [], []
+    for status, path in zip(fields[0::2], fields[1::2]):
+        (deleted if status == "D" else changed).append(path)
+    return changed, deleted
+
+def read_scan_state(report_file: str) -> dict:
+    """Returns the scan state saved next to a report file, empty if there is none."""
+    path = os.path.join(os.path.dirname(report_file), SCAN_STATE_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_scan_state(report_file: str, commit: str, cache_key: str, mode: str) -> None:
+    """Saves the commit and cache key the results next to a report file were produced from."""
+    with open(os.path.join(os.path.dirname(report_file), SCAN_STATE_FILE), "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "cache_key": cache_key, "mode": mode}, f)
+
+def plan_scan(repository_directory: str, report_file: str, cache_key: str, incremental: bool) -> ScanPlan:
+    """
+    Decides how a job is scanned, comparing the repository's HEAD with the commit of
+    the previous results.
+
+    Args:
+        repository_directory (str): The cloned repository.
+        report_file (str): The job's SARIF file.
+        cache_key (str): Digest of the settings the result depends on. Results produced
+            with another key are not reused.
+        incremental (bool): Whether the runner can scan a subset of the files.
+
+    Returns:
+        ScanPlan: "unchanged" if the previous results are current, "incremental" with
+        the changed and deleted files if they can be updated, "full" otherwise.
+    """
+    commit = head_commit(repository_directory)
+    state = read_scan_state(report_file)
+    previous_commit = state.get("commit")
+    if not commit or not previous_commit or state.get("cache_key") != cache_key or not os.path.isfile(report_file):
+        return ScanPlan(ScanPlan.FULL, commit)
+    if previous_commit == commit:
+        return ScanPlan(ScanPlan.UNCHANGED, commit, previous_commit)
+    if not incremental:
+        return ScanPlan(ScanPlan.FULL, commit, previous_commit)
+
+    diff = diff_files(repository_directory, previous_commit, commit)
+    if diff is None or len(diff[0]) > MAX_INCREMENTAL_FILES:
+        return ScanPlan(ScanPlan.FULL, commit, previous_commit)
+    return ScanPlan(ScanPlan.INCREMENTAL, commit, previous_commit, changed_files=diff[0], deleted_files=diff[1])
+
+def merge_sarif(previous_report: str, new_report: Optional[str], dropped_files: Set[str],
+                repo_name: str, destination: str) -> None:
+    """
+    Merges the results of an incremental scan into the previous results: previous
+    results located in a changed or deleted file are dropped, the new results are
+    added and the rules of both are kept.
+
+    Args:
+        previous_report (str): SARIF file of the previous scan.
+        new_report (Optional[str]): SARIF file of the scan of the changed files, if the tool ran.
+        dropped_files (Set[str]): Changed and deleted files, relative to the repository root.
+        repo_name (str): Name of the repository, used to make the result paths relative.
+        destination (str): The merged SARIF file.
+    """
+    document = load_sarif(previous_report)
+    runs = document.get("runs") or [{"tool": {"driver": {"name": "unknown"}}, "results": []}]
+    for run in runs:
+        run["results"] = [
+            result for result in run.get("results", [])
+            if relative_uri(result_uri(result), repo_name) not in dropped_files
+        ]
+
+    if new_report and os.path.isfile(new_report):
+        run = runs[0]
+        driver = run.setdefault("tool", {}).setdefault("driver", {})
+        rules = driver.setdefault("rules", [])
+        known_rules = {rule.get("id") for rule in rules}
+        for new_run in load_sarif(new_report).get("runs", []):
+            for result in new_run.get("results", []):
+                # Rule indexes refer to the rule list of the run the result came from
+                result.pop("ruleIndex", None)
+                run["results"].append(result)
+            for rule in new_run.get("tool", {}).get("driver", {}).get("rules", []):
+                if rule.get("id") not in known_rules:
+                    known_rules.add(rule.get("id"))
+                    rules.append(rule)
+
+    document["runs"] = runs
+    dump_sarif(document, destination)
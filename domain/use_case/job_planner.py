@@ -0,0 +1,91 @@
+import heapq
+import os
+import statistics
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from adapter.job_history import JobHistory
+from adapter.resource_monitor import repository_bytes
+from domain.entity.job import ScanJob
+
+# Estimates used before a tool has any history
+DEFAULT_SECONDS = 300.0
+DEFAULT_SECONDS_PER_MIB = 20.0
+
+class JobPlanner:
+    def __init__(self, history: Optional[JobHistory], size_hints: Optional[Dict[str, int]] = None):
+        """
+        Initialize the JobPlanner.
+
+        Predicts the duration of each job from its history and orders the jobs
+        longest first, so the longest scans start while every worker is still busy
+        instead of running alone at the end of the run. Jobs without history are
+        estimated from the size of the repository and the tool's throughput on the
+        repositories it already scanned.
+
+        Args:
+            history (Optional[JobHistory]): Durations of the previous scans.
+            size_hints (Optional[Dict[str, int]]): Size in bytes of repositories by address,
+                used for the repositories that are not cloned yet.
+        """
+        self.history = history
+        self.size_hints = size_hints or {}
+        self._sizes: Dict[str, int] = {}
+
+        # tool -> (seconds per byte, median duration), from the repositories it scanned
+        self.tool_rates: Dict[str, Tuple[Optional[float], float]] = {}
+        per_tool = defaultdict(list)
+        for entry in (history.jobs.values() if history else []):
+            per_tool[entry["tool"]].append(entry)
+        for tool, entries in per_tool.items():
+            total_bytes = sum(entry["bytes"] for entry in entries)
+            rate = sum(entry["seconds"] for entry in entries) / total_bytes if total_bytes else None
+            self.tool_rates[tool] = (rate, statistics.median(entry["seconds"] for entry in entries))
+
+    def _size(self, job: ScanJob) -> int:
+        path = job.repository_directory
+        if path not in self._sizes:
+            self._sizes[path] = repository_bytes(path) if os.path.isdir(path) else self.size_hints.get(job.address, 0)
+        return self._sizes[path]
+
+    def estimate(self, job: ScanJob) -> Tuple[float, str]:
+        """
+        Returns the predicted duration of a job in seconds and what it is based on:
+        "history", "size" or "default".
+        """
+        if self.history:
+            seconds = self.history.expected_seconds(job)
+            if seconds is not None:
+                return seconds, "history"
+
+        rate, median = self.tool_rates.get(job.tool, (None, None))
+        size = self._size(job)
+        if size and rate:
+            return rate * size, "size"
+        if median is not None:
+            return median, "default"
+        if size:
+            return DEFAULT_SECONDS_PER_MIB * size / 1024 ** 2, "size"
+        return DEFAULT_SECONDS, "default"
+
+    def order(self, jobs: List[ScanJob]) -> List[ScanJob]:
+        """Returns the jobs longest expected first."""
+        return sorted(jobs, key=lambda job: self.estimate(job)[0], reverse=True)
+
+    def simulate(self, jobs: List[ScanJob], workers: int) -> Tuple[List[dict], float]:
+        """
+        Predicts the schedule of the jobs, submitted in order, on a pool of workers.
+
+        Returns:
+            Tuple[List[dict], float]: For each job its worker slot, start, end, expected
+            duration and estimate source; and the predicted makespan.
+        """
+        slots = [(0.0, slot) for slot in range(max(1, workers))]
+        schedule = []
+        for job in jobs:
+            start, slot = heapq.heappop(slots)
+            seconds, source = self.estimate(job)
+            heapq.heappush(slots, (start + seconds, slot))
+            schedule.append({"job": job.key, "slot": slot, "start": start, "end": start + seconds,
+                             "seconds": seconds, "source": source})
+        return schedule, max((entry["end"] for entry in schedule), default=0.0)
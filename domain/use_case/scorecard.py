@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from adapter.sarif_io import load_sarif
+from domain.entity.finding import Finding
+from domain.entity.job import ScanJob
+from domain.use_case.finding_overlap import FindingFingerprinter
+from domain.use_case.ground_truth import GroundTruthScorer
+from domain.use_case.incremental_scan import read_scan_state
+
+class ScorecardBuilder:
+    def __init__(self, repositories_dir: str = "repositories", ground_truth: Optional[GroundTruthScorer] = None):
+        """
+        Initialize the ScorecardBuilder.
+
+        Summarizes the results of single jobs: findings, resource usage, the commit
+        they were produced from and, for vulnerable repositories with a manifest,
+        the ground-truth score. Parsed SARIF files are cached by path, and parsed
+        again only when their modification time or size change, so polling the
+        scorecard of a repository does not reload its results every time.
+
+        Args:
+            repositories_dir (str): Base directory of the cloned repositories.
+            ground_truth (Optional[GroundTruthScorer]): Provides the manifests. Defaults
+                to the manifests of "ground_truth".
+        """
+        self.fingerprinter = FindingFingerprinter(repositories_dir)
+        self.ground_truth = ground_truth or GroundTruthScorer()
+        self._findings: Dict[str, Tuple[Tuple[int, int], List[Finding]]] = {}
+        self._lock = threading.Lock()
+
+    def findings(self, job: ScanJob, report_file: str) -> Optional[List[Finding]]:
+        """Returns the findings of a job's SARIF file, or None if there is none."""
+        try:
+            stat = os.stat(report_file)
+        except OSError:
+            return None
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._findings.get(report_file)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        findings = self.fingerprinter.findings_from_sarif(
+            load_sarif(report_file), job.tool, job.category, job.language, job.repo_id
+        )
+        with self._lock:
+            self._findings[report_file] = (version, findings)
+        return findings
+
+    def build(self, job: ScanJob, report_file: Optional[str]) -> dict:
+        """
+        Returns the scorecard of a job.
+
+        Args:
+            job (ScanJob): The job.
+            report_file (Optional[str]): The job's SARIF file, as returned by its runner.
+        """
+        scorecard = {"job": job.key, "tool": job.tool, "repository": job.address, "results": report_file}
+        findings = self.findings(job, report_file) if report_file else None
+        if findings is None:
+            scorecard["available"] = False
+            return scorecard
+
+        results_directory = os.path.dirname(report_file)
+        scorecard.update({
+            "available": True,
+            "findings": len(findings),
+            "distinct_findings": len({finding.dedupe_key for finding in findings}),
+            "scan": read_scan_state(report_file),
+        })
+
+        usage_file = os.path.join(results_directory, "resource_usage.json")
+        if os.path.isfile(usage_file):
+            with open(usage_file, "r", encoding="utf-8") as f:
+                usage = json.load(f)
+            scorecard["usage"] = {key: usage.get(key) for key in ("wall_seconds", "cpu_seconds", "peak_rss_bytes", "repository")}
+
+        matcher = self.ground_truth.get_matcher(job.language, job.repo_id) if job.vulnerable else None
+        if matcher is not None:
+            result = matcher.match(findings)
+            counts = {kind: len(result[kind]) for kind in ("true_positives", "false_negatives", "false_positives")}
+            reported = counts["true_positives"] + counts["false_positives"]
+            expected = counts["true_positives"] + counts["false_negatives"]
+            counts["precision"] = counts["true_positives"] / reported if reported else None
+            counts["recall"] = counts["true_positives"] / expected if expected else None
+            scorecard["ground_truth"] = counts
+        return scorecard
@@ -2,58 +2,69 @@ import os
 import subprocess
 import tarfile
 import shutil
+from adapter.executor import run_command
+from adapter.tracing import tracer
+from domain.entity.job import ScanJob
 from domain.interface.sast_runner import SastRunner
 
 class SemgrepRunner(SastRunner):
+    name = "Semgrep"
+    supports_incremental = True
+
     def __init__(self, logger, process_manager):
         self.logger = logger
         self.process_manager = process_manager
+        self.docker_image = "returntocorp/semgrep"
 
+    def tool_version(self, job: ScanJob) -> str:
+        return self.image_version(self.docker_image)
 
-    def run_semgrep_scan(self, vulnerable, language, address):
+    def run_semgrep_scan(self, job: ScanJob, source_directory, exclusions=(), targets=None):
         """
         Run Semgrep scan on the specified repository and save the results to a report directory.
         
         Args:
-            repository_path (str): The path to the local repository.
-            report_dir (str): The directory to save the scan report.
+            job (ScanJob): The repository to scan.
+            source_directory (str): The job's workspace, mounted read-only.
+            exclusions (List[str]): Glob patterns to skip, passed as --exclude.
+            targets (Optional[List[str]]): Files to scan, relative to the workspace, for an
+                incremental scan. None scans the whole workspace.
         """
-        current_directory = os.getcwd()
-        repo_name = address.split('/')[-1]
-        repo_type = "vulnerable" if vulnerable else "non-vulnerable"
-        repo_directory = f"{current_directory}/repositories/{repo_type}/{language}/{repo_name}"
-        report_dir = f"{current_directory}/scan_results/semgrep_scan/{repo_type}/{language}/{repo_name}"
-
-        exit_code = os.system(
-            f"docker run --rm --privileged "
-            f"-v {repo_directory}:/src "
-            f"-v {report_dir}:/src/report "
-            f"returntocorp/semgrep semgrep "
-            f"scan --sarif --sarif-output=/src/report/result.sarif /src"           
-        )
-
-        if exit_code == 0:
+        repo_directory = job.repository_directory
+        report_dir = self.get_report_directory(job)
+
+        exclude_arguments = [f"--exclude={pattern}" for pattern in exclusions]
+        if targets is None:
+            target_arguments = ["/src"]
+        elif targets:
+            target_arguments = [f"/src/{target}" for target in targets]
+        else:
+            self.logger.info("No file to scan again with Semgrep for {}".format(repo_directory))
+            return True
+
+        container_name = self.new_container_name()
+        with tracer.span("analysis", tool=self.name, repo=job.address), self.measure(container_name):
+            result = run_command([
+                "docker", "run", "--rm", "--privileged", "--name", container_name,
+                "-v", f"{source_directory}:/src:ro",
+                "-v", f"{report_dir}:/report",
+                self.docker_image, "semgrep",
+                "scan", "--sarif", "--sarif-output=/report/result.sarif", *exclude_arguments, *target_arguments
+            ], f"{report_dir}/semgrep.log.gz")
+
+        if result.returncode == 0:
             self.logger.info("Success when running Semgrep for {}".format(repo_directory))
         else:
-            self.logger.error("Error when running Semgrep for {}".format(repo_directory))
+            self.logger.error("Error when running Semgrep for {}, see {}:\n{}".format(repo_directory, result.log_file, result.tail))
+        return result.returncode == 0
 
-    def run(self, configs):
-        """
-        Runs Semgrep scan on repositories based on the app_config.
-        
-        Args:
-            app_config (dict): A configuration dictionary with repository information.
-        """
-        for language in configs.repos.vulnerable:
-            self.logger.info("Running Semgrep for language {}".format(language))
-            for repository in configs.repos.vulnerable[language]:
-                self.logger.info("Running Semgrep for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_semgrep_scan, (True, language, repository))
-
-        for language in configs.repos.non_vulnerable:
-            self.logger.info("Running Semgrep for language {}".format(language))
-            for repository in configs.repos.non_vulnerable[language]:
-                self.logger.info("Running Semgrep for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_semgrep_scan, (False, language, repository))
-
-        self.process_manager.wait_for_all()
\ No newline at end of file
+    def scan(self, job: ScanJob, configs) -> bool:
+        with self.workspace(job, configs) as source_directory:
+            return self.run_semgrep_scan(job, source_directory, self.get_exclusions(job, configs),
+                                         self.scan_targets(source_directory))
+
+    def setup(self, configs) -> None:
+        self.pull_images([self.docker_image])
+
+    def get_report_file(self, job: ScanJob) -> str:
+        return os.path.join("scan_results", "semgrep_scan", job.category, job.language, job.repo_id, "result.sarif.gz")
@@ -1,29 +1,16 @@
 import os
+from adapter.executor import run_command
+from adapter.tracing import tracer
+from domain.entity.job import ScanJob
 from domain.interface.sast_runner import SastRunner
 
 class SnykRunner(SastRunner):
+    name = "Snyk"
+
     def __init__(self, logger, process_manager):
         self.logger = logger
         self.process_manager = process_manager
-
-    def run_snyk_scan(self, vulnerable, language, address, snyk_token):
-        """
-        Run Snyk scan on the specified repository and save the results to a report directory.
-        
-        Args:
-            repository_path (str): The path to the local repository.
-            report_dir (str): The directory to save the scan report.
-        """
-        current_directory = os.getcwd()
-        repo_name = address.split('/')[-1]
-        repo_type = "vulnerable" if vulnerable else "non-vulnerable"
-        repo_directory = f"{current_directory}/repositories/{repo_type}/{language}/{repo_name}"
-        report_dir = f"{current_directory}/scan_results/snyk_scan/{repo_type}/{language}/{repo_name}"
-
-        # Ensure the directory exists
-        os.makedirs(report_dir, exist_ok=True)
-        
-        snyk_image_map = {
+        self.snyk_image_map = {
             "CSharp": "snyk/snyk:dotnet",  
             "Go": "snyk/snyk:golang",      
             "Java": "snyk/snyk:gradle",   
@@ -34,6 +21,26 @@ class SnykRunner(SastRunner):
             "PHP": "snyk/snyk:php",    
         }
 
+    def tool_version(self, job: ScanJob) -> str:
+        image = self.snyk_image_map.get(job.language)
+        return self.image_version(image) if image else ""
+
+    def run_snyk_scan(self, job: ScanJob, snyk_token, source_directory):
+        """
+        Run Snyk scan on the specified repository and save the results to a report directory.
+        
+        Args:
+            job (ScanJob): The repository to scan.
+            snyk_token (str): The Snyk API token.
+            source_directory (str): The job's workspace. Snyk runs the package manager
+                of the project, which may write into it, so it is mounted writable. Snyk
+                has no exclusion option for a single project: the excluded paths are left
+                out of the workspace instead.
+        """
+        language = job.language
+        repo_directory = job.repository_directory
+        report_dir = self.get_report_directory(job)
+        
         # commands = {
         #     "JS_TS": ["npm install"],  # or "yarn install"
         #     "Python": ["pip install -r requirements.txt"],
@@ -47,39 +54,41 @@ class SnykRunner(SastRunner):
 
         # subprocess.run(commands.get(language), cwd=repo_directory, check=True, shell=True)
 
-        if snyk_image_map.get(language):
-            exit_code = os.system(
-                f"docker run --rm --privileged "
-                f"--env SNYK_TOKEN={snyk_token} "
-                f"-v {repo_directory}:/app "
-                f"-v {report_dir}:/app/report "
-                f"{snyk_image_map.get(language)} snyk test --ignore-policy --sarif-file-output=/app/report/result.sarif"
-            )
+        if self.snyk_image_map.get(language):
+            container_name = self.new_container_name()
+            with tracer.span("analysis", tool=self.name, repo=job.address), self.measure(container_name):
+                # The token is passed through the environment so it does not show in the process list
+                result = run_command([
+                    "docker", "run", "--rm", "--privileged", "--name", container_name,
+                    "--env", "SNYK_TOKEN",
+                    "-v", f"{source_directory}:/app",
+                    "-v", f"{report_dir}:/report",
+                    self.snyk_image_map.get(language), "snyk", "test", "--ignore-policy", "--sarif-file-output=/report/result.sarif"
+                ], f"{report_dir}/snyk.log.gz", env=dict(os.environ, SNYK_TOKEN=snyk_token or ""))
 
-            if exit_code == 0 or exit_code == 1:
+            # Snyk exits with 1 when vulnerabilities were found
+            success = result.returncode in (0, 1)
+            if success:
                 self.logger.info("Success when running Snyk for {}".format(repo_directory))
             else:
-                self.logger.error("Error when running Snyk for {}".format(repo_directory))
+                self.logger.error("Error when running Snyk for {}, see {}:\n{}".format(repo_directory, result.log_file, result.tail))
+            return success
         else:
            self.logger.info("Language not supported by Snyk: Repo {}".format(repo_directory))
+           return True
+
+    def scan(self, job: ScanJob, configs) -> bool:
+        if not self.snyk_image_map.get(job.language):
+            return self.run_snyk_scan(job, configs.snyk_token, None)
+        with self.workspace(job, configs) as source_directory:
+            return self.run_snyk_scan(job, configs.snyk_token, source_directory)
 
-    def run(self, configs):
+    def setup(self, configs) -> None:
         """
-        Runs Snyk scan on repositories based on the app_config.
-        
-        Args:
-            app_config (dict): A configuration dictionary with repository information.
+        Pulls the Snyk images of the configured languages.
         """
-        for language in configs.repos.vulnerable:
-            self.logger.info("Running Snyk for language {}".format(language))
-            for repository in configs.repos.vulnerable[language]:
-                self.logger.info("Running Snyk for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_snyk_scan, (True, language, repository,configs.snyk_token))
-
-        for language in configs.repos.non_vulnerable:
-            self.logger.info("Running Snyk for language {}".format(language))
-            for repository in configs.repos.non_vulnerable[language]:
-                self.logger.info("Running Snyk for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_snyk_scan, (False, language, repository,configs.snyk_token))
+        languages = configs.get_languages()
+        self.pull_images(sorted({self.snyk_image_map[language] for language in languages if language in self.snyk_image_map}))
 
-        self.process_manager.wait_for_all()
+    def get_report_file(self, job: ScanJob) -> str:
+        return os.path.join("scan_results", "snyk_scan", job.category, job.language, job.repo_id, "result.sarif.gz")
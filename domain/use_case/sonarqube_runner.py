@@ -1,12 +1,18 @@
 import os
 import requests
 import csv
-import json
 import uuid
 import time
+from adapter.executor import run_command
+from adapter.sarif_io import COMPRESSED_SUFFIX, SarifWriter
+from adapter.tracing import tracer
+from domain.entity.job import ScanJob
 from domain.interface.sast_runner import SastRunner
 
 class SonarQubeRunner(SastRunner):
+    name = "SonarQube"
+    supports_incremental = True
+
     def __init__(self, logger, process_manager):
 
         self._SONARQUBE_URL = "http://localhost:9000"
@@ -15,10 +21,22 @@ class SonarQubeRunner(SastRunner):
 
         self.logger = logger
         self.process_manager = process_manager
+        self.server_image = "sonarqube:lts"
+        self.scanner_image = "sonarsource/sonar-scanner-cli"
+        # Time given to the compute engine to process an analysis report
+        self.analysis_wait_seconds = 30
+
+    def tool_version(self, job: ScanJob) -> str:
+        return self.image_version(self.server_image, self.scanner_image)
 
     def _start_sonarqube(self):
         """Start the SonarQube container and wait for it to be ready."""
-        os.system(f"docker run -d --name sonarqube --network host -p 9000:9000 sonarqube:lts")
+        with tracer.span("sonarqube_start", tool=self.name):
+            os.system(f"docker run -d --name sonarqube --network host -p 9000:9000 {self.server_image}")
+            self._wait_for_sonarqube()
+
+    def _wait_for_sonarqube(self):
+        """Poll the health endpoint until SonarQube reports GREEN."""
         while True:
             try:
                 requests.get(self._SONARQUBE_URL)
@@ -59,7 +77,8 @@ class SonarQubeRunner(SastRunner):
     def get_issues(self, project_key):
         """Get issues from a SonarQube project."""
         # wait for analysis to be completed
-        time.sleep(30)
+        with tracer.span("ce_wait", tool=self.name):
+            time.sleep(self.analysis_wait_seconds)
         response = requests.get(
             f"{self._SONARQUBE_URL}/api/issues/search",
             auth=(self._ADMIN_USER, self._ADMIN_PASS),
@@ -93,75 +112,65 @@ class SonarQubeRunner(SastRunner):
             self.logger.error(f"Failed to fetch rule with ruleId {rule_id}: {response.text}")
             response.raise_for_status()
 
-    def save_issues_to_sarif(self, issues, path):
-        """Convert SonarQube issues to SARIF format and save them."""
-        # Initialize SARIF report structure
-        sarif_report = {
-            "$schema": "https://raw.githubusercontent.com/oasis-tcs/sarif-spec/master/Schemata/sarif-schema-2.1.0.json",
-            "version": "2.1.0",
-            "runs": [{
-                "tool": {
-                    "driver": {
-                        "name": "SonarQube",
-                        "fullName": "SonarQube Community Edition",
-                        "version": "8.9",
-                        "rules": []
-                    }
-                },
-                "results": []
-            }]
+    def save_issues_to_sarif(self, issues, path, project_key):
+        """
+        Convert SonarQube issues to SARIF format and stream them to a compact,
+        compressed file. Each rule is fetched and written once, whatever the number
+        of its issues. Locations are relative to the repository root.
+        """
+        driver = {
+            "name": "SonarQube",
+            "fullName": "SonarQube Community Edition",
+            "version": "8.9",
         }
+        sarif_file = f"{path}/sonarqube_issues{COMPRESSED_SUFFIX}"
 
-        for issue in issues:
-            uri = issue.get("component")
-            index = uri.find('/src')
-            if index != -1:
-                uri = uri[index:]
-
-            sarifResult = {
-                "ruleId": issue.get("rule"),
-                "message": {
-                    "text": "{} {}".format(issue.get("message"),", ".join(map(str,  issue.get("tags"))) )
-                },
-                "level": issue.get("severity"),
-                "locations": [{
-                    "physicalLocation": {
-                        "artifactLocation": {
-                            "uri": uri
-                        },
-                        "region": {
-                            "startLine": issue.get("line")
-                        }
-                    }
-                }]
-            }
-            rule = self.get_rule_by_id(issue.get("rule"))
-            sarifRule = {
-                "id": issue.get("rule"),
-                "name": rule.get("name"),
-                "shortDescription": {
-                    "text": rule.get("mdDesc")
-                },
-                "fullDescription": {
-                    "text": rule.get("descriptionSections")[0].get("content")
-                },
-                "defaultConfiguration": {
-                    "level": rule.get("severity")
-                },
-                "properties": {
-                    "tags": issue.get("tags")
-                }
-            }
+        with SarifWriter(sarif_file, driver) as writer:
+            for issue in issues:
+                # Components are "<project key>:<path relative to the project base directory>"
+                uri = issue.get("component")
+                if uri.startswith(f"{project_key}:"):
+                    uri = uri[len(f"{project_key}:"):]
 
-            sarif_report["runs"][0]["results"].append(sarifResult)
-            sarif_report["runs"][0]["tool"]["driver"]["rules"].append(sarifRule)
+                writer.add_result({
+                    "ruleId": issue.get("rule"),
+                    "message": {
+                        "text": "{} {}".format(issue.get("message"),", ".join(map(str,  issue.get("tags"))) )
+                    },
+                    "level": issue.get("severity"),
+                    "locations": [{
+                        "physicalLocation": {
+                            "artifactLocation": {
+                                "uri": uri
+                            },
+                            "region": {
+                                "startLine": issue.get("line")
+                            }
+                        }
+                    }]
+                })
 
-        # Save SARIF report to file
-        os.makedirs(path, exist_ok=True)
-        with open(f"{path}/sonarqube_issues.sarif", "w") as file:
-            json.dump(sarif_report, file, indent=2)
+                if writer.has_rule(issue.get("rule")):
+                    continue
+                rule = self.get_rule_by_id(issue.get("rule"))
+                writer.add_rule({
+                    "id": issue.get("rule"),
+                    "name": rule.get("name"),
+                    "shortDescription": {
+                        "text": rule.get("mdDesc")
+                    },
+                    "fullDescription": {
+                        "text": rule.get("descriptionSections")[0].get("content")
+                    },
+                    "defaultConfiguration": {
+                        "level": rule.get("severity")
+                    },
+                    "properties": {
+                        "tags": issue.get("tags")
+                    }
+                })
 
-        self.logger.info(f"Exported {len(issues)} issues to SARIF file: {path}/sonarqube_issues.sarif")
+        self.logger.info(f"Exported {len(issues)} issues to SARIF file: {sarif_file}")
 
 
     def save_issues_to_csv(self, issues, path):
@@ -188,68 +197,67 @@ class SonarQubeRunner(SastRunner):
 
         self.logger.info(f"Exported {len(issues)} issues to CSV file: {path}/sonarqube_issues.csv")
 
-    def run_sonarqube_scan(self, vulnerable, language, address):
+    def run_sonarqube_scan(self, job: ScanJob, source_directory, exclusions=(), targets=None):
         """
         Run SonarQube scan on the repository.
-        :param vulnerable: True if repository is vulnerable, False if repository is non-vulnerable
-        :param language: programming language of the repository
-        :param address: git repository address
-        :return: None
+        :param job: the repository to scan
+        :param source_directory: the job's workspace, mounted read-only
+        :param exclusions: glob patterns to skip, passed as sonar.exclusions
+        :param targets: files to analyse for an incremental scan, passed as sonar.inclusions; None analyses every file
+        :return: True if the scanner succeeded
         """
-        current_directory = os.getcwd()   
-        
-        if vulnerable:
-            repo_directory = f"repositories/vulnerable/{language}/{address.split('/')[-1]}"
-            report_dir = f"scan_results/sonarqube_scan/vulnerable/{language}/{address.split('/')[-1]}" 
-        else:
-            repo_directory = f"repositories/non-vulnerable/{language}/{address.split('/')[-1]}"
-            report_dir = f"scan_results/sonarqube_scan/non-vulnerable/{language}/{address.split('/')[-1]}"
+        address = job.address
+        repo_directory = job.repository_directory
+        report_dir = self.get_report_directory(job)
+
+        if targets is not None and not targets:
+            self.logger.info("No file to scan again with Sonarqube for {}".format(repo_directory))
+            return True
 
         project_key = uuid.uuid4()
         project_name = f"{address.split('/')[-2]}/{address.split('/')[-1]}"
         
         self.create_project(project_key, project_name)
 
-        exit_code = os.system(
-            f"docker run --rm --network host "
-            f"-v {current_directory}:/src -w /src/{repo_directory} sonarsource/sonar-scanner-cli "
-            f"-Dsonar.projectKey={project_key} "
-            f"-Dsonar.sources=. "
-            f"-Dsonar.host.url=http://host.docker.internal:9000 "
-            f"-Dsonar.login={self._ADMIN_USER} "
-            f"-Dsonar.password={self._ADMIN_PASS}"
-        )
+        container_name = self.new_container_name()
+        with tracer.span("analysis", tool=self.name, repo=address), self.measure(container_name):
+            result = run_command([
+                "docker", "run", "--rm", "--network", "host", "--name", container_name,
+                "-v", f"{source_directory}:/usr/src:ro", "-w", "/usr/src", self.scanner_image,
+                f"-Dsonar.projectKey={project_key}",
+                "-Dsonar.sources=.",
+                "-Dsonar.working.directory=/tmp/scannerwork",
+                "-Dsonar.scm.disabled=true",
+                *([f"-Dsonar.exclusions={','.join(exclusions)}"] if exclusions else []),
+                *([f"-Dsonar.inclusions={','.join(targets)}"] if targets else []),
+                "-Dsonar.host.url=http://host.docker.internal:9000",
+                f"-Dsonar.login={self._ADMIN_USER}",
+                f"-Dsonar.password={self._ADMIN_PASS}"
+            ], f"{report_dir}/sonar-scanner.log.gz")
+        exit_code = result.returncode
 
         if exit_code == 0:
             self.logger.info("Success when running Sonarqube for {}".format(repo_directory))
         else:
-            self.logger.error("Error when running Sonarqube for {}".format(repo_directory))
+            self.logger.error("Error when running Sonarqube for {}, see {}:\n{}".format(repo_directory, result.log_file, result.tail))
 
         #self.save_issues_to_csv(self.get_issues(project_key), report_dir)
-        self.save_issues_to_sarif(self.get_issues(project_key), report_dir)
+        issues = self.get_issues(project_key)
+        with tracer.span("sarif_write", tool=self.name, repo=address):
+            self.save_issues_to_sarif(issues, report_dir, project_key)
+        return exit_code == 0
 
-    def run(self, configs) -> None:
-        """
-        Executes the SonarQube scan for repositories based on provided configurations.
+    def scan(self, job: ScanJob, configs) -> bool:
+        with self.workspace(job, configs) as source_directory:
+            return self.run_sonarqube_scan(job, source_directory, self.get_exclusions(job, configs),
+                                           self.scan_targets(source_directory))
 
-        Args:
-            configs: The configurations containing information like vulnerable repos.
-        """
+    def get_report_file(self, job: ScanJob) -> str:
+        return os.path.join("scan_results", "sonarqube_scan", job.category, job.language, job.repo_id, "sonarqube_issues.sarif.gz")
 
+    def setup(self, configs) -> None:
+        self.pull_images([self.server_image, self.scanner_image])
         self._start_sonarqube()
 
-        for language in configs.repos.vulnerable:
-            self.logger.info("Running SonarQube for language {}".format(language))
-            for repository in configs.repos.vulnerable[language]:
-                self.logger.info("Running SonarQube for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_sonarqube_scan, (True, language, repository))
-
-        for language in configs.repos.non_vulnerable:
-            self.logger.info("Running SonarQube for language {}".format(language))
-            for repository in configs.repos.non_vulnerable[language]:
-                self.logger.info("Running SonarQube for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_sonarqube_scan, (False, language, repository))
-
-        self.process_manager.wait_for_all()
+    def teardown(self, configs) -> None:
         self._stop_sonarqube()
-
@@ -1,11 +1,15 @@
 import os
-import subprocess
 import requests
 import tarfile
 import shutil
+from adapter.executor import run_command
+from adapter.tracing import tracer
+from domain.entity.job import ScanJob
 from domain.interface.sast_runner import SastRunner
 
 class TrivyRunner(SastRunner):
+    name = "Trivy"
+
     def __init__(self, logger, process_manager):
         self.logger = logger
         self.process_manager = process_manager
@@ -14,6 +18,9 @@ class TrivyRunner(SastRunner):
         self.trivy_zip = os.path.expanduser("~/.local/bin/trivy_{self.trivy_version}_Linux-64bit.tar.gz")
         self.trivy_path = os.path.expanduser("~/.local/bin/trivy")
 
+    def tool_version(self, job: ScanJob) -> str:
+        return self.trivy_version
+
     def _download_trivy(self):
         """
         Download the Trivy binary for the specific version and install it.
@@ -38,60 +45,56 @@ class TrivyRunner(SastRunner):
             self.logger.error(f"Failed to download Trivy. HTTP Status Code: {response.status_code}")
             raise RuntimeError(f"Failed to download Trivy: {response.status_code}")
 
-    def run_trivy_scan(self, vulnerable, language, address):
+    def run_trivy_scan(self, job: ScanJob, source_directory, exclusions=()):
         """
         Run Trivy scan on the specified repository and save the results to a report directory.
         
         Args:
-            repository_path (str): The path to the local repository.
-            report_dir (str): The directory to save the scan report.
+            job (ScanJob): The repository to scan.
+            source_directory (str): The job's workspace.
+            exclusions (List[str]): Glob patterns to skip. Patterns ending in "/**" are
+                passed as --skip-dirs, the others, which may name files or directories,
+                as both --skip-dirs and --skip-files.
         """
-        current_directory = os.getcwd()
-        if vulnerable:
-            repo_directory = f"{current_directory}/repositories/vulnerable/{language}/{address.split('/')[-1]}"
-            report_dir = f"{current_directory}/scan_results/trivy_scan/vulnerable/{language}/{address.split('/')[-1]}" 
-        else:
-            repo_directory = f"repositories/non-vulnerable/{language}/{address.split('/')[-1]}"
-            report_dir = f"{current_directory}/scan_results/trivy_scan/non-vulnerable/{language}/{address.split('/')[-1]}"
+        repo_directory = job.repository_directory
+        report_dir = self.get_report_directory(job)
 
-
-        # Ensure the directory exists
-        os.makedirs(report_dir, exist_ok=True)
+        skip_arguments = []
+        for pattern in exclusions:
+            if pattern.endswith("/**"):
+                skip_arguments += ["--skip-dirs", pattern[:-len("/**")]]
+            else:
+                # Nothing tells "**/vendor" from "**/*.min.js": skipping a directory or a
+                # file that does not exist is harmless, so both are skipped
+                skip_arguments += ["--skip-dirs", pattern, "--skip-files", pattern]
 
         # Run the Trivy scan
-        result = subprocess.run(
-            [self.trivy_path, "repo", "--format", "sarif", "--output", f"{report_dir}/trivy_report.sarif", repo_directory],
-            capture_output=True,
-            text=True
-        )
+        with tracer.span("analysis", tool=self.name, repo=job.address), self.measure() as monitor:
+            result = run_command(
+                [self.trivy_path, "repo", "--format", "sarif", "--output", f"{report_dir}/trivy_report.sarif",
+                 *skip_arguments, source_directory],
+                f"{report_dir}/trivy.log.gz"
+            )
+            monitor.add_process(result.rusage)
 
         if result.returncode == 0:
             self.logger.info("Success when running trivy for {}".format(repo_directory))
         else:
-            self.logger.error("Error when running trivy for {}".format(repo_directory))
+            self.logger.error("Error when running trivy for {}, see {}:\n{}".format(repo_directory, result.log_file, result.tail))
+        return result.returncode == 0
+
+    def scan(self, job: ScanJob, configs) -> bool:
+        with self.workspace(job, configs) as source_directory:
+            return self.run_trivy_scan(job, source_directory, self.get_exclusions(job, configs))
+
+    def get_report_file(self, job: ScanJob) -> str:
+        return os.path.join("scan_results", "trivy_scan", job.category, job.language, job.repo_id, "trivy_report.sarif.gz")
 
-    def run(self, configs):
+    def setup(self, configs):
         """
-        Runs Trivy scan on repositories based on the app_config.
-        
-        Args:
-            app_config (dict): A configuration dictionary with repository information.
+        Downloads Trivy if it is not already installed.
         """
-        # Download Trivy if it is not already installed
         if not os.path.isfile(self.trivy_path):
-            self._download_trivy()
+            with tracer.span("download", tool=self.name):
+                self._download_trivy()
             self.logger.info("Trivy has been downloaded and installed successfully.")
-
-        for language in configs.repos.vulnerable:
-            self.logger.info("Running Trivy for language {}".format(language))
-            for repository in configs.repos.vulnerable[language]:
-                self.logger.info("Running Trivy for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_trivy_scan, (True, language, repository))
-
-        for language in configs.repos.non_vulnerable:
-            self.logger.info("Running Trivy for language {}".format(language))
-            for repository in configs.repos.non_vulnerable[language]:
-                self.logger.info("Running Trivy for repository: {}".format(repository))
-                self.process_manager.add_worker(self.run_trivy_scan, (False, language, repository))
-
-        self.process_manager.wait_for_all()
\ No newline at end of file
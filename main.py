@@ -1,59 +1,214 @@
+import argparse
+import atexit
 import importlib
 import logging
 import json
+import os
+import signal
+import socket
+import sys
 
 from datetime import datetime
 
 from domain.entity.config import AppConfig
+from domain.entity.job import Shard
 from adapter.logger import Logger
 from adapter.worker import ProcessManager
+from adapter.adaptive_concurrency import AdaptiveConcurrency
+from adapter.job_queue import JobQueue
+from adapter.journal import RunJournal
+from adapter.job_history import JobHistory
+from adapter.sarif_io import compact_directory
+from adapter.tracing import tracer
+from adapter.daemon_server import DaemonServer
 from data.github import GitHubManager
 
 from domain.use_case.generate_report import SarifReportGenerator
+from domain.use_case.ground_truth import GroundTruthScorer
+from domain.use_case.job_planner import JobPlanner
+from domain.use_case.benchmark_daemon import BenchmarkDaemon
+from domain.use_case.scorecard import ScorecardBuilder
 
 CONFIGURATION_FILE = "config.json"
+RESULTS_DIRECTORY = "scan_results"
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Run the SAST benchmark.")
+    parser.add_argument("--shard", type=Shard.parse, metavar="i/n",
+                        help="Only run the i-th of n static partitions of the (repo, tool) matrix.")
+    parser.add_argument("--queue", metavar="DIR",
+                        help="Pull (repo, tool) jobs from a queue in a directory shared by every host.")
+    parser.add_argument("--lease", type=float, default=600, metavar="SECONDS",
+                        help="With --queue, time after which a job whose host stopped renewing its claim is taken for abandoned. Defaults to 600.")
+    parser.add_argument("--worker-id",
+                        help="Identifier of this host in the queue. Defaults to <hostname>:<pid>.")
+    parser.add_argument("--merge", action="store_true",
+                        help="Generate the report on this node. With --queue, waits for every host to finish first.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip jobs completed by previous runs and retry the failed ones, including the failed jobs of --queue.")
+    parser.add_argument("--trace", metavar="DIR",
+                        help="Record phase timings and write trace.json (Chrome/Perfetto) and metrics.prom (Prometheus) into DIR.")
+    parser.add_argument("--log-json", action="store_true",
+                        help="Write app.log as JSON lines tagged with the job and repository of each record.")
+    parser.add_argument("--compact-results", action="store_true",
+                        help="Rewrite the uncompressed SARIF files of scan_results as compact .sarif.gz files and exit.")
+    parser.add_argument("--plan", action="store_true",
+                        help="Print the predicted schedule of the jobs and the expected total time, then exit.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running, with the runners set up, and scan the repositories submitted through a local API.")
+    parser.add_argument("--listen", default="127.0.0.1:8765", metavar="ADDRESS",
+                        help="Address of the daemon API: host:port, or the path of a Unix socket. Defaults to 127.0.0.1:8765.")
+    parser.add_argument("--report-only", action="store_true",
+                        help="Skip cloning and scanning, only generate the report from scan_results.")
+    return parser.parse_args()
+
+def print_plan(app_config):
+    """
+    Prints, for each enabled runner, the order in which its jobs would start, the
+    worker slot and time window predicted for each, and the expected duration of
+    the run. Runners run one after the other, so their durations add up.
+    """
+    planner = JobPlanner(app_config.job_history, app_config.size_hints())
+    workers = app_config.application.max_workers
+    total = 0.0
+    for tool in app_config.application.runners:
+        jobs = planner.order(app_config.get_scan_jobs(tool))
+        schedule, makespan = planner.simulate(jobs, workers)
+        print("{} ({} jobs, {} workers)".format(tool, len(jobs), workers))
+        for entry in schedule:
+            print("  slot {:>2}  {:>8.0f}s -> {:>8.0f}s  {:>8.0f}s  {:<8}  {}".format(
+                entry["slot"], entry["start"], entry["end"], entry["seconds"], entry["source"], entry["job"]
+            ))
+        print("  expected: {:.0f}s".format(makespan))
+        total += makespan
+    print("Expected total: {:.0f}s ({:.1f}h)".format(total, total / 3600))
+
+def build_ground_truth(app_config, logger):
+    """
+    Returns the scorer comparing the results with the ground-truth manifests, as
+    configured in the application settings.
+    """
+    return GroundTruthScorer(
+        app_config.application.ground_truth_directory,
+        app_config.application.line_tolerance,
+        app_config.application.cwe_families,
+        logger,
+    )
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def run_daemon(app_config, logger, process_manager, github_manager, listen):
+    """
+    Serves the daemon API until the process is interrupted, then waits for the
+    running jobs and tears the runners down.
+    """
+    ground_truth = build_ground_truth(app_config, logger)
+    daemon = BenchmarkDaemon(app_config, CONFIGURATION_FILE, logger, process_manager, github_manager,
+                             ScorecardBuilder(ground_truth=ground_truth))
+    daemon.start()
+    server = DaemonServer(daemon, listen, logger)
+    signal.signal(signal.SIGTERM, _interrupt)
+    logger.info("Daemon listening on {}".format(listen))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping the daemon")
+    finally:
+        server.close()
+        daemon.stop()
 
 if __name__ == "__main__":
-    app_config = AppConfig(json.load(open(CONFIGURATION_FILE)))
+    args = parse_arguments()
+
+    if args.compact_results:
+        saved = 0
+        for source, destination, before, after in compact_directory(RESULTS_DIRECTORY):
+            print("{} -> {} ({} -> {} bytes)".format(source, destination, before, after))
+            saved += before - after
+        print("Saved {:.1f} MiB".format(saved / 1024 ** 2))
+        sys.exit(0)
 
-    logger = Logger(name="AppLogger", log_file="app.log", level=logging.DEBUG).get_logger()
+    app_config = AppConfig(json.load(open(CONFIGURATION_FILE)))
+    app_config.shard = args.shard
+    if args.trace:
+        tracer.configure(args.trace)
+    if args.queue:
+        app_config.job_queue = JobQueue(args.queue, worker_id=args.worker_id, lease_seconds=args.lease)
+    app_config.job_history = JobHistory(os.path.join(RESULTS_DIRECTORY, "job_history.jsonl"))
+
+    if args.plan:
+        print_plan(app_config)
+        sys.exit(0)
+
+    # Hosts sharing scan_results keep one journal each
+    distributed = args.shard is not None or args.queue is not None
+    journal_name = "run_journal.{}.jsonl".format(args.worker_id or socket.gethostname()) if distributed else "run_journal.jsonl"
+
+    # Workers only enqueue log records; this process writes and rotates app.log
+    app_logger = Logger(name="AppLogger", log_file="app.log", level=logging.DEBUG, use_queue=True, json_format=args.log_json)
+    atexit.register(app_logger.stop)
+    logger = app_logger.get_logger()
     logger.debug("Configuration loaded successfully. %s",json.dumps(app_config.to_dict()))
 
-    github_manager = GitHubManager()
+    if not args.report_only:
+        app_config.journal = RunJournal(os.path.join(RESULTS_DIRECTORY, journal_name), resume=args.resume)
+
+        github_manager = GitHubManager()
+
+        concurrency = None
+        if app_config.application.adaptive_concurrency:
+            concurrency = AdaptiveConcurrency(app_config.application.min_workers,
+                                              app_config.application.max_workers, logger)
+        process_manager = ProcessManager(max_workers=app_config.application.max_workers, concurrency=concurrency)
 
-    process_manager = ProcessManager(max_workers=app_config.application.max_workers)
+        if args.daemon:
+            run_daemon(app_config, logger, process_manager, github_manager, args.listen)
+            tracer.export()
+            sys.exit(0)
 
-    app_config.add_vulnerable_reporitories_to_worker(github_manager, logger, process_manager)
-    app_config.add_non_vulnerable_reporitories_to_worker(github_manager, logger, process_manager)
+        # Jobs claimed from a queue clone their repository themselves
+        if app_config.job_queue is None:
+            with tracer.span("update_repositories"):
+                app_config.add_vulnerable_reporitories_to_worker(github_manager, logger, process_manager)
+                app_config.add_non_vulnerable_reporitories_to_worker(github_manager, logger, process_manager)
 
-    process_manager.wait_for_all()
+                process_manager.wait_for_all()
 
-    for runner in app_config.application.runners:
-        start_time = datetime.now()
+        for runner in app_config.application.runners:
+            start_time = datetime.now()
 
-        module_name = app_config.application.runners[runner].get('module_name')
-        class_name = app_config.application.runners[runner].get('class_name')
+            module_name = app_config.application.runners[runner].get('module_name')
+            class_name = app_config.application.runners[runner].get('class_name')
 
-        logger.debug("Running %s",module_name)
-        
-        # Dynamically import the class
-        module = importlib.import_module(module_name)
-        runner_class = getattr(module, class_name)
-        
-        # Initialize the runner dynamically
-        runner = runner_class(logger, process_manager)
-        
-        # Run the scan
-        runner.run(app_config)
+            logger.debug("Running %s",module_name)
 
-        end_time = datetime.now()
-        logger.debug("Time to run %s runner: %s",module_name, end_time - start_time)
+            # Dynamically import the class
+            module = importlib.import_module(module_name)
+            runner_class = getattr(module, class_name)
 
-    report_generator = SarifReportGenerator("scan_results")
-    report_generator.generate_report()
+            # Initialize the runner dynamically
+            runner = runner_class(logger, process_manager)
 
-    
+            # Run the scan
+            with tracer.span("runner", tool=runner.name):
+                runner.run(app_config)
 
+            end_time = datetime.now()
+            logger.debug("Time to run %s runner: %s",module_name, end_time - start_time)
 
+    # A node holding only part of the matrix leaves the report to the merging node
+    if args.report_only or args.merge or not distributed:
+        if app_config.job_queue is not None:
+            logger.info("Waiting for every host to finish its jobs")
+            expired = app_config.job_queue.wait_until_drained()
+            if expired:
+                logger.warning("Marked %d jobs abandoned by a stopped host as failed: %s", len(expired), ", ".join(expired))
+            logger.info("Queue drained: %s", json.dumps(app_config.job_queue.counts()))
 
+        with tracer.span("report"):
+            ground_truth = build_ground_truth(app_config, logger)
+            report_generator = SarifReportGenerator(RESULTS_DIRECTORY, ground_truth=ground_truth)
+            report_generator.generate_report()
 
+    tracer.export()
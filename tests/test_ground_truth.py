@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from domain.entity.ground_truth import ExpectedIssue
+from domain.use_case.ground_truth import FileIntervalIndex
+
+FILE_LENGTH = 200
+
+
+def brute_force(issues, line, tolerance):
+    return sorted((issue for issue in issues if issue.start_line - tolerance <= line <= issue.end_line + tolerance),
+                  key=lambda issue: (issue.start_line, issue.end_line))
+
+
+def random_issues(rng, count):
+    issues = []
+    for index in range(count):
+        kind = rng.random()
+        if kind < 0.2:
+            # Single line
+            start = end = rng.randint(0, FILE_LENGTH)
+        elif kind < 0.3:
+            # Whole file, including file-level issues without a line
+            start, end = rng.choice((0, 1)), FILE_LENGTH
+        elif kind < 0.5 and issues:
+            # Nested in an earlier issue
+            outer = rng.choice(issues)
+            start = rng.randint(outer.start_line, outer.end_line)
+            end = rng.randint(start, outer.end_line)
+        else:
+            start = rng.randint(0, FILE_LENGTH)
+            end = min(FILE_LENGTH, start + rng.randint(0, 40))
+        issues.append(ExpectedIssue(str(index), "a.go", start, end))
+    return issues
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_overlapping_matches_brute_force(seed):
+    rng = random.Random(seed)
+    issues = random_issues(rng, rng.randint(0, 60))
+    index = FileIntervalIndex(issues)
+    for tolerance in (0, 3):
+        for line in range(-5, FILE_LENGTH + 6):
+            assert index.overlapping(line, tolerance) == brute_force(issues, line, tolerance)
+
+
+def test_overlapping_edge_cases():
+    whole_file = ExpectedIssue("whole", "a.go", 1, FILE_LENGTH)
+    nested = ExpectedIssue("nested", "a.go", 10, 20)
+    single = ExpectedIssue("single", "a.go", 15, 15)
+    index = FileIntervalIndex([single, nested, whole_file])
+
+    assert index.overlapping(15, 0) == [whole_file, nested, single]
+    assert index.overlapping(12, 0) == [whole_file, nested]
+    assert index.overlapping(12, 3) == [whole_file, nested, single]
+    assert index.overlapping(FILE_LENGTH + 1, 0) == []
+    assert index.overlapping(FILE_LENGTH + 1, 1) == [whole_file]
+    assert FileIntervalIndex([]).overlapping(1, 3) == []
@@ -0,0 +1,213 @@
+import logging
+import os
+import subprocess
+
+import pytest
+
+from adapter.sarif_io import dump_sarif, load_sarif
+from domain.entity.config import AppConfig
+from domain.entity.job import ScanJob
+from domain.interface.sast_runner import SastRunner
+from domain.use_case.incremental_scan import (
+    SCAN_STATE_FILE, ScanPlan, merge_sarif, plan_scan, read_scan_state, write_scan_state,
+)
+
+ADDRESS = "https://github.com/owner/name"
+JOB = ScanJob("FakeRunner", True, "Go", ADDRESS)
+
+
+def git(repository, *args):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+                   cwd=repository, check=True, capture_output=True)
+    return subprocess.run(["git", "rev-parse", "HEAD"], cwd=repository, capture_output=True, text=True).stdout.strip()
+
+
+def commit(repository, files, deleted=()):
+    for path, content in files.items():
+        full_path = os.path.join(repository, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(content)
+    for path in deleted:
+        os.remove(os.path.join(repository, path))
+    git(repository, "add", "-A")
+    return git(repository, "commit", "--quiet", "-m", "change")
+
+
+def result(uri, rule="rule-a", line=1, rule_index=None):
+    entry = {"ruleId": rule, "message": {"text": rule},
+             "locations": [{"physicalLocation": {"artifactLocation": {"uri": uri}, "region": {"startLine": line}}}]}
+    if rule_index is not None:
+        entry["ruleIndex"] = rule_index
+    return entry
+
+
+def sarif(results, rules=("rule-a",)):
+    return {"version": "2.1.0", "runs": [{"tool": {"driver": {"name": "Fake", "rules": [{"id": rule} for rule in rules]}},
+                                          "results": results}]}
+
+
+def result_files(path):
+    return sorted((r["locations"][0]["physicalLocation"]["artifactLocation"]["uri"], r["ruleId"])
+                  for r in load_sarif(path)["runs"][0]["results"])
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(JOB.repository_directory)
+    git(JOB.repository_directory, "init", "--quiet")
+    return JOB.repository_directory
+
+
+def test_plan_scan(repository, tmp_path):
+    first = commit(repository, {"a.go": "a", "b.go": "b"})
+    report = str(tmp_path / "result.sarif")
+
+    assert plan_scan(repository, report, "key", True).mode == ScanPlan.FULL
+    dump_sarif(sarif([]), report)
+    assert plan_scan(repository, report, "key", True).mode == ScanPlan.FULL
+
+    write_scan_state(report, first, "key", ScanPlan.FULL)
+    assert plan_scan(repository, report, "key", True).mode == ScanPlan.UNCHANGED
+    assert plan_scan(repository, report, "other key", True).mode == ScanPlan.FULL
+
+    commit(repository, {"a.go": "a2", "c/d.go": "d"}, deleted=["b.go"])
+    plan = plan_scan(repository, report, "key", True)
+    assert plan.mode == ScanPlan.INCREMENTAL
+    assert plan.previous_commit == first
+    assert sorted(plan.changed_files) == ["a.go", "c/d.go"]
+    assert plan.deleted_files == ["b.go"]
+    assert plan_scan(repository, report, "key", False).mode == ScanPlan.FULL
+
+    write_scan_state(report, "0" * 40, "key", ScanPlan.FULL)
+    assert plan_scan(repository, report, "key", True).mode == ScanPlan.FULL
+
+
+def test_merge_sarif_drops_changed_and_deleted_files(tmp_path):
+    previous, new, merged = (str(tmp_path / name) for name in ("previous.sarif", "new.sarif", "merged.sarif.gz"))
+    dump_sarif(sarif([
+        result("file:///src/a.go", rule_index=0),
+        result("b.go", rule_index=0),
+        result("module/src/main/C.java", rule_index=0),
+        result("%SRCROOT%/kept.go", rule_index=0),
+    ]), previous)
+    dump_sarif(sarif([result("a.go", "rule-b", 5, rule_index=1), result("a.go", "rule-a", 7, rule_index=0)],
+                     rules=("rule-a", "rule-b")), new)
+
+    merge_sarif(previous, new, {"a.go", "b.go", "module/src/main/C.java"}, "owner__name", merged)
+
+    document = load_sarif(merged)
+    results = document["runs"][0]["results"]
+    assert result_files(merged) == [("%SRCROOT%/kept.go", "rule-a"), ("a.go", "rule-a"), ("a.go", "rule-b")]
+    assert all("ruleIndex" not in r for r in results if r["locations"][0]["physicalLocation"]["artifactLocation"]["uri"] == "a.go")
+    assert [rule["id"] for rule in document["runs"][0]["tool"]["driver"]["rules"]] == ["rule-a", "rule-b"]
+
+
+def test_merge_sarif_without_new_report_only_drops(tmp_path):
+    previous, merged = str(tmp_path / "previous.sarif"), str(tmp_path / "merged.sarif")
+    dump_sarif(sarif([result("a.go"), result("b.go")]), previous)
+    merge_sarif(previous, None, {"b.go"}, "owner__name", merged)
+    assert result_files(merged) == [("a.go", "rule-a")]
+
+
+class FakeRunner(SastRunner):
+    name = "Fake"
+    supports_incremental = True
+
+    def __init__(self, report_file):
+        self.logger = logging.getLogger("test")
+        self.process_manager = None
+        self.report_file = report_file
+        self.findings = {}
+        self.fail = False
+        self.scans = []
+
+    def tool_version(self, job):
+        return "1"
+
+    def get_report_file(self, job):
+        return self.report_file
+
+    def save_resource_usage(self, job):
+        pass
+
+    def scan(self, job, configs):
+        targets = self.scan_targets(job.repository_directory)
+        self.scans.append(targets)
+        if self.fail:
+            return False
+        files = targets if targets is not None else sorted(self.findings)
+        dump_sarif(sarif([result(path, rule) for path in files for rule in self.findings.get(path, [])]),
+                   self.report_file)
+        return True
+
+
+@pytest.fixture
+def runner(repository, tmp_path):
+    return FakeRunner(str(tmp_path / "results" / "result.sarif"))
+
+
+@pytest.fixture
+def configs():
+    return AppConfig({"application": {"filter_languages": ["Go"], "max_workers": 1, "runners": [],
+                                      "max_attempts": 1, "retry_backoff": 0}})
+
+
+def test_runner_full_unchanged_and_incremental(repository, runner, configs):
+    commit(repository, {"a.go": "a", "b.go": "b", "c.go": "c"})
+    runner.findings = {"a.go": ["rule-a"], "b.go": ["rule-a"], "c.go": ["rule-a"]}
+    assert runner.execute_job(JOB, configs)
+    assert runner.scans == [None]
+    assert read_scan_state(runner.report_file)["mode"] == ScanPlan.FULL
+
+    assert runner.execute_job(JOB, configs)
+    assert runner.scans == [None], "an unchanged commit is not scanned again"
+
+    head = commit(repository, {"a.go": "a2", "d.go": "d"}, deleted=["b.go"])
+    runner.findings = {"a.go": ["rule-b"], "d.go": ["rule-a"]}
+    assert runner.execute_job(JOB, configs)
+    assert sorted(runner.scans[-1]) == ["a.go", "d.go"]
+    assert result_files(runner.report_file) == [("a.go", "rule-b"), ("c.go", "rule-a"), ("d.go", "rule-a")]
+    assert read_scan_state(runner.report_file) == {"commit": head, "cache_key": runner.cache_key(JOB, configs),
+                                                   "mode": ScanPlan.INCREMENTAL}
+    assert not os.path.exists(os.path.join(os.path.dirname(runner.report_file), ".previous-result.sarif"))
+
+
+def test_failed_incremental_scan_restores_previous_results(repository, runner, configs):
+    first = commit(repository, {"a.go": "a", "b.go": "b"})
+    runner.findings = {"a.go": ["rule-a"], "b.go": ["rule-a"]}
+    assert runner.execute_job(JOB, configs)
+
+    commit(repository, {"a.go": "a2"})
+    runner.fail = True
+    assert not runner.execute_job(JOB, configs)
+    assert runner.scans[-1] == ["a.go"]
+    assert result_files(runner.report_file) == [("a.go", "rule-a"), ("b.go", "rule-a")]
+    assert read_scan_state(runner.report_file)["commit"] == first
+
+    runner.fail = False
+    runner.findings = {"a.go": []}
+    assert runner.execute_job(JOB, configs)
+    assert runner.scans[-1] == ["a.go"]
+    assert result_files(runner.report_file) == [("b.go", "rule-a")]
+
+
+def test_failed_merge_restores_previous_results_and_forces_a_full_scan(repository, runner, configs, monkeypatch):
+    commit(repository, {"a.go": "a", "b.go": "b"})
+    runner.findings = {"a.go": ["rule-a"], "b.go": ["rule-a"]}
+    assert runner.execute_job(JOB, configs)
+
+    commit(repository, {"a.go": "a2"})
+
+    def broken_merge(*args):
+        raise ValueError("corrupt SARIF")
+
+    monkeypatch.setattr("domain.interface.sast_runner.merge_sarif", broken_merge)
+    assert not runner.execute_job(JOB, configs)
+    assert result_files(runner.report_file) == [("a.go", "rule-a"), ("b.go", "rule-a")]
+    assert not os.path.exists(os.path.join(os.path.dirname(runner.report_file), SCAN_STATE_FILE))
+
+    monkeypatch.undo()
+    assert runner.execute_job(JOB, configs)
+    assert runner.scans[-1] is None, "the results of an unknown commit are replaced by a full scan"
@@ -0,0 +1,143 @@
+import time
+
+from adapter.job_queue import JobQueue
+from adapter.journal import RunJournal
+from domain.entity.job import ScanJob
+
+JOB = ScanJob("TrivyRunner", True, "Go", "https://github.com/0c34/govwa")
+OTHER = ScanJob("TrivyRunner", False, "Go", "https://github.com/gin-gonic/gin")
+
+
+def expire(queue, job):
+    with queue._connect() as connection:
+        connection.execute("UPDATE jobs SET updated_at = 0 WHERE key = ?", (job.key,))
+
+
+def test_jobs_are_claimed_once_in_seed_order(tmp_path):
+    first, second = JobQueue(str(tmp_path), "a"), JobQueue(str(tmp_path), "b")
+    first.seed([JOB, OTHER])
+    second.seed([OTHER, JOB])
+
+    assert first.claim("TrivyRunner") == JOB
+    assert second.claim("TrivyRunner") == OTHER
+    assert first.claim("TrivyRunner") is None
+    assert first.claim("SemgrepRunner") is None
+    assert first.counts() == {"running": 2}
+    assert first.counts("SemgrepRunner") == {}
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    first, second = JobQueue(str(tmp_path), "a"), JobQueue(str(tmp_path), "b")
+    first.seed([JOB])
+    assert first.claim("TrivyRunner") == JOB
+    assert second.claim("TrivyRunner") is None
+
+    expire(first, JOB)
+    assert second.claim("TrivyRunner") == JOB
+
+
+def test_late_complete_does_not_overwrite_the_new_owner(tmp_path):
+    first, second = JobQueue(str(tmp_path), "a"), JobQueue(str(tmp_path), "b")
+    first.seed([JOB])
+    first.claim("TrivyRunner")
+    expire(first, JOB)
+    second.claim("TrivyRunner")
+
+    assert not first.complete(JOB, False)
+    assert not first.renew(JOB)
+    assert first.counts() == {"running": 1}
+    assert second.complete(JOB, True)
+    assert first.counts() == {"done": 1}
+    assert not second.complete(JOB, False)
+
+
+def test_keep_alive_renews_the_lease(tmp_path):
+    queue = JobQueue(str(tmp_path), "a", lease_seconds=0.2)
+    other = JobQueue(str(tmp_path), "b", lease_seconds=0.2)
+    queue.seed([JOB])
+    queue.claim("TrivyRunner")
+    with queue.keep_alive(JOB) as lost:
+        time.sleep(0.5)
+        assert other.claim("TrivyRunner") is None
+    assert not lost.is_set()
+    assert queue.complete(JOB, True)
+
+
+def test_keep_alive_reports_a_lost_lease(tmp_path):
+    queue = JobQueue(str(tmp_path), "a", lease_seconds=0.2)
+    queue.seed([JOB])
+    queue.claim("TrivyRunner")
+    with queue.keep_alive(JOB) as lost:
+        expire(queue, JOB)
+        JobQueue(str(tmp_path), "b", lease_seconds=0.2).claim("TrivyRunner")
+        assert lost.wait(1)
+
+
+def test_failed_jobs_are_seeded_again_until_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path), "a")
+    claims = 0
+    for _ in range(5):
+        queue.seed([JOB], max_attempts=3)
+        job = queue.claim("TrivyRunner")
+        if job is None:
+            break
+        claims += 1
+        queue.complete(job, False)
+    assert claims == 3
+    assert queue.counts() == {"failed": 1}
+
+
+def test_seed_keeps_done_and_failed_jobs_without_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path), "a")
+    queue.seed([JOB, OTHER])
+    queue.complete(queue.claim("TrivyRunner"), True)
+    queue.complete(queue.claim("TrivyRunner"), False)
+
+    queue.seed([JOB, OTHER])
+    assert queue.claim("TrivyRunner") is None
+    queue.seed([JOB, OTHER], max_attempts=3)
+    assert queue.claim("TrivyRunner") == OTHER
+
+
+def test_wait_until_drained_fails_abandoned_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path), "a", lease_seconds=60)
+    queue.seed([JOB, OTHER])
+    queue.complete(queue.claim("TrivyRunner"), True)
+    queue.claim("TrivyRunner")
+    expire(queue, OTHER)
+
+    assert queue.wait_until_drained(poll_interval=0) == [OTHER.key]
+    assert queue.counts() == {"done": 1, "failed": 1}
+
+
+def test_journal_resume(tmp_path):
+    path = str(tmp_path / "run_journal.jsonl")
+    sarif = tmp_path / "result.sarif"
+    sarif.write_text("{}")
+
+    journal = RunJournal(path)
+    journal.record(JOB, journal.RUNNING)
+    journal.record(JOB, journal.DONE, sarif=str(sarif), cache_key="k1")
+    journal.record(OTHER, journal.RUNNING)
+    journal.record(OTHER, journal.FAILED, error="boom")
+    journal.record(OTHER, journal.RUNNING)
+
+    resumed = RunJournal(path, resume=True)
+    assert resumed.is_done(JOB, "k1")
+    assert not resumed.is_done(JOB, "k2")
+    assert not resumed.is_done(OTHER, None)
+    assert resumed.attempts(JOB) == 0
+    assert resumed.attempts(OTHER) == 2
+
+    sarif.write_text('{"changed": true}')
+    assert not RunJournal(path, resume=True).is_done(JOB, "k1")
+
+
+def test_journal_without_resume_starts_clean(tmp_path):
+    path = str(tmp_path / "run_journal.jsonl")
+    journal = RunJournal(path)
+    journal.record(JOB, journal.RUNNING)
+    journal.record(JOB, journal.DONE, cache_key="k1")
+
+    RunJournal(path)
+    assert not RunJournal(path, resume=True).is_done(JOB, "k1")
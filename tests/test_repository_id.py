@@ -0,0 +1,74 @@
+import re
+
+import pytest
+
+from domain.entity.config import AppConfig
+from domain.entity.job import canonical_address, repository_id
+
+HASHED = re.compile(r"-[0-9a-f]{8}$")
+
+
+@pytest.mark.parametrize("address, expected", [
+    ("https://github.com/owner/name", "owner__name"),
+    ("https://github.com/owner/name/", "owner__name"),
+    ("https://www.github.com/owner/name", "owner__name"),
+    ("https://GitHub.com/owner/name", "owner__name"),
+    ("https://github.com/owner/my-repo.js", "owner__my-repo.js"),
+    ("https://gitlab.com/group/name", "gitlab.com__group__name"),
+    ("https://gitlab.com/group/subgroup/name", "gitlab.com__group__subgroup__name"),
+    ("git@bitbucket.org:team/name.git", "bitbucket.org__team__name"),
+])
+def test_repository_id(address, expected):
+    assert repository_id(address) == expected
+
+
+@pytest.mark.parametrize("address, prefix", [
+    ("https://github.com/owner/my repo", "owner__my_repo"),
+    ("https://github.com/owner/name~1", "owner__name_1"),
+    ("https://github.com/owner__a/b", "owner__a__b"),
+    ("https://github.com/owner/_name", "owner___name"),
+    ("ssh://git@gitlab.com:2222/group/name", "gitlab.com_2222__group__name"),
+    ("https://github.com/..", "repository"),
+])
+def test_unsafe_names_get_a_hash_suffix(address, prefix):
+    identifier = repository_id(address)
+    assert HASHED.search(identifier)
+    assert identifier[:-len("-12345678")] == prefix
+    assert "/" not in identifier and identifier not in (".", "..")
+
+
+@pytest.mark.parametrize("first, second", [
+    ("https://github.com/owner/a__b", "https://github.com/owner__a/b"),
+    ("https://github.com/owner/a b", "https://github.com/owner/a_b"),
+    ("https://github.com/owner/a b", "https://github.com/owner/a?b"),
+    ("https://github.com/owner/name", "https://gitlab.com/owner/name"),
+])
+def test_different_repositories_get_different_ids(first, second):
+    assert repository_id(first) != repository_id(second)
+
+
+@pytest.mark.parametrize("spellings", [
+    ("https://github.com/owner/name", "https://github.com/owner/name.git", "http://github.com/owner/name/",
+     "git@github.com:owner/name.git", "ssh://git@github.com/owner/name.git"),
+    ("https://gitlab.com/group/name", "git@gitlab.com:group/name.git", "ssh://git@gitlab.com:22/group/name"),
+    ("https://github.com/owner/my repo", "git@github.com:owner/my repo.git"),
+])
+def test_spellings_of_an_address_are_equivalent(spellings):
+    assert len({canonical_address(address) for address in spellings}) == 1
+    assert len({repository_id(address) for address in spellings if ":22/" not in address}) == 1
+
+
+def config(vulnerable):
+    return AppConfig({"application": {"filter_languages": ["Go"], "max_workers": 1, "runners": []},
+                      "repos": {"vulnerable": {"Go": vulnerable}}})
+
+
+def test_spellings_of_a_repository_are_listed_once():
+    repositories = list(config(["https://github.com/owner/name", "git@github.com:owner/name.git",
+                                "https://github.com/owner/other"]).iter_repositories())
+    assert [entry.url for entry in repositories] == ["https://github.com/owner/name", "https://github.com/owner/other"]
+
+
+def test_repositories_sharing_an_id_are_rejected():
+    with pytest.raises(ValueError, match="share the repository id owner__name"):
+        list(config(["https://github.com/owner/name", "owner/name"]).iter_repositories())